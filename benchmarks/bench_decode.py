@@ -0,0 +1,92 @@
+"""CPU and memory benchmark for decoding recorded Booking.com payloads.
+
+Decodes what one single-city search receives (``--pages`` searchHotels
+pages and ``--details`` getHotelDetails responses from ``fixtures/``) the
+way the client did before field projection (whole trees from the standard
+library parser, result pages kept while the search runs) and the way it
+does now (only the projected fields kept, with each available parser).
+Reports CPU time and peak traced memory per search and what is still held
+at the end of it.
+
+    python benchmarks/bench_decode.py --iterations 200
+    python benchmarks/bench_decode.py --details 50 --json
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+# Importing replay puts src/ on sys.path
+from replay import FIXTURES_DIR
+from api.booking_api import parse_hotel_details, parse_search_page
+from api.decoding import JSON_PARSER, orjson
+
+def read_fixture(name: str) -> bytes:
+    return (FIXTURES_DIR / f"{name}.json").read_bytes()
+
+def full_trees(parse, page: bytes, details: bytes, pages: int, lookups: int) -> list:
+    """The search as decoded before projection: every page's hotels stay whole."""
+    held = [parse(page)['data']['hotels'] for _ in range(pages)]
+    held.extend(parse_hotel_details(parse(details)['data']) for _ in range(lookups))
+    return held
+
+def projected(parse, page: bytes, details: bytes, pages: int, lookups: int) -> list:
+    """The search as decoded now: only the fields that are read survive parsing."""
+    held = [parse_search_page(parse(page)) for _ in range(pages)]
+    held.extend(parse_hotel_details(parse(details)['data']) for _ in range(lookups))
+    return held
+
+def variants() -> dict:
+    found = {
+        "full/json": (full_trees, json.loads),
+        "projected/json": (projected, json.loads),
+    }
+    if orjson is not None:
+        found["projected/orjson"] = (projected, orjson.loads)
+    return found
+
+def measure(decode, parse, page: bytes, details: bytes, args) -> dict:
+    started = time.process_time()
+    for _ in range(args.iterations):
+        decode(parse, page, details, args.pages, args.details)
+    cpu_ms = (time.process_time() - started) * 1000 / args.iterations
+
+    tracemalloc.start()
+    held = decode(parse, page, details, args.pages, args.details)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return {
+        "cpu_ms_per_search": round(cpu_ms, 3),
+        "peak_kb_per_search": round(peak / 1024, 1),
+        "retained_kb_per_search": round(retained / 1024, 1),
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100, help="Searches decoded for the CPU timing")
+    parser.add_argument("--pages", type=int, default=1, help="searchHotels pages per search")
+    parser.add_argument("--details", type=int, default=20, help="getHotelDetails responses per search")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per variant")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    page, details = read_fixture("searchHotels"), read_fixture("getHotelDetails")
+    baseline = None
+    if not args.json:
+        print(f"Clients parse responses with {JSON_PARSER}")
+    for name, (decode, parse) in variants().items():
+        result = {"variant": name, **measure(decode, parse, page, details, args)}
+        baseline = baseline or result
+        if args.json:
+            print(json.dumps(result))
+            continue
+        print(f"{name:17} cpu={result['cpu_ms_per_search']:7.2f}ms "
+              f"({result['cpu_ms_per_search'] / baseline['cpu_ms_per_search']:4.0%})  "
+              f"peak={result['peak_kb_per_search']:7.1f}KB "
+              f"({result['peak_kb_per_search'] / baseline['peak_kb_per_search']:4.0%})  "
+              f"retained={result['retained_kb_per_search']:7.1f}KB")
+
+if __name__ == "__main__":
+    main()
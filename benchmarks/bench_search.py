@@ -0,0 +1,152 @@
+"""Offline latency/throughput benchmark for BookingAPI searches.
+
+Runs single-city and 10-city searches (and hotel details lookups) against
+the replay stand-ins in replay.py and reports p50/p95/p99 latency,
+throughput and upstream calls per operation.
+
+    python benchmarks/bench_search.py --iterations 20 --latency-ms 80
+    python benchmarks/bench_search.py --scenario multi --ranker openai --json
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Importing replay puts src/ on sys.path
+from replay import CallCounter, FakeOpenAIClient, ReplayAdapter, install
+from api.booking_api import BookingAPI
+from api.openai_api import OpenAIAPI
+from models.cache import Cache
+
+TEN_CITIES = ["Mumbai", "Delhi", "Goa", "Jaipur", "Chennai", "Kolkata", "Pune", "Udaipur", "Kochi", "Agra"]
+CHECKIN, CHECKOUT = "2025-03-02", "2025-03-05"
+
+def percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.counter = CallCounter()
+        self.cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+        self.shared = None
+
+    def make_clients(self, run: int):
+        """A BookingAPI wired to the replay stand-ins, with a cold or shared warm cache."""
+        if self.args.warm and self.shared is not None:
+            return self.shared
+
+        cache = None
+        if not self.args.no_cache:
+            cache = Cache(os.path.join(self.cache_dir, f"cache-{run}.db"))
+        openai_api = OpenAIAPI(cache=cache)
+        booking_api = BookingAPI(cache=cache, openai_api=openai_api)
+        install(
+            booking_api,
+            ReplayAdapter(self.args.latency_ms, self.args.jitter_ms, self.args.error_rate,
+                          pages=self.args.pages, seed=run, counter=self.counter),
+            openai_api,
+            FakeOpenAIClient(self.args.llm_latency_ms, seed=run, counter=self.counter)
+        )
+        clients = (booking_api, openai_api)
+        if self.args.warm:
+            self.shared = clients
+        return clients
+
+    def operation(self, scenario: str, run: int):
+        booking_api, _ = self.make_clients(run)
+        if scenario == "details":
+            return booking_api.get_hotel_details(str(1000 + run % 20), CHECKIN, CHECKOUT)
+        destinations = TEN_CITIES if scenario == "multi" else TEN_CITIES[:1]
+        return booking_api.search_multiple_locations(
+            destinations=destinations,
+            checkin_date=CHECKIN,
+            checkout_date=CHECKOUT,
+            adults_number=2,
+            max_price=self.args.budget,
+            preferences=self.args.preferences,
+            ranker=self.args.ranker,
+            max_results=self.args.max_results
+        )
+
+    def run(self, scenario: str) -> dict:
+        self.counter.reset()
+        self.shared = None
+        if self.args.warm:
+            # Fill the shared cache before measuring
+            self.operation(scenario, 0)
+            self.counter.reset()
+
+        latencies = []
+
+        def timed(run: int):
+            started = time.perf_counter()
+            self.operation(scenario, run)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            list(executor.map(timed, range(1, self.args.iterations + 1)))
+        elapsed = time.perf_counter() - started
+
+        calls = self.counter.snapshot()
+        return {
+            "scenario": scenario,
+            "iterations": self.args.iterations,
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "mean_ms": round(statistics.mean(latencies), 1),
+            "throughput_per_s": round(self.args.iterations / elapsed, 2),
+            "upstream_calls_per_op": {
+                endpoint: round(count / self.args.iterations, 2)
+                for endpoint, count in sorted(calls.items())
+            }
+        }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=["single", "multi", "details", "all"], default="all")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1, help="Operations run at the same time")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean replayed RapidAPI latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of RapidAPI calls answered with 503")
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0)
+    parser.add_argument("--pages", type=int, default=3, help="Result pages per city")
+    parser.add_argument("--budget", type=float, default=None)
+    parser.add_argument("--preferences", default="pool,spa")
+    parser.add_argument("--ranker", default="local")
+    parser.add_argument("--max-results", type=int, default=None)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Client-side requests/s (0 disables the limiter)")
+    parser.add_argument("--warm", action="store_true", help="Share one pre-filled cache across iterations")
+    parser.add_argument("--no-cache", action="store_true", help="Run without the SQLite cache")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per scenario")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.environ["BOOKING_RATE_LIMIT"] = str(args.rate_limit)
+    scenarios = ["single", "multi", "details"] if args.scenario == "all" else [args.scenario]
+    harness = Harness(args)
+
+    for scenario in scenarios:
+        result = harness.run(scenario)
+        if args.json:
+            print(json.dumps(result))
+            continue
+        calls = ", ".join(f"{name}={count}" for name, count in result["upstream_calls_per_op"].items())
+        print(f"{scenario:8} p50={result['p50_ms']:8.1f}ms  p95={result['p95_ms']:8.1f}ms  "
+              f"p99={result['p99_ms']:8.1f}ms  {result['throughput_per_s']:7.2f} ops/s  calls/op: {calls}")
+
+if __name__ == "__main__":
+    main()
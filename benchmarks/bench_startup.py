@@ -0,0 +1,94 @@
+"""CLI startup-time benchmark.
+
+Times fresh ``python src/main.py`` processes for ``--help`` and for a
+``details`` lookup answered from a pre-filled cache, so no request leaves
+the machine. ``--imports`` also lists the slowest top-level imports.
+
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --imports --json
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Importing replay puts src/ on sys.path
+from replay import SRC_DIR, load_fixture
+from api.booking_api import HOTEL_DETAILS_TTL, hotel_details_cache_key, parse_hotel_details
+from models.cache import Cache
+
+MAIN = str(SRC_DIR / "main.py")
+HOTEL_ID = "1000"
+CHECKIN, CHECKOUT = "2025-03-02", "2025-03-05"
+
+COMMANDS = {
+    "help": ["--help"],
+    "details-cached": ["details", HOTEL_ID, "--checkin", CHECKIN, "--checkout", CHECKOUT],
+}
+
+def prefill_cache(path: str):
+    """Store the recorded hotel details so the details command never goes upstream."""
+    cache = Cache(path)
+    details = parse_hotel_details(load_fixture("getHotelDetails")["data"])
+    cache.set(hotel_details_cache_key(HOTEL_ID, CHECKIN, CHECKOUT), details, HOTEL_DETAILS_TTL)
+    cache.close()
+
+def child_env(cache_path: str) -> dict:
+    env = dict(os.environ, CACHE_DB_PATH=cache_path, PYTHONDONTWRITEBYTECODE="1")
+    # Unroutable, so a cache miss fails fast instead of calling RapidAPI
+    env.setdefault("HTTPS_PROXY", "http://127.0.0.1:9")
+    return env
+
+def time_command(args: list, env: dict, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, MAIN, *args], env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=True)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(samples), 1),
+        "median_ms": round(statistics.median(samples), 1),
+        "max_ms": round(max(samples), 1),
+    }
+
+def slowest_imports(args: list, env: dict, top: int) -> list:
+    """Top-level modules by cumulative import time, from ``python -X importtime``."""
+    result = subprocess.run([sys.executable, "-X", "importtime", MAIN, *args], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)", line)
+        if match and len(match.group(2)) <= 2:
+            imports.append((match.group(3), int(match.group(1)) / 1000))
+    return [{"module": name, "ms": round(ms, 1)} for name, ms in sorted(imports, key=lambda i: -i[1])[:top]]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--imports", action="store_true", help="Also list the slowest top-level imports")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per command")
+    args = parser.parse_args()
+
+    cache_path = os.path.join(tempfile.mkdtemp(prefix="bench-startup-"), "cache.db")
+    prefill_cache(cache_path)
+    env = child_env(cache_path)
+
+    for name, command in COMMANDS.items():
+        result = {"command": name, "runs": args.runs, **time_command(command, env, args.runs)}
+        if args.imports:
+            result["slowest_imports"] = slowest_imports(command, env, top=8)
+        if args.json:
+            print(json.dumps(result))
+            continue
+        print(f"{name:15} min={result['min_ms']:7.1f}ms  median={result['median_ms']:7.1f}ms  max={result['max_ms']:7.1f}ms")
+        for item in result.get("slowest_imports", []):
+            print(f"    {item['module']:30} {item['ms']:7.1f}ms")
+
+if __name__ == "__main__":
+    main()
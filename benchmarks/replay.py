@@ -0,0 +1,236 @@
+"""Offline stand-ins for RapidAPI and OpenAI built from recorded payloads.
+
+ReplayAdapter is a requests transport adapter that answers searchDestination,
+searchHotels and getHotelDetails from the JSON files in ``fixtures/``, and
+searchHotelsByCoordinates from a synthetic grid of hotels, with
+configurable latency and error rate. FakeOpenAIClient answers chat
+completions in the format OpenAIAPI expects. Both count the calls they
+receive so benchmarks can report upstream traffic.
+"""
+import copy
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+# The API classes refuse to start without keys; replayed calls never use them
+os.environ.setdefault("RAPIDAPI_KEY", "replay")
+os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+def load_fixture(name: str) -> dict:
+    with open(FIXTURES_DIR / f"{name}.json") as f:
+        return json.load(f)
+
+# Synthetic hotels for coordinate searches sit on a grid of this many degrees
+NEARBY_GRID_DEGREES = 0.005
+NEARBY_PAGE_SIZE = 20
+
+def _stable_id(text: str) -> int:
+    return zlib.crc32(text.strip().lower().encode())
+
+class CallCounter:
+    """Thread-safe count of upstream calls per endpoint."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def add(self, endpoint: str):
+        with self.lock:
+            self.counts[endpoint] += 1
+
+    def snapshot(self) -> Counter:
+        with self.lock:
+            return Counter(self.counts)
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+
+class ReplayAdapter(BaseAdapter):
+    """Serve recorded Booking.com payloads instead of calling RapidAPI.
+
+    Every destination gets its own dest_id and every page its own hotel
+    IDs, so caching and deduplication behave as they would against the
+    live API. ``pages`` controls how many result pages a city has.
+    """
+
+    def __init__(self,
+                 latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0,
+                 error_rate: float = 0.0,
+                 pages: int = 3,
+                 seed: int = 0,
+                 counter: CallCounter = None):
+        super().__init__()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.pages = pages
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.counter = counter or CallCounter()
+        self.destinations = load_fixture("searchDestination")
+        self.search_page = load_fixture("searchHotels")
+        self.details = load_fixture("getHotelDetails")
+        # Serialized once; per-request variations are made with string substitution
+        self.search_page_text = json.dumps(self.search_page)
+        self.details_text = json.dumps(self.details)
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        endpoint = url.path.rsplit("/", 1)[-1]
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.counter.add(endpoint)
+
+        with self.random_lock:
+            delay = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) / 1000
+            failed = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+
+        if failed:
+            return self._response(request, 503, b'{"message": "Service Unavailable"}')
+        return self._response(request, 200, self._payload(endpoint, params).encode())
+
+    def _payload(self, endpoint: str, params: dict) -> str:
+        if endpoint == "searchDestination":
+            payload = copy.deepcopy(self.destinations)
+            payload["data"][0]["dest_id"] = str(-_stable_id(params.get("query", "")))
+            payload["data"][0]["name"] = params.get("query", "")
+            return json.dumps(payload)
+
+        if endpoint == "searchHotels":
+            page = int(params.get("page_number", 1))
+            if page > self.pages:
+                return json.dumps({"status": True, "message": "Success", "data": {"hotels": [], "meta": []}})
+            # Hotel IDs 1000-1019 in the recording become unique per city and page
+            base = (_stable_id(params.get("dest_id", "")) % 100_000) * 1000 + page * 100
+            return re.sub(r'("(?:hotel_id|id)": )10(\d\d)\b',
+                          lambda m: f"{m.group(1)}{base + int(m.group(2))}", self.search_page_text)
+
+        if endpoint == "getHotelDetails":
+            hotel_id = params.get("hotel_id", "0")
+            text = self.details_text.replace('"hotel_id": 1000', f'"hotel_id": {int(hotel_id)}')
+            return text.replace('"hotel_name": "Grand Hotel"', f'"hotel_name": "Hotel {hotel_id}"')
+
+        if endpoint == "searchHotelsByCoordinates":
+            return json.dumps(self._nearby_page(params))
+
+        return json.dumps({"status": False, "message": f"Unknown endpoint {endpoint}"})
+
+    def _nearby_page(self, params: dict) -> dict:
+        """One page of grid hotels within the radius, nearest first, shaped like the live endpoint."""
+        latitude, longitude = float(params["latitude"]), float(params["longitude"])
+        radius_km = float(params.get("radius", 2))
+        page = int(params.get("page_number", 1))
+        step = NEARBY_GRID_DEGREES
+        span = math.ceil(radius_km / 111.0 / step) + 1
+        lon_span = math.ceil(span / max(math.cos(math.radians(latitude)), 0.01))
+        row0, column0 = round(latitude / step), round(longitude / step)
+
+        points = []
+        for row in range(row0 - span, row0 + span + 1):
+            for column in range(column0 - lon_span, column0 + lon_span + 1):
+                lat, lon = row * step, column * step
+                dy = math.radians(lat - latitude) * 6371.0
+                dx = math.radians(lon - longitude) * 6371.0 * math.cos(math.radians(latitude))
+                distance = math.hypot(dx, dy)
+                if distance <= radius_km:
+                    points.append((distance, row, column))
+        points.sort()
+
+        recorded = self.search_page["data"]["hotels"]
+        result = []
+        for distance, row, column in points[(page - 1) * NEARBY_PAGE_SIZE:page * NEARBY_PAGE_SIZE]:
+            source = recorded[(row * 31 + column) % len(recorded)]["property"]
+            result.append({
+                "hotel_id": 5_000_000 + _stable_id(f"{row}:{column}") % 1_000_000_000,
+                "hotel_name": f"{source['name']} {row}:{column}",
+                "latitude": row * step,
+                "longitude": column * step,
+                "distance": f"{distance:.2f}",
+                "review_score": source.get("reviewScore"),
+                "review_score_word": source.get("reviewScoreWord"),
+                "review_nr": source.get("reviewCount"),
+                "currencycode": "USD",
+                "composite_price_breakdown": {
+                    "gross_amount_per_night": source["priceBreakdown"]["grossPrice"]
+                }
+            })
+        return {"status": True, "message": "Success", "data": {"result": result}}
+
+    @staticmethod
+    def _response(request, status_code: int, content: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+        response.url = request.url
+        response.request = request
+        response.encoding = "utf-8"
+        return response
+
+    def close(self):
+        pass
+
+class FakeOpenAIClient:
+    """Minimal stand-in for ``openai.OpenAI`` answering ranking prompts.
+
+    Every destination in a prompt is answered with its first three hotel
+    indices. Token counts are estimated at four characters per token.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, error_rate: float = 0.0, seed: int = 0, counter: CallCounter = None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.counter = counter or CallCounter()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: list, **kwargs):
+        self.counter.add("chat.completions")
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.random.random() < self.error_rate:
+            raise RuntimeError("replayed OpenAI error")
+
+        prompt = "".join(message["content"] for message in messages)
+        sections = re.findall(r"Destination (\d+):", prompt) or ["0"]
+        content = "\n".join(f"{number}: 0, 1, 2" for number in sections)
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = len(content) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens
+            )
+        )
+
+def install(booking_api, adapter: ReplayAdapter, openai_api=None, openai_client: FakeOpenAIClient = None):
+    """Route a BookingAPI (and optionally an OpenAIAPI) to the replay stand-ins."""
+    booking_api.http.session.mount("https://", adapter)
+    booking_api.http.session.mount("http://", adapter)
+    if openai_api is not None and openai_client is not None:
+        openai_api.client = openai_client
@@ -0,0 +1,677 @@
+import asyncio
+import os
+import sqlite3
+import time
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, Any, List, Optional, Tuple
+from dotenv import load_dotenv
+from rich.console import Console
+from api.async_http_client import AsyncHttpClient
+from api.circuit_breaker import CircuitBreakers, CircuitOpenError, breaker_settings
+from api.decoding import loads
+from api.tracing import tracer
+from api.booking_api import (
+    BASE_URL,
+    DEFAULT_DESTINATION_TIMEOUT,
+    DEFAULT_MAX_IN_FLIGHT,
+    DEFAULT_MAX_RESULTS,
+    DEFAULT_NEARBY_RADIUS_KM,
+    DEFAULT_RANKER,
+    DESTINATION_MAX_STALE,
+    DESTINATION_TTL,
+    HOTEL_DETAILS_MAX_STALE,
+    HOTEL_DETAILS_TTL,
+    LocationResults,
+    MAX_NEARBY_PAGES,
+    MAX_PAGES,
+    NearbySweep,
+    RANKERS,
+    SEARCH_MAX_STALE,
+    SEARCH_TTL,
+    background_refresh,
+    build_details_params,
+    build_hotel_record,
+    build_nearby_params,
+    build_search_params,
+    cached_hotels,
+    candidate_hotel_id,
+    count_nights,
+    default_amenity_index,
+    default_geo_index,
+    destination_cache_key,
+    details_amenities,
+    hotel_details_cache_key,
+    hotel_location,
+    hotels_entry,
+    indexed_records,
+    http_settings,
+    nearby_area_covered,
+    nearby_cache_key,
+    nearby_candidates,
+    nearby_records,
+    order_by_amenities,
+    page_candidates,
+    parse_destination_id,
+    parse_hotel_details,
+    parse_nearby_hotels,
+    parse_search_page,
+    rank_locally,
+    rapidapi_headers,
+    read_cache,
+    read_last_known,
+    search_cache_key,
+    validate_nearby,
+    write_cache,
+)
+from api.ranking import LocalRanker
+from api.single_flight import AsyncSingleFlight
+from models.amenity_index import AmenityIndex
+from models.cache import Cache
+from models.geo_index import GeoIndex
+from models.hotel import Hotel
+
+if TYPE_CHECKING:
+    from api.async_openai_api import AsyncOpenAIAPI
+
+load_dotenv()
+console = Console()
+
+class AsyncBookingAPI:
+    """Coroutine version of BookingAPI for use inside an asyncio service.
+
+    Pass one ``httpx.AsyncClient`` as ``client`` to share its connection pool
+    with the OpenAI backend and the rest of the service. The cache is the
+    same SQLite-backed Cache used by BookingAPI; its reads are served from
+    memory or a local WAL-mode file and are cheap enough to run on the event
+    loop. Everything that writes to SQLite (cache flushes and the amenity
+    and geo indexes) runs on a single writer thread instead, so lock waits
+    never stall other coroutines.
+    """
+
+    def __init__(self,
+                 max_in_flight: Optional[int] = None,
+                 cache: Optional[Cache] = None,
+                 client: Optional[httpx.AsyncClient] = None,
+                 openai_api: Optional["AsyncOpenAIAPI"] = None,
+                 amenity_index: Optional[AmenityIndex] = None,
+                 geo_index: Optional[GeoIndex] = None):
+        self.base_url = BASE_URL
+        self.headers = rapidapi_headers()
+        # Global limit on in-flight RapidAPI requests across all coroutines
+        self.max_in_flight = max_in_flight or int(os.getenv("BOOKING_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+        self.max_nearby_pages = int(os.getenv("BOOKING_MAX_NEARBY_PAGES", MAX_NEARBY_PAGES))
+        self._request_slots: Optional[asyncio.Semaphore] = None
+        self.cache = cache
+        self.amenity_index = amenity_index or default_amenity_index(cache)
+        self.geo_index = geo_index or default_geo_index(cache)
+        self.http = AsyncHttpClient(self.headers, client=client, pool_size=self.max_in_flight, **http_settings())
+        self._openai_api = openai_api
+        # Identical lookups running at the same time share one upstream call
+        self._in_flight = AsyncSingleFlight()
+        # One breaker per endpoint, as in BookingAPI
+        self.breakers = CircuitBreakers(**breaker_settings("BOOKING"))
+        # Background refreshes started by stale reads, by cache key
+        self._refreshing: Dict[str, "asyncio.Task"] = {}
+        self.local_ranker = LocalRanker()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="booking-writer")
+        self._flush_scheduled = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.http.aclose()
+        if self.cache is not None:
+            await self._write(self.cache.flush)
+        self._writer.shutdown(wait=False)
+
+    async def _write(self, fn: Callable[..., Any], *args) -> Any:
+        """Run a SQLite write on the writer thread and wait for it."""
+        return await asyncio.get_running_loop().run_in_executor(self._writer, fn, *args)
+
+    def _schedule_flush(self):
+        """Commit buffered cache writes on the writer thread, once one is due."""
+        if self._flush_scheduled or not self.cache.flush_due():
+            return
+        self._flush_scheduled = True
+
+        def flush():
+            try:
+                self.cache.flush()
+            except sqlite3.Error as e:
+                console.print(f"[yellow]Cache flush failed: {str(e)}[/yellow]")
+            finally:
+                self._flush_scheduled = False
+
+        self._writer.submit(flush)
+
+    @property
+    def openai_api(self) -> "AsyncOpenAIAPI":
+        """OpenAI ranker sharing this instance's HTTP client and cache."""
+        if self._openai_api is None:
+            from api.async_openai_api import AsyncOpenAIAPI
+            self._openai_api = AsyncOpenAIAPI(cache=self.cache, http_client=self.http.client)
+        return self._openai_api
+
+    async def _get(self, endpoint: str, params: Dict[str, Any]) -> httpx.Response:
+        """Send a GET request to the API once a request slot is free.
+
+        Raises CircuitOpenError without calling the API while the endpoint's
+        breaker is open.
+        """
+        # Created lazily so that it belongs to the running event loop
+        if self._request_slots is None:
+            self._request_slots = asyncio.Semaphore(self.max_in_flight)
+        name = f"rapidapi.{endpoint.rsplit('/', 1)[-1]}"
+        breaker = self.breakers.get(name)
+        breaker.allow()
+        with tracer.span(name) as span:
+            ok = False
+            started = time.perf_counter()
+            try:
+                async with self._request_slots:
+                    started = time.perf_counter()
+                    response = await self.http.get(endpoint, params=params)
+                ok = response.status_code < 500 and response.status_code != 429
+            except asyncio.CancelledError:
+                # Timeouts and callers giving up say nothing about the endpoint
+                breaker.cancel()
+                raise
+            except BaseException:
+                breaker.record(False, time.perf_counter() - started)
+                raise
+            breaker.record(ok, time.perf_counter() - started)
+            span.set(status=response.status_code, bytes=len(response.content))
+            return response
+
+    def _cache_get(self, key: str,
+                   max_stale: Optional[timedelta] = None,
+                   refresh: Optional[Callable[[], Awaitable[Any]]] = None):
+        """Read a value from the cache; see BookingAPI._cache_get."""
+        if self.cache is None:
+            return None
+        value, stale = read_cache(self.cache, key, max_stale, flush=False)
+        self._schedule_flush()
+        if stale and refresh is not None:
+            self._refresh_in_background(key, refresh)
+        return value
+
+    def _last_known(self, key: str) -> Any:
+        """Whatever the cache still holds for a key, however long ago it expired."""
+        value = read_last_known(self.cache, key, flush=False)
+        if self.cache is not None:
+            self._schedule_flush()
+        return value
+
+    async def _index_locations(self, hotels: list):
+        if self.geo_index is not None:
+            locations = [location for location in map(hotel_location, hotels) if location is not None]
+            await self._write(self.geo_index.add, locations)
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        """Run ``fetch`` for a stale key as a task, once per key at a time."""
+        if key in self._refreshing:
+            return
+
+        async def run():
+            try:
+                with background_refresh():
+                    await self._in_flight.do(key, fetch)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.ensure_future(run())
+
+    def _cache_set(self, key: str, value: Any, ttl):
+        """Store a value in memory now; it reaches SQLite with the next flush."""
+        if self.cache is not None:
+            write_cache(self.cache, key, value, ttl, flush=False)
+            self._schedule_flush()
+
+    @tracer.traced("booking.search_hotels")
+    async def search_hotels(self,
+                            destination: str,
+                            checkin_date: str,
+                            checkout_date: str,
+                            adults_number: int,
+                            room_number: int = 1,
+                            max_price: float = None,
+                            max_results: Optional[int] = None,
+                            preferences: Optional[str] = None) -> Dict[str, Any]:
+        """Search for hotels in a specific destination, across result pages."""
+        if max_results is None:
+            max_results = int(os.getenv("BOOKING_MAX_RESULTS", DEFAULT_MAX_RESULTS))
+        cache_key = search_cache_key(destination, checkin_date, checkout_date, adults_number, room_number,
+                                     max_price, max_results, preferences)
+        def fetch():
+            return self._fetch_hotels(cache_key, destination, checkin_date, checkout_date, adults_number,
+                                      room_number, max_price, max_results, preferences)
+
+        cached = self._cache_get(cache_key, SEARCH_MAX_STALE, fetch)
+        if cached is not None:
+            return {"results": cached_hotels(cached)}
+
+        try:
+            results = await self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError as e:
+            cached = self._last_known(cache_key)
+            if cached is None:
+                console.print(f"[yellow]{str(e)}; no cached results for {destination}[/yellow]")
+                return {"results": []}
+            console.print(f"[yellow]{str(e)}; showing cached results for {destination}[/yellow]")
+            return {"results": cached_hotels(cached), "stale": True}
+        return {"results": list(results["results"])}
+
+    async def _fetch_hotels(self,
+                            cache_key: str,
+                            destination: str,
+                            checkin_date: str,
+                            checkout_date: str,
+                            adults_number: int,
+                            room_number: int,
+                            max_price: Optional[float],
+                            max_results: int,
+                            preferences: Optional[str] = None) -> Dict[str, Any]:
+        """Search for hotels upstream and cache the results."""
+        results = []
+        try:
+            async for hotel_data in self._iter_hotels(destination, checkin_date, checkout_date, adults_number,
+                                                      room_number, max_price, max_results, preferences=preferences):
+                results.append(hotel_data)
+        except CircuitOpenError:
+            if not results:
+                raise
+            return {"results": results}
+        except httpx.HTTPError as e:
+            console.print(f"[red]Error making API request: {str(e)}[/red]")
+            return {"results": results}
+
+        if results:
+            self._cache_set(cache_key, hotels_entry(results), SEARCH_TTL)
+        return {"results": results}
+
+    async def iter_hotels(self,
+                          destination: str,
+                          checkin_date: str,
+                          checkout_date: str,
+                          adults_number: int,
+                          room_number: int = 1,
+                          max_price: float = None,
+                          limit: Optional[int] = None,
+                          max_pages: int = MAX_PAGES,
+                          preferences: Optional[str] = None) -> AsyncIterator[Hotel]:
+        """Yield hotels page by page as soon as each is enriched; see BookingAPI.iter_hotels."""
+        hotels = self._iter_hotels(destination, checkin_date, checkout_date, adults_number,
+                                   room_number, max_price, limit, max_pages, preferences)
+        try:
+            async for hotel_data in hotels:
+                yield hotel_data
+        except CircuitOpenError as e:
+            console.print(f"[yellow]{str(e)}[/yellow]")
+        except httpx.HTTPError as e:
+            console.print(f"[red]Error making API request: {str(e)}[/red]")
+        finally:
+            # Cancels its lookups now rather than whenever it is garbage collected
+            await hotels.aclose()
+
+    async def _iter_hotels(self,
+                           destination: str,
+                           checkin_date: str,
+                           checkout_date: str,
+                           adults_number: int,
+                           room_number: int,
+                           max_price: Optional[float],
+                           limit: Optional[int],
+                           max_pages: int = MAX_PAGES,
+                           preferences: Optional[str] = None) -> AsyncIterator[Hotel]:
+        dest_id = await self._get_destination_id(destination)
+        if not dest_id:
+            return
+
+        num_nights = count_nights(checkin_date, checkout_date)
+
+        async def fetch_page(page_number: int) -> Optional[list]:
+            params = build_search_params(dest_id, checkin_date, checkout_date, adults_number,
+                                         room_number, max_price, num_nights, page_number)
+            response = await self._get(f"{self.base_url}/hotels/searchHotels", params)
+            response.raise_for_status()
+            hotels = parse_search_page(loads(response.content))
+            if hotels is None:
+                return None
+            await self._index_locations(hotels)
+            return hotels
+
+        yielded = 0
+        page_number = 1
+        next_page = asyncio.ensure_future(fetch_page(page_number))
+        # Detail lookups started for the current page
+        details: List[asyncio.Future] = []
+        try:
+            while next_page is not None:
+                hotels = await next_page
+                if hotels is None:
+                    if page_number == 1:
+                        console.print("[red]No hotels found for the given criteria[/red]")
+                    return
+
+                candidates = page_candidates(hotels, num_nights, room_number, max_price,
+                                             None if limit is None else limit - yielded,
+                                             self.amenity_index, preferences)
+
+                # Start on the next page while this one is being enriched
+                page_number += 1
+                more_needed = limit is None or yielded + len(candidates) < limit
+                next_page = (asyncio.ensure_future(fetch_page(page_number))
+                             if hotels and page_number <= max_pages and more_needed else None)
+
+                details = [
+                    asyncio.ensure_future(self.get_hotel_details(candidate_hotel_id(candidate), checkin_date, checkout_date))
+                    for candidate in candidates
+                ]
+                for candidate, hotel_details in zip(candidates, details):
+                    yield build_hotel_record(candidate, await hotel_details, num_nights, room_number)
+                    yielded += 1
+        finally:
+            # A consumer that stops early must not leave requests running
+            pending = [task for task in [next_page, *details] if task is not None and not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    @tracer.traced("booking.destination_id")
+    async def _get_destination_id(self, query: str) -> Optional[str]:
+        """Get destination ID from location search."""
+        cache_key = destination_cache_key(query)
+        fetch = lambda: self._fetch_destination_id(cache_key, query)
+        cached = self._cache_get(cache_key, DESTINATION_MAX_STALE, fetch)
+        if cached is not None:
+            return cached
+
+        try:
+            return await self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError:
+            dest_id = self._last_known(cache_key)
+            if dest_id is None:
+                raise
+            return dest_id
+
+    async def _fetch_destination_id(self, cache_key: str, query: str) -> Optional[str]:
+        """Look up a destination ID upstream and cache it."""
+        endpoint = f"{self.base_url}/hotels/searchDestination"
+        try:
+            response = await self._get(endpoint, {"query": query})
+            response.raise_for_status()
+            dest_id = parse_destination_id(loads(response.content))
+            if dest_id:
+                self._cache_set(cache_key, dest_id, DESTINATION_TTL)
+                return dest_id
+
+            console.print(f"[red]No destination found for: {query}[/red]")
+            return None
+
+        except httpx.HTTPError as e:
+            console.print(f"[red]Error searching destination: {str(e)}[/red]")
+            return None
+
+    @tracer.traced("booking.hotel_details")
+    async def get_hotel_details(self, hotel_id: str, arrival_date: str, departure_date: str) -> Dict[str, Any]:
+        """Get detailed information about a specific hotel."""
+        cache_key = hotel_details_cache_key(hotel_id, arrival_date, departure_date)
+        fetch = lambda: self._fetch_hotel_details(cache_key, hotel_id, arrival_date, departure_date)
+        cached = self._cache_get(cache_key, HOTEL_DETAILS_MAX_STALE, fetch)
+        if cached is not None:
+            return cached
+
+        try:
+            return await self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError:
+            details = self._last_known(cache_key)
+            return {**details, "stale": True} if details else {}
+
+    async def _fetch_hotel_details(self, cache_key: str, hotel_id: str, arrival_date: str, departure_date: str) -> Dict[str, Any]:
+        """Get hotel details upstream and cache them."""
+        endpoint = f"{self.base_url}/hotels/getHotelDetails"
+        try:
+            response = await self._get(endpoint, build_details_params(hotel_id, arrival_date, departure_date))
+            response.raise_for_status()
+            data = loads(response.content)
+
+            if not data or 'data' not in data:
+                console.print("[red]No details found for this hotel[/red]")
+                return {}
+
+            details = parse_hotel_details(data['data'])
+            self._cache_set(cache_key, details, HOTEL_DETAILS_TTL)
+            if self.amenity_index is not None:
+                await self._write(self.amenity_index.add, hotel_id, details_amenities(details))
+            return details
+
+        except httpx.HTTPError as e:
+            console.print(f"[red]Error fetching hotel details: {str(e)}[/red]")
+            return {}
+
+    @tracer.traced("booking.search_nearby")
+    async def search_nearby(self,
+                            latitude: float,
+                            longitude: float,
+                            checkin_date: str,
+                            checkout_date: str,
+                            adults_number: int = 2,
+                            room_number: int = 1,
+                            radius_km: float = DEFAULT_NEARBY_RADIUS_KM,
+                            max_price: float = None,
+                            max_results: Optional[int] = None,
+                            preferences: Optional[str] = None) -> Dict[str, Any]:
+        """Search for hotels within ``radius_km`` of a point; see BookingAPI.search_nearby."""
+        validate_nearby(latitude, longitude, radius_km, checkin_date, checkout_date)
+        if max_results is None:
+            max_results = int(os.getenv("BOOKING_MAX_RESULTS", DEFAULT_MAX_RESULTS))
+        cache_key = nearby_cache_key(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                     adults_number, room_number, max_price, max_results, preferences)
+
+        def fetch():
+            return self._fetch_nearby(cache_key, latitude, longitude, radius_km, checkin_date, checkout_date,
+                                      adults_number, room_number, max_price, max_results, preferences)
+
+        cached = self._cache_get(cache_key, SEARCH_MAX_STALE, fetch)
+        if cached is not None:
+            return {"results": cached_hotels(cached), "source": "cache"}
+
+        try:
+            results = await self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError as e:
+            cached = self._last_known(cache_key)
+            if cached is not None:
+                console.print(f"[yellow]{str(e)}; showing cached results[/yellow]")
+                return {"results": cached_hotels(cached), "source": "cache", "stale": True}
+            if self.geo_index is None:
+                console.print(f"[yellow]{str(e)}; no cached results[/yellow]")
+                return {"results": [], "source": "api"}
+            console.print(f"[yellow]{str(e)}; showing the hotels indexed so far[/yellow]")
+            hotels = await self._nearby_from_index(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                                   count_nights(checkin_date, checkout_date), room_number,
+                                                   max_price, max_results, preferences)
+            return {"results": hotels, "source": "index", "stale": True}
+        return {"results": list(results["results"]), "source": results["source"]}
+
+    async def _fetch_nearby(self,
+                            cache_key: str,
+                            latitude: float,
+                            longitude: float,
+                            radius_km: float,
+                            checkin_date: str,
+                            checkout_date: str,
+                            adults_number: int,
+                            room_number: int,
+                            max_price: Optional[float],
+                            max_results: int,
+                            preferences: Optional[str]) -> Dict[str, Any]:
+        num_nights = count_nights(checkin_date, checkout_date)
+        if nearby_area_covered(self.geo_index, latitude, longitude, radius_km):
+            source = "index"
+            hotels = await self._nearby_from_index(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                                   num_nights, room_number, max_price, max_results, preferences)
+        else:
+            source = "api"
+            try:
+                hotels = await self._nearby_from_api(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                                     num_nights, adults_number, room_number, max_price,
+                                                     max_results, preferences)
+            except httpx.HTTPError as e:
+                console.print(f"[red]Error making API request: {str(e)}[/red]")
+                return {"results": [], "source": source}
+        tracer.annotate(source=source)
+
+        if hotels:
+            self._cache_set(cache_key, hotels_entry(hotels), SEARCH_TTL)
+        return {"results": hotels, "source": source}
+
+    async def _nearby_from_api(self,
+                               latitude: float,
+                               longitude: float,
+                               radius_km: float,
+                               checkin_date: str,
+                               checkout_date: str,
+                               num_nights: int,
+                               adults_number: int,
+                               room_number: int,
+                               max_price: Optional[float],
+                               max_results: int,
+                               preferences: Optional[str]) -> List[Hotel]:
+        sweep = NearbySweep(latitude, longitude, radius_km)
+        capped = False
+        for page_number in range(1, self.max_nearby_pages + 1):
+            params = build_nearby_params(latitude, longitude, sweep.sweep_km, checkin_date, checkout_date,
+                                         adults_number, room_number, page_number)
+            response = await self._get(f"{self.base_url}/hotels/searchHotelsByCoordinates", params)
+            response.raise_for_status()
+            if not sweep.add(parse_nearby_hotels(loads(response.content))):
+                break
+        else:
+            capped = True
+
+        hotels = sweep.hotels
+        await self._index_locations(hotels)
+        area = sweep.covered_area(capped)
+        if area is not None and self.geo_index is not None:
+            await self._write(self.geo_index.mark_covered, *area)
+        if not hotels:
+            console.print("[red]No hotels found near the given location[/red]")
+            return []
+
+        candidates, distances = nearby_candidates(hotels, latitude, longitude, radius_km, num_nights, room_number,
+                                                  max_price, max_results, self.amenity_index, preferences)
+        all_details = await asyncio.gather(*(
+            self.get_hotel_details(candidate_hotel_id(candidate), checkin_date, checkout_date)
+            for candidate in candidates
+        ))
+        return nearby_records(candidates, all_details, distances, num_nights, room_number)
+
+    async def _nearby_from_index(self,
+                                 latitude: float,
+                                 longitude: float,
+                                 radius_km: float,
+                                 checkin_date: str,
+                                 checkout_date: str,
+                                 num_nights: int,
+                                 room_number: int,
+                                 max_price: Optional[float],
+                                 max_results: int,
+                                 preferences: Optional[str]) -> List[Hotel]:
+        nearby = order_by_amenities(self.geo_index.within(latitude, longitude, radius_km),
+                                    self.amenity_index, preferences, hotel_id=lambda item: item[0].hotel_id)
+        results = []
+        # Enough details are requested at once to fill the results if all are within budget
+        start = 0
+        while start < len(nearby) and len(results) < max_results:
+            batch = nearby[start:start + max_results - len(results)]
+            start += len(batch)
+            all_details = await asyncio.gather(*(
+                self.get_hotel_details(location.hotel_id, checkin_date, checkout_date) for location, _ in batch
+            ))
+            results.extend(indexed_records(batch, all_details, num_nights, room_number, max_price))
+        results.sort(key=lambda hotel: hotel.distance_km)
+        return results
+
+    @tracer.traced("booking.search_multiple_locations")
+    async def search_multiple_locations(self,
+                                        destinations: List[str],
+                                        checkin_date: str,
+                                        checkout_date: str,
+                                        adults_number: int,
+                                        room_number: int = 1,
+                                        max_price: float = None,
+                                        preferences: str = None,
+                                        timeout: Optional[float] = None,
+                                        on_result: Optional[Callable[[str, list], None]] = None,
+                                        ranker: str = DEFAULT_RANKER,
+                                        max_results: Optional[int] = None) -> Dict[str, Any]:
+        """Search for hotels in multiple destinations concurrently and rank them.
+
+        Behaves like BookingAPI.search_multiple_locations: each destination
+        gets at most ``timeout`` seconds, ``on_result`` is called as soon
+        as each destination is done and destinations answered from cached
+        results are listed under ``stale``.
+        """
+        if ranker not in RANKERS:
+            raise ValueError(f"Unknown ranker '{ranker}', expected one of: {', '.join(RANKERS)}")
+        if timeout is None:
+            timeout = float(os.getenv("BOOKING_DESTINATION_TIMEOUT", DEFAULT_DESTINATION_TIMEOUT))
+        destinations = list(dict.fromkeys(destinations))
+
+        async def search_destination(destination: str):
+            try:
+                placed, unordered, from_cache = await asyncio.wait_for(
+                    self._search_and_rank_destination(
+                        destination, checkin_date, checkout_date, adults_number,
+                        room_number, max_price, preferences, ranker, max_results
+                    ),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                console.print(f"[yellow]Search for {destination} timed out after {timeout:g}s[/yellow]")
+                placed, unordered, from_cache = [], [], False
+            except Exception as e:
+                console.print(f"[red]Error searching {destination}: {str(e)}[/red]")
+                placed, unordered, from_cache = [], [], False
+            return destination, placed, unordered, from_cache
+
+        results = LocationResults(destinations, on_result)
+        for next_done in asyncio.as_completed([search_destination(d) for d in destinations]):
+            results.add(*await next_done)
+
+        # One OpenAI request covers every destination that needs it
+        if results.needs_model:
+            results.apply_model_order(await self.openai_api.rank_destinations(results.model_request(), preferences))
+        return results.to_dict()
+
+    async def _search_and_rank_destination(self,
+                                           destination: str,
+                                           checkin_date: str,
+                                           checkout_date: str,
+                                           adults_number: int,
+                                           room_number: int,
+                                           max_price: Optional[float],
+                                           preferences: Optional[str],
+                                           ranker: str,
+                                           max_results: Optional[int] = None) -> Tuple[list, list, bool]:
+        """Search a single destination and rank it as far as possible locally."""
+        results = await self.search_hotels(
+            destination=destination,
+            checkin_date=checkin_date,
+            checkout_date=checkout_date,
+            adults_number=adults_number,
+            room_number=room_number,
+            max_price=max_price,
+            max_results=max_results,
+            preferences=preferences
+        )
+        with tracer.span("rank.local", ranker=ranker):
+            placed, unordered = rank_locally(self.local_ranker, results.get('results', []), preferences, ranker)
+        return placed, unordered, results.get('stale', False)
@@ -0,0 +1,58 @@
+import asyncio
+import httpx
+from typing import Any, Dict, Optional
+from api.http_client import RETRY_STATUS_CODES, RetryPolicy, TokenBucket
+
+class AsyncHttpClient:
+    """Async counterpart of HttpClient built on a shared httpx.AsyncClient.
+
+    Headers are sent with every request rather than set on the client, so
+    one ``httpx.AsyncClient`` (and its connection pool) can be shared with
+    other backends.
+    """
+
+    def __init__(self,
+                 headers: Dict[str, str],
+                 client: Optional[httpx.AsyncClient] = None,
+                 pool_size: int = 10,
+                 connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 rate_limit: float = 5.0,
+                 burst: int = 10):
+        self.headers = headers
+        self._owns_client = client is None
+        self.client = client or httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.retry = RetryPolicy(max_retries, backoff_base, backoff_max)
+        self.bucket = TokenBucket(rate_limit, burst)
+
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """Send a GET request, retrying connection errors, 429s and 5xx responses."""
+        attempt = 0
+        while True:
+            await self.bucket.acquire_async()
+            try:
+                response = await self.client.get(url, params=params, headers=self.headers, timeout=self.timeout)
+            except httpx.TransportError:
+                if attempt >= self.retry.max_retries:
+                    raise
+                await asyncio.sleep(self.retry.backoff(attempt))
+                attempt += 1
+                continue
+
+            self.retry.observe(self.bucket, response.status_code, response.headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retry.max_retries:
+                return response
+
+            await asyncio.sleep(self.retry.retry_delay(attempt, response.status_code, response.headers))
+            attempt += 1
+
+    async def aclose(self):
+        """Close the underlying client if this instance created it."""
+        if self._owns_client:
+            await self.client.aclose()
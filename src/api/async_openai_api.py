@@ -0,0 +1,72 @@
+import asyncio
+import os
+import time
+import httpx
+from openai import AsyncOpenAI
+from typing import List, Dict, Optional
+from rich.console import Console
+from dotenv import load_dotenv
+from api.openai_api import RANKING_MODEL, RankingBatch, UsageLog, openai_breakers, usage_record
+from api.tracing import tracer
+from models.cache import Cache
+from models.hotel import Hotel
+
+load_dotenv()
+console = Console()
+
+class AsyncOpenAIAPI:
+    """Coroutine version of OpenAIAPI."""
+
+    def __init__(self, cache: Optional[Cache] = None, http_client: Optional[httpx.AsyncClient] = None):
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        self.client = AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+        self.cache = cache
+        self.usage = UsageLog()
+        self.breakers = openai_breakers()
+
+    async def rank_hotels_by_preferences(self, hotels: List[Hotel], preferences: str) -> List[Hotel]:
+        """Rank hotels based on user preferences using OpenAI."""
+        if not hotels or not preferences:
+            return hotels
+        return (await self.rank_destinations({"": hotels}, preferences))[""]
+
+    @tracer.traced("openai.rank_destinations")
+    async def rank_destinations(self, hotels_by_destination: Dict[str, List[Hotel]], preferences: str) -> Dict[str, List[Hotel]]:
+        """Rank the hotels of several destinations with a single OpenAI request."""
+        batch = RankingBatch(hotels_by_destination, preferences, self.cache)
+        tracer.annotate(cache="miss" if batch.pending else "hit")
+        if not batch.pending:
+            return batch.results
+
+        with tracer.span("openai.chat_completion", destinations=len(batch.pending)) as span:
+            try:
+                breaker = self.breakers.get("openai.chat_completion")
+                breaker.allow()
+                started = time.perf_counter()
+                try:
+                    response = await self.client.chat.completions.create(
+                        model=RANKING_MODEL,
+                        messages=batch.messages(),
+                        max_tokens=batch.max_tokens(),
+                        temperature=0.3
+                    )
+                except asyncio.CancelledError:
+                    breaker.cancel()
+                    raise
+                except Exception:
+                    breaker.record(False, time.perf_counter() - started)
+                    raise
+                breaker.record(True, time.perf_counter() - started)
+                record = usage_record(response, started, batch)
+                self.usage.add(record)
+                span.set(prompt_tokens=record["prompt_tokens"], completion_tokens=record["completion_tokens"])
+                batch.apply_response(response.choices[0].message.content)
+
+            except Exception as e:
+                span.error = True
+                console.print(f"[yellow]Error using OpenAI for ranking: {str(e)}. Using default ranking.[/yellow]")
+                batch.fallback()
+
+        return batch.results
@@ -1,148 +1,1158 @@
 import os
+import threading
+import time
 import requests
-from typing import Dict, Any, Optional
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple
 from dotenv import load_dotenv
 from rich.console import Console
-from datetime import datetime
-from api.openai_api import OpenAIAPI
+from datetime import timedelta
+from api.circuit_breaker import CircuitBreakers, CircuitOpenError, breaker_settings
+from api.decoding import loads
+from api.http_client import HttpClient
+from api.options import (DEFAULT_NEARBY_RADIUS_KM, DEFAULT_RANKER, MAX_NEARBY_RADIUS_KM, RANKERS,
+                         count_nights, default_dates)
+from api.ranking import LocalRanker, parse_preferences, split_at_cutoff
+from api.single_flight import SingleFlight
+from api.tracing import tracer
+from models.amenity_index import AmenityIndex
+from models.cache import Cache, make_cache_key
+from models.geo_index import GeoIndex, HotelLocation, cell_diagonal_km, distance_km
+from models.hotel import Hotel
+
+if TYPE_CHECKING:
+    from api.openai_api import OpenAIAPI
 
 load_dotenv()
 console = Console()
 
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_DESTINATION_TIMEOUT = 60.0
+# Hotels within budget collected per destination before ranking
+DEFAULT_MAX_RESULTS = 20
+# Safety limit on result pages read per destination
+MAX_PAGES = 10
+
+# How long each kind of response may be served from the cache
+DESTINATION_TTL = timedelta(days=30)
+HOTEL_DETAILS_TTL = timedelta(days=3)
+SEARCH_TTL = timedelta(minutes=10)
+# How long past expiry a response may still be served while it is refreshed
+# in the background
+DESTINATION_MAX_STALE = timedelta(days=1)
+HOTEL_DETAILS_MAX_STALE = timedelta(days=1)
+SEARCH_MAX_STALE = timedelta(minutes=30)
+# Threads refreshing stale entries behind the requests that served them
+DEFAULT_REFRESH_WORKERS = 2
+
+# How long an area swept by the nearby endpoint is trusted to have no hotels
+# missing from the geo index
+NEARBY_COVERAGE_TTL = timedelta(days=7)
+# Default limit on result pages read per nearby sweep. A sweep stopped by it
+# only lists the hotels the API returns first, so its area is trusted for
+# less time.
+MAX_NEARBY_PAGES = 10
+NEARBY_PARTIAL_COVERAGE_TTL = timedelta(days=1)
+# Extra distance swept around each nearby search, so that later searches
+# from points close by are covered too
+NEARBY_SWEEP_MARGIN_KM = 1.0
+
+# Hotels the preference ranking keeps per destination
+TOP_K = 3
+
+# Fields of a search result's "property" kept after parsing, besides its gross price
+SEARCH_PROPERTY_FIELDS = ("name", "latitude", "longitude", "reviewScore", "reviewScoreWord", "reviewCount")
+
+BASE_URL = "https://booking-com15.p.rapidapi.com/api/v1"
+RAPIDAPI_HOST = "booking-com15.p.rapidapi.com"
+
+def rapidapi_headers() -> Dict[str, str]:
+    """RapidAPI authentication headers from the environment."""
+    headers = {
+        "X-RapidAPI-Key": os.getenv("RAPIDAPI_KEY"),
+        "X-RapidAPI-Host": RAPIDAPI_HOST
+    }
+    if not headers["X-RapidAPI-Key"]:
+        raise ValueError("RAPIDAPI_KEY not found in environment variables")
+    return headers
+
+def http_settings() -> Dict[str, Any]:
+    """Connection, retry and rate-limit settings for the HTTP client."""
+    return {
+        "connect_timeout": float(os.getenv("BOOKING_CONNECT_TIMEOUT", 5)),
+        "read_timeout": float(os.getenv("BOOKING_READ_TIMEOUT", 30)),
+        "max_retries": int(os.getenv("BOOKING_MAX_RETRIES", 3)),
+        "rate_limit": float(os.getenv("BOOKING_RATE_LIMIT", 5)),
+        "burst": int(os.getenv("BOOKING_RATE_BURST", 10))
+    }
+
+def search_cache_key(destination: str,
+                     checkin_date: str,
+                     checkout_date: str,
+                     adults_number: int,
+                     room_number: int,
+                     max_price: Optional[float],
+                     max_results: int,
+                     preferences: Optional[str] = None) -> str:
+    # Preferences decide which hotels are enriched first, so they are part of the key
+    return make_cache_key("search_hotels", {
+        "destination": destination,
+        "checkin_date": checkin_date,
+        "checkout_date": checkout_date,
+        "adults_number": int(adults_number),
+        "room_number": int(room_number),
+        "max_price": float(max_price) if max_price is not None else None,
+        "max_results": int(max_results),
+        "preferences": ",".join(sorted(set(parse_preferences(preferences)))) or None
+    })
+
+def prices_cache_key(destination: str,
+                     checkin_date: str,
+                     checkout_date: str,
+                     adults_number: int,
+                     room_number: int,
+                     max_price: Optional[float],
+                     max_results: int) -> str:
+    return make_cache_key("search_prices", {
+        "destination": destination,
+        "checkin_date": checkin_date,
+        "checkout_date": checkout_date,
+        "adults_number": int(adults_number),
+        "room_number": int(room_number),
+        "max_price": float(max_price) if max_price is not None else None,
+        "max_results": int(max_results)
+    })
+
+def nearby_cache_key(latitude: float,
+                     longitude: float,
+                     radius_km: float,
+                     checkin_date: str,
+                     checkout_date: str,
+                     adults_number: int,
+                     room_number: int,
+                     max_price: Optional[float],
+                     max_results: int,
+                     preferences: Optional[str] = None) -> str:
+    # Points about 10 m apart share results
+    return make_cache_key("search_nearby", {
+        "latitude": round(float(latitude), 4),
+        "longitude": round(float(longitude), 4),
+        "radius_km": float(radius_km),
+        "checkin_date": checkin_date,
+        "checkout_date": checkout_date,
+        "adults_number": int(adults_number),
+        "room_number": int(room_number),
+        "max_price": float(max_price) if max_price is not None else None,
+        "max_results": int(max_results),
+        "preferences": ",".join(sorted(set(parse_preferences(preferences)))) or None
+    })
+
+def destination_cache_key(query: str) -> str:
+    return make_cache_key("destination_id", {"query": query})
+
+def hotel_details_cache_key(hotel_id: str, arrival_date: str, departure_date: str) -> str:
+    return make_cache_key("hotel_details", {
+        "hotel_id": hotel_id,
+        "arrival_date": arrival_date,
+        "departure_date": departure_date
+    })
+
+def build_search_params(dest_id: str,
+                        checkin_date: str,
+                        checkout_date: str,
+                        adults_number: int,
+                        room_number: int,
+                        max_price: Optional[float],
+                        num_nights: int,
+                        page_number: int = 1) -> Dict[str, str]:
+    """Query parameters for the searchHotels endpoint."""
+    params = {
+        "dest_id": dest_id,
+        "search_type": "CITY",
+        "arrival_date": checkin_date,
+        "departure_date": checkout_date,
+        "adults": str(adults_number),
+        "room_qty": str(room_number),
+        "page_number": str(page_number),
+        "units": "metric",
+        "currency_code": "USD"
+    }
+    
+    # Add price filter if provided, as a price per night
+    if max_price is not None:
+        price_per_night = float(max_price) / num_nights if num_nights > 0 else max_price
+        params["price_min"] = "1"
+        params["price_max"] = str(int(price_per_night))
+    return params
+
+def build_nearby_params(latitude: float,
+                        longitude: float,
+                        radius_km: float,
+                        checkin_date: str,
+                        checkout_date: str,
+                        adults_number: int,
+                        room_number: int,
+                        page_number: int = 1) -> Dict[str, str]:
+    """Query parameters for the searchHotelsByCoordinates endpoint.
+
+    There is no price filter, so that a sweep lists every hotel in the area;
+    the budget is applied to the results instead.
+    """
+    return {
+        "latitude": str(latitude),
+        "longitude": str(longitude),
+        "radius": f"{radius_km:.2f}",
+        "arrival_date": checkin_date,
+        "departure_date": checkout_date,
+        "adults": str(adults_number),
+        "room_qty": str(room_number),
+        "page_number": str(page_number),
+        "units": "metric",
+        "currency_code": "USD"
+    }
+
+def validate_nearby(latitude: float, longitude: float, radius_km: float, checkin_date: str, checkout_date: str):
+    """Raise ValueError for coordinates, radius or dates a nearby search can't use."""
+    if not -90 <= latitude <= 90:
+        raise ValueError(f"Invalid latitude {latitude}, expected -90 to 90")
+    if not -180 <= longitude <= 180:
+        raise ValueError(f"Invalid longitude {longitude}, expected -180 to 180")
+    if not 0 < radius_km <= MAX_NEARBY_RADIUS_KM:
+        raise ValueError(f"Invalid radius {radius_km:g} km, expected more than 0 and at most {MAX_NEARBY_RADIUS_KM:g}")
+    default_dates(checkin_date, checkout_date)
+    if count_nights(checkin_date, checkout_date) <= 0:
+        raise ValueError("Check-out date must be after the check-in date")
+
+def response_data(response: requests.Response) -> Any:
+    """Parsed JSON body of a response.
+
+    A malformed body raises a RequestException, as ``response.json()`` does.
+    """
+    try:
+        return loads(response.content)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(str(e), response=response) from e
+
+def project_search_hotel(hotel: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of a searchHotels result that are read, in the same shape.
+
+    Search results carry photos, badges and several other prices that are
+    never used; only these are kept once a page is parsed.
+    """
+    property_data = hotel.get('property') or {}
+    price_data = (property_data.get('priceBreakdown') or {}).get('grossPrice') or {}
+    projected = {field: property_data[field] for field in SEARCH_PROPERTY_FIELDS if field in property_data}
+    projected['priceBreakdown'] = {'grossPrice': {field: price_data[field] for field in ('value', 'currency')
+                                                  if field in price_data}}
+    return {'hotel_id': hotel.get('hotel_id'), 'property': projected}
+
+def parse_search_page(data: Any) -> Optional[list]:
+    """Projected hotels of a searchHotels response, or None if the response has no data."""
+    if not isinstance(data, dict) or 'data' not in data:
+        return None
+    hotels = (data['data'] or {}).get('hotels') or []
+    return [project_search_hotel(hotel) for hotel in hotels if isinstance(hotel, dict)]
+
+def parse_nearby_hotels(data: Any) -> Optional[list]:
+    """Hotels from a searchHotelsByCoordinates response, in the searchHotels page shape.
+
+    Returns None when the response has no hotel list at all.
+    """
+    if not isinstance(data, dict) or 'data' not in data:
+        return None
+    payload = data['data']
+    if isinstance(payload, dict):
+        payload = payload.get('result', payload.get('hotels'))
+    if not isinstance(payload, list):
+        return None
+
+    hotels = []
+    for item in payload:
+        if not isinstance(item, dict) or item.get('hotel_id') is None:
+            continue
+        if 'property' in item:
+            hotels.append(project_search_hotel(item))
+            continue
+        price = (item.get('composite_price_breakdown') or {}).get('gross_amount_per_night') or {}
+        hotels.append({
+            'hotel_id': item['hotel_id'],
+            'property': {
+                'name': item.get('hotel_name', 'N/A'),
+                'latitude': item.get('latitude'),
+                'longitude': item.get('longitude'),
+                'reviewScore': item.get('review_score'),
+                'reviewScoreWord': item.get('review_score_word') or 'N/A',
+                'reviewCount': item.get('review_nr') or 0,
+                'priceBreakdown': {'grossPrice': {
+                    'value': price.get('value', 'N/A'),
+                    'currency': price.get('currency', item.get('currencycode', 'USD'))
+                }}
+            }
+        })
+    return hotels
+
+def hotel_location(hotel: Dict[str, Any]) -> Optional[HotelLocation]:
+    """Position and review summary of a search result, if it has coordinates."""
+    property_data = hotel.get('property', {})
+    try:
+        latitude, longitude = float(property_data['latitude']), float(property_data['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    score = property_data.get('reviewScore')
+    return HotelLocation(
+        hotel_id=str(hotel.get('hotel_id', '')),
+        latitude=latitude,
+        longitude=longitude,
+        name=property_data.get('name'),
+        score=float(score) if isinstance(score, (int, float)) else None,
+        score_word=property_data.get('reviewScoreWord'),
+        reviews_count=property_data.get('reviewCount')
+    )
+
+def build_details_params(hotel_id: str, arrival_date: str, departure_date: str) -> Dict[str, str]:
+    """Query parameters for the getHotelDetails endpoint."""
+    return {
+        "hotel_id": hotel_id,
+        "arrival_date": arrival_date,
+        "departure_date": departure_date,
+        "currency_code": "USD",
+        "languagecode": "en-us"
+    }
+
+def price_candidates(hotels: list, num_nights: int, room_number: int, max_price: Optional[float]) -> list:
+    """Price every hotel from a search page and drop the ones over budget.
+
+    This only needs the search page itself, so hotels over budget never cost
+    a details request.
+    """
+    candidates = []
+    for hotel in hotels:
+        property_data = hotel.get('property', {})
+        price_data = property_data.get('priceBreakdown', {}).get('grossPrice', {})
+        
+        # Extract price value and calculate total price
+        price_per_night_value = price_data.get('value', 'N/A')
+        total_price = None
+        
+        try:
+            if price_per_night_value != 'N/A':
+                price_per_night_value = float(price_per_night_value)
+                # Calculate total price including all rooms
+                total_price = price_per_night_value * num_nights * room_number
+        except (ValueError, TypeError):
+            pass
+        
+        # Skip hotels with total price higher than budget
+        if max_price is not None and total_price is not None:
+            if total_price > max_price:
+                continue
+        
+        candidates.append((hotel, property_data, price_data, price_per_night_value, total_price))
+    return candidates
+
+def candidate_hotel_id(candidate: tuple) -> str:
+    return str(candidate[0].get('hotel_id', ''))
+
+def default_amenity_index(cache: Optional[Cache]) -> Optional[AmenityIndex]:
+    """Amenity index stored in the cache's database file, if there is a cache."""
+    return AmenityIndex(cache.db_path) if cache is not None else None
+
+def default_geo_index(cache: Optional[Cache]) -> Optional[GeoIndex]:
+    """Geo index stored in the cache's database file, if there is a cache."""
+    return GeoIndex(cache.db_path) if cache is not None else None
+
+def order_by_amenities(candidates: list,
+                       amenity_index: Optional[AmenityIndex],
+                       preferences: Optional[str],
+                       hotel_id: Callable[[Any], str] = candidate_hotel_id) -> list:
+    """Put candidates the amenity index knows to match more preferences first.
+
+    Hotels not indexed yet go after those matching at least one preference
+    and before those known to match none. The order is otherwise kept, so
+    when a page has more candidates than are still needed, the details
+    requests go to the most promising hotels.
+    """
+    if amenity_index is None or not preferences or len(candidates) < 2:
+        return candidates
+    counts = amenity_index.match_counts([hotel_id(c) for c in candidates], preferences)
+    def sort_key(candidate):
+        count = counts.get(hotel_id(candidate))
+        return -(0.5 if count is None else count)
+    return sorted(candidates, key=sort_key)
+
+def nearby_candidates(hotels: list,
+                      latitude: float,
+                      longitude: float,
+                      radius_km: float,
+                      num_nights: int,
+                      room_number: int,
+                      max_price: Optional[float],
+                      max_results: int,
+                      amenity_index: Optional[AmenityIndex],
+                      preferences: Optional[str]) -> Tuple[list, Dict[str, float]]:
+    """Priced candidates within the radius from a nearby sweep, and every hotel's distance.
+
+    Candidates are nearest first, except that when there are more than
+    ``max_results`` the ones known to match more preferences are kept.
+    """
+    distances = {}
+    for hotel in hotels:
+        location = hotel_location(hotel)
+        if location is not None:
+            distances[location.hotel_id] = distance_km(latitude, longitude, location.latitude, location.longitude)
+    in_radius = sorted(
+        (hotel for hotel in hotels if distances.get(str(hotel.get('hotel_id', '')), radius_km + 1) <= radius_km),
+        key=lambda hotel: distances[str(hotel.get('hotel_id', ''))]
+    )
+
+    candidates = price_candidates(in_radius, num_nights, room_number, max_price)
+    if len(candidates) > max_results:
+        candidates = order_by_amenities(candidates, amenity_index, preferences)[:max_results]
+    return candidates, distances
+
+def build_hotel_record(candidate: tuple, hotel_details: Dict[str, Any], num_nights: int, room_number: int) -> Hotel:
+    """Combine a priced search result with its hotel details."""
+    hotel, property_data, price_data, price_per_night_value, total_price = candidate
+    score = property_data.get('reviewScore')
+    return Hotel(
+        hotel_id=str(hotel.get('hotel_id', '')),
+        name=property_data.get('name', 'N/A'),
+        score=float(score) if isinstance(score, (int, float)) else None,
+        score_word=property_data.get('reviewScoreWord', 'N/A'),
+        reviews_count=property_data.get('reviewCount', 0),
+        price_per_night=price_per_night_value if isinstance(price_per_night_value, float) else None,
+        total_price=total_price,
+        currency=price_data.get('currency', 'USD'),
+        num_nights=num_nights,
+        num_rooms=room_number,
+        address=hotel_details.get('address', 'N/A'),
+        location=f"{hotel_details.get('city', 'N/A')}, {hotel_details.get('country', 'N/A')}",
+        website=hotel_details.get('website', 'N/A'),
+        facilities=hotel_details.get('facilities', []),
+        popular_facilities=hotel_details.get('popular_facilities', [])
+    )
+
+def with_details(hotel: Hotel, details: Dict[str, Any]) -> Hotel:
+    """A priced hotel completed with its address and facilities."""
+    if not details:
+        return hotel
+    return Hotel(
+        hotel_id=hotel.hotel_id,
+        name=hotel.name,
+        score=hotel.score,
+        score_word=hotel.score_word,
+        reviews_count=hotel.reviews_count,
+        price_per_night=hotel.price_per_night,
+        total_price=hotel.total_price,
+        currency=hotel.currency,
+        num_nights=hotel.num_nights,
+        num_rooms=hotel.num_rooms,
+        address=details.get('address', 'N/A'),
+        location=f"{details.get('city', 'N/A')}, {details.get('country', 'N/A')}",
+        website=details.get('website', 'N/A'),
+        facilities=details.get('facilities', []),
+        popular_facilities=details.get('popular_facilities', [])
+    )
+
+def build_indexed_hotel(location: HotelLocation, details: Dict[str, Any], distance: float,
+                        num_nights: int, room_number: int) -> Hotel:
+    """Hotel from the geo index and its details, priced from the details."""
+    stay_price = details.get('total_price')
+    total_price = float(stay_price) * room_number if isinstance(stay_price, (int, float)) else None
+    return Hotel(
+        hotel_id=location.hotel_id,
+        name=location.name or details.get('name', 'N/A'),
+        score=location.score,
+        score_word=location.score_word or 'N/A',
+        reviews_count=location.reviews_count or 0,
+        price_per_night=total_price / num_nights / room_number if total_price is not None else None,
+        total_price=total_price,
+        currency=details.get('currency', 'USD'),
+        num_nights=num_nights,
+        num_rooms=room_number,
+        address=details.get('address', 'N/A'),
+        location=f"{details.get('city', 'N/A')}, {details.get('country', 'N/A')}",
+        website=details.get('website', 'N/A'),
+        facilities=details.get('facilities', []),
+        popular_facilities=details.get('popular_facilities', []),
+        distance_km=round(distance, 2)
+    )
+
+def parse_hotel_details(hotel_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Extract the fields we use from a getHotelDetails response."""
+    stay_price = (hotel_data.get('product_price_breakdown') or {}).get('gross_amount') or {}
+    return {
+        'name': hotel_data.get('hotel_name', 'N/A'),
+        'address': hotel_data.get('address', 'N/A'),
+        'city': hotel_data.get('city', 'N/A'),
+        'country': hotel_data.get('country_trans', 'N/A'),
+        'website': hotel_data.get('url', 'N/A'),
+        'facilities': [
+            facility.get('name') 
+            for facility in hotel_data.get('property_highlight_strip', [])
+        ],
+        'popular_facilities': [
+            facility.get('name')
+            for facility in hotel_data.get('facilities_block', {}).get('facilities', [])
+        ],
+        'family_facilities': hotel_data.get('family_facilities', []),
+        # Price of the stay for one room, used for nearby answers from the geo index
+        'total_price': stay_price.get('value'),
+        'currency': stay_price.get('currency', 'USD')
+    }
+
+def rank_locally(local_ranker: LocalRanker, hotels: list, preferences: Optional[str], ranker: str) -> Tuple[list, list]:
+    """Split one destination's hotels into settled top picks and hotels for the model."""
+    if not preferences or not hotels or ranker == "local":
+        return local_ranker.rank(hotels, preferences, TOP_K), []
+    
+    if ranker == "openai":
+        return [], hotels
+    
+    # Hybrid: only hotels tied at the cutoff go to the model
+    return split_at_cutoff(local_ranker.rank_with_scores(hotels, preferences), TOP_K)
+
+def read_cache(cache: Optional[Cache], key: str, max_stale: Optional[timedelta] = None,
+               flush: bool = True) -> Tuple[Any, bool]:
+    """Cached value of ``key`` and whether it is stale, noted on the current span.
+
+    With ``max_stale``, an entry that expired less than that long ago is
+    still returned, flagged as stale. ``flush`` works as for Cache.set.
+    """
+    if cache is None:
+        return None, False
+    value, stale = cache.lookup(key, max_stale.total_seconds() if max_stale else 0.0, flush=flush)
+    tracer.annotate(cache="miss" if value is None else "hit")
+    if stale:
+        tracer.annotate(stale=True)
+    return value, stale
+
+def read_last_known(cache: Optional[Cache], key: str, flush: bool = True) -> Any:
+    """Whatever the cache still holds for a key, however long ago it
+    expired; used while the endpoint behind it is unavailable."""
+    tracer.annotate(degraded=True)
+    if cache is None:
+        return None
+    value, _ = cache.lookup(key, cache.stale_seconds, flush=flush)
+    return value
+
+def write_cache(cache: Optional[Cache], key: str, value: Any, ttl: timedelta, flush: bool = True):
+    """Store a value in the cache, if one is configured."""
+    if cache is not None:
+        cache.set(key, value, ttl, flush=flush)
+
+@contextmanager
+def background_refresh():
+    """Span and error handling around the refresh of a stale entry.
+
+    Errors are reported and swallowed: the stale entry stays until a later
+    refresh succeeds.
+    """
+    try:
+        with tracer.span("cache.refresh"):
+            yield
+    except CircuitOpenError:
+        # The stale entry stays until the endpoint is back
+        pass
+    except Exception as e:
+        console.print(f"[yellow]Background refresh failed: {str(e)}[/yellow]")
+
+def cached_hotels(entry: Dict[str, Any]) -> List[Hotel]:
+    """Hotels of a cached search or nearby result."""
+    return [Hotel.from_json(row) for row in entry["results"]]
+
+def hotels_entry(hotels: List[Hotel]) -> Dict[str, Any]:
+    """Cache entry for the hotels of a search or nearby result."""
+    return {"results": [hotel.to_row() for hotel in hotels]}
+
+def parse_destination_id(data: Any) -> Optional[str]:
+    """ID of the first destination in a searchDestination response."""
+    if data and 'data' in data and data['data']:
+        return data['data'][0]['dest_id']
+    return None
+
+def details_amenities(details: Dict[str, Any]) -> List[str]:
+    """Facilities of parsed hotel details, as added to the amenity index."""
+    return details['facilities'] + details['popular_facilities']
+
+def page_candidates(hotels: list,
+                    num_nights: int,
+                    room_number: int,
+                    max_price: Optional[float],
+                    wanted: Optional[int],
+                    amenity_index: Optional[AmenityIndex],
+                    preferences: Optional[str]) -> list:
+    """Priced candidates of one result page, at most ``wanted`` of them.
+
+    When some must be left out, the best amenity matches are kept.
+    """
+    candidates = price_candidates(hotels, num_nights, room_number, max_price)
+    if wanted is not None and len(candidates) > wanted:
+        candidates = order_by_amenities(candidates, amenity_index, preferences)[:wanted]
+    return candidates
+
+class NearbySweep:
+    """Result pages of one sweep of the nearby endpoint.
+
+    The sweep reaches one index cell diagonal (plus a margin) beyond the
+    requested radius, so every index cell the query touches is listed in
+    full and can be marked as covered.
+    """
+
+    def __init__(self, latitude: float, longitude: float, radius_km: float):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.sweep_km = radius_km + cell_diagonal_km(latitude) + NEARBY_SWEEP_MARGIN_KM
+        self.hotels: list = []
+        # Set once a page shows that every hotel in the area was listed
+        self.exhausted = False
+        self._page_size: Optional[int] = None
+
+    def add(self, page: Optional[list]) -> bool:
+        """Add one parsed page; returns whether the next page should be read."""
+        if page is None:
+            return False
+        self.hotels.extend(page)
+        # An empty or short page is the last one
+        self._page_size = self._page_size or len(page)
+        if not page or len(page) < self._page_size:
+            self.exhausted = True
+            return False
+        return True
+
+    def covered_area(self, capped: bool) -> Optional[Tuple[float, float, float, bool]]:
+        """Arguments for GeoIndex.mark_covered, or None if the sweep covers nothing.
+
+        A sweep stopped by the page limit (``capped``) covers its area only
+        partially, but is still marked: without that every query in a dense
+        area would read every page again.
+        """
+        if not (self.exhausted or capped):
+            return None
+        return self.latitude, self.longitude, self.sweep_km, self.exhausted
+
+def nearby_area_covered(geo_index: Optional[GeoIndex], latitude: float, longitude: float, radius_km: float) -> bool:
+    """Whether the geo index can answer a nearby search on its own."""
+    return geo_index is not None and geo_index.covered(
+        latitude, longitude, radius_km, NEARBY_COVERAGE_TTL.total_seconds(),
+        NEARBY_PARTIAL_COVERAGE_TTL.total_seconds())
+
+def nearby_records(candidates: list, all_details: Iterable[Dict[str, Any]], distances: Dict[str, float],
+                   num_nights: int, room_number: int) -> List[Hotel]:
+    """Swept candidates completed with their details, nearest first."""
+    results = []
+    for candidate, hotel_details in zip(candidates, all_details):
+        hotel = build_hotel_record(candidate, hotel_details, num_nights, room_number)
+        hotel.distance_km = round(distances[hotel.hotel_id], 2)
+        results.append(hotel)
+    results.sort(key=lambda hotel: hotel.distance_km)
+    return results
+
+def indexed_records(batch: List[Tuple[HotelLocation, float]], all_details: Iterable[Dict[str, Any]],
+                    num_nights: int, room_number: int, max_price: Optional[float]) -> List[Hotel]:
+    """Indexed hotels of a batch priced from their details, skipping unknown or over-budget ones."""
+    results = []
+    for (location, distance), hotel_details in zip(batch, all_details):
+        if not hotel_details:
+            continue
+        hotel = build_indexed_hotel(location, hotel_details, distance, num_nights, room_number)
+        if max_price is not None and hotel.total_price is not None and hotel.total_price > max_price:
+            continue
+        results.append(hotel)
+    return results
+
+class LocationResults:
+    """Ranked hotels of a multi-destination search, collected as destinations finish."""
+
+    def __init__(self, destinations: List[str], on_result: Optional[Callable[[str, list], None]] = None):
+        self.destinations = destinations
+        self.on_result = on_result
+        self.hotels: Dict[str, list] = {}
+        self.stale: Set[str] = set()
+        # Destinations whose final order still needs the model:
+        # destination -> (hotels already placed, hotels for the model to order)
+        self.needs_model: Dict[str, Tuple[list, list]] = {}
+
+    def add(self, destination: str, placed: list, unordered: list, from_cache: bool):
+        """Record what _search_and_rank_destination returned for a destination."""
+        if from_cache:
+            self.stale.add(destination)
+        if unordered:
+            self.needs_model[destination] = (placed, unordered)
+        else:
+            self.finish(destination, placed)
+
+    def finish(self, destination: str, hotels: list):
+        self.hotels[destination] = hotels
+        if self.on_result:
+            self.on_result(destination, hotels)
+
+    def unfinished(self) -> List[str]:
+        """Destinations with no result yet and none waiting for the model."""
+        return [destination for destination in self.destinations
+                if destination not in self.hotels and destination not in self.needs_model]
+
+    def model_request(self) -> Dict[str, list]:
+        """The hotels the model is asked to order, by destination."""
+        return {destination: unordered for destination, (_, unordered) in self.needs_model.items()}
+
+    def apply_model_order(self, ranked: Dict[str, list]):
+        """Finish the destinations that waited for the model with its picks after the settled ones."""
+        for destination, (placed, _) in self.needs_model.items():
+            self.finish(destination, placed + ranked[destination][:TOP_K - len(placed)])
+
+    def to_dict(self) -> Dict[str, Any]:
+        results = {"locations": {destination: self.hotels[destination] for destination in self.destinations}}
+        if self.stale:
+            results["stale"] = [destination for destination in self.destinations if destination in self.stale]
+        return results
+
 class BookingAPI:
-    def __init__(self):
-        self.base_url = "https://booking-com15.p.rapidapi.com/api/v1"
-        self.headers = {
-            "X-RapidAPI-Key": os.getenv("RAPIDAPI_KEY"),
-            "X-RapidAPI-Host": "booking-com15.p.rapidapi.com"
-        }
-        if not self.headers["X-RapidAPI-Key"]:
-            raise ValueError("RAPIDAPI_KEY not found in environment variables")
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_in_flight: Optional[int] = None,
+                 cache: Optional[Cache] = None,
+                 openai_api: Optional["OpenAIAPI"] = None,
+                 amenity_index: Optional[AmenityIndex] = None,
+                 geo_index: Optional[GeoIndex] = None):
+        self.base_url = BASE_URL
+        self.headers = rapidapi_headers()
+        # Upper bound on concurrent hotel detail requests per search
+        self.max_workers = max_workers or int(os.getenv("BOOKING_MAX_WORKERS", DEFAULT_MAX_WORKERS))
+        # Global limit on in-flight RapidAPI requests, shared by every search
+        # running on this instance (including concurrent destinations)
+        self.max_in_flight = max_in_flight or int(os.getenv("BOOKING_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+        self.max_nearby_pages = int(os.getenv("BOOKING_MAX_NEARBY_PAGES", MAX_NEARBY_PAGES))
+        self._request_slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.cache = cache
+        # Amenities of every hotel whose details were fetched, kept in the cache database
+        self.amenity_index = amenity_index or default_amenity_index(cache)
+        # Positions of every hotel seen so far, for nearby searches
+        self.geo_index = geo_index or default_geo_index(cache)
+        self._http: Optional[HttpClient] = None
+        self._http_lock = threading.Lock()
+        # Identical lookups running at the same time share one upstream call
+        self._in_flight = SingleFlight()
+        # One breaker per endpoint; while one is open its lookups are answered
+        # from whatever the cache still holds
+        self.breakers = CircuitBreakers(**breaker_settings("BOOKING"))
+        # Keys being refreshed in the background after a stale read
+        self._refreshing: Set[str] = set()
+        self._refresh_lock = threading.Lock()
+        self._refresher: Optional[ThreadPoolExecutor] = None
+        # Result pages and hotel details are fetched on one long-lived pool, so
+        # its threads (and their cache connections) are reused across searches
+        self._lookups: Optional[ThreadPoolExecutor] = None
+        self._lookups_lock = threading.Lock()
+        self.local_ranker = LocalRanker()
+        self._openai_api = openai_api
+
+    @property
+    def lookups(self) -> ThreadPoolExecutor:
+        """Pool running result page and hotel details lookups for every search.
+
+        Its tasks never wait on the pool themselves, so any number of
+        searches can share it without deadlocking.
+        """
+        if self._lookups is None:
+            with self._lookups_lock:
+                if self._lookups is None:
+                    self._lookups = ThreadPoolExecutor(max_workers=max(self.max_workers, self.max_in_flight),
+                                                       thread_name_prefix="booking-lookup")
+        return self._lookups
+
+    def _map_lookups(self, fn: Callable[[Any], Any], items: Iterable[Any]) -> Iterator[Any]:
+        """``fn`` of each item on the lookup pool, in order, at most ``max_workers`` at a time.
 
+        Lookups not yet started when the iterator is closed are cancelled.
+        """
+        items = iter(items)
+        pending: deque = deque()
+        try:
+            pending.extend(self.lookups.submit(fn, item) for item in islice(items, max(1, self.max_workers)))
+            while pending:
+                result = pending.popleft().result()
+                pending.extend(self.lookups.submit(fn, item) for item in islice(items, 1))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @property
+    def http(self) -> HttpClient:
+        """One keep-alive connection pool for every request made by this
+        instance, created on first use so cache-only lookups never build it."""
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    self._http = HttpClient(self.headers, pool_size=self.max_in_flight, **http_settings())
+        return self._http
+
+    @property
+    def openai_api(self) -> "OpenAIAPI":
+        """OpenAI ranker, created on first use and shared by every search."""
+        if self._openai_api is None:
+            from api.openai_api import OpenAIAPI
+            self._openai_api = OpenAIAPI(cache=self.cache)
+        return self._openai_api
+
+    @property
+    def openai_api_loaded(self) -> bool:
+        """Whether the OpenAI ranker has been created yet."""
+        return self._openai_api is not None
+
+    def _get(self, endpoint: str, params: Dict[str, Any]) -> requests.Response:
+        """Send a GET request to the API once a request slot is free.
+
+        Raises CircuitOpenError without calling the API while the endpoint's
+        breaker is open.
+        """
+        name = f"rapidapi.{endpoint.rsplit('/', 1)[-1]}"
+        breaker = self.breakers.get(name)
+        breaker.allow()
+        with tracer.span(name) as span:
+            ok = False
+            started = time.perf_counter()
+            try:
+                with self._request_slots:
+                    # Waiting for a slot is not the endpoint's latency
+                    started = time.perf_counter()
+                    response = self.http.get(endpoint, params=params)
+                ok = response.status_code < 500 and response.status_code != 429
+            finally:
+                breaker.record(ok, time.perf_counter() - started)
+            span.set(status=response.status_code, bytes=len(response.content))
+            return response
+
+    def _cache_get(self, key: str,
+                   max_stale: Optional[timedelta] = None,
+                   refresh: Optional[Callable[[], Any]] = None):
+        """Read a value from the cache, if one is configured.
+
+        With ``max_stale``, an entry that expired less than that long ago is
+        still returned and ``refresh`` is run in the background to replace it.
+        """
+        value, stale = read_cache(self.cache, key, max_stale)
+        if stale and refresh is not None:
+            self._refresh_in_background(key, refresh)
+        return value
+
+    def _last_known(self, key: str) -> Any:
+        """Whatever the cache still holds for a key, however long ago it
+        expired; used while the endpoint behind it is unavailable."""
+        return read_last_known(self.cache, key)
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Any]):
+        """Run ``fetch`` for a stale key on the refresher pool, once per key at a time."""
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(max_workers=DEFAULT_REFRESH_WORKERS,
+                                                     thread_name_prefix="cache-refresh")
+
+        def run():
+            try:
+                with background_refresh():
+                    self._in_flight.do(key, fetch)
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(key)
+
+        self._refresher.submit(run)
+
+    def _index_locations(self, hotels: list):
+        """Add the positions of search results to the geo index."""
+        if self.geo_index is not None:
+            self.geo_index.add(location for location in map(hotel_location, hotels) if location is not None)
+
+    def _expiring(self, key: str, margin: float) -> bool:
+        """Whether a cache entry is missing or expires within ``margin`` seconds."""
+        expires_in = self.cache.expires_in(key) if self.cache is not None else None
+        return expires_in is None or expires_in < margin
+
+    def _cache_set(self, key: str, value: Any, ttl: timedelta):
+        """Store a value in the cache, if one is configured."""
+        write_cache(self.cache, key, value, ttl)
+
+    @tracer.traced("booking.search_hotels")
     def search_hotels(self, 
                      destination: str, 
                      checkin_date: str, 
                      checkout_date: str, 
                      adults_number: int,
                      room_number: int = 1,
-                     max_price: float = None) -> Dict[str, Any]:
-        """Search for hotels in a specific destination."""
+                     max_price: float = None,
+                     max_results: Optional[int] = None,
+                     preferences: Optional[str] = None) -> Dict[str, Any]:
+        """Search for hotels in a specific destination.
+
+        Result pages are fetched until ``max_results`` hotels within budget
+        have been found or the destination runs out of hotels.
+        """
+        if max_results is None:
+            max_results = int(os.getenv("BOOKING_MAX_RESULTS", DEFAULT_MAX_RESULTS))
+        cache_key = search_cache_key(destination, checkin_date, checkout_date, adults_number, room_number,
+                                     max_price, max_results, preferences)
+        def fetch():
+            return self._fetch_hotels(cache_key, destination, checkin_date, checkout_date, adults_number,
+                                      room_number, max_price, max_results, preferences)
+
+        cached = self._cache_get(cache_key, SEARCH_MAX_STALE, fetch)
+        if cached is not None:
+            return {"results": cached_hotels(cached)}
+
+        try:
+            results = self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError as e:
+            cached = self._last_known(cache_key)
+            if cached is None:
+                console.print(f"[yellow]{str(e)}; no cached results for {destination}[/yellow]")
+                return {"results": []}
+            console.print(f"[yellow]{str(e)}; showing cached results for {destination}[/yellow]")
+            return {"results": cached_hotels(cached), "stale": True}
+        # Callers sharing a call may reorder or trim their list
+        return {"results": list(results["results"])}
+
+    def _fetch_hotels(self,
+                      cache_key: str,
+                      destination: str,
+                      checkin_date: str,
+                      checkout_date: str,
+                      adults_number: int,
+                      room_number: int,
+                      max_price: Optional[float],
+                      max_results: int,
+                      preferences: Optional[str] = None) -> Dict[str, Any]:
+        """Search for hotels upstream and cache the results."""
+        results = []
+        try:
+            for hotel_data in self._iter_hotels(destination, checkin_date, checkout_date, adults_number,
+                                                room_number, max_price, max_results, preferences=preferences):
+                results.append(hotel_data)
+        except CircuitOpenError:
+            if not results:
+                raise
+            # Partial results are returned but not cached
+            return {"results": results}
+        except requests.exceptions.RequestException as e:
+            console.print(f"[red]Error making API request: {str(e)}[/red]")
+            # Partial results are returned but not cached
+            return {"results": results}
+        
+        if results:
+            self._cache_set(cache_key, hotels_entry(results), SEARCH_TTL)
+        return {"results": results}
+
+    def iter_hotels(self,
+                    destination: str,
+                    checkin_date: str,
+                    checkout_date: str,
+                    adults_number: int,
+                    room_number: int = 1,
+                    max_price: float = None,
+                    limit: Optional[int] = None,
+                    max_pages: int = MAX_PAGES,
+                    preferences: Optional[str] = None) -> Iterator[Hotel]:
+        """Yield hotels in a destination page by page, as soon as each is enriched.
+
+        The next result page is fetched while the current one is being
+        enriched. Only one page is held at a time, and iteration stops once
+        ``limit`` hotels have been yielded. With ``preferences``, hotels the
+        amenity index knows to match them are enriched first.
+        """
+        try:
+            yield from self._iter_hotels(destination, checkin_date, checkout_date, adults_number,
+                                         room_number, max_price, limit, max_pages, preferences)
+        except CircuitOpenError as e:
+            console.print(f"[yellow]{str(e)}[/yellow]")
+        except requests.exceptions.RequestException as e:
+            console.print(f"[red]Error making API request: {str(e)}[/red]")
+
+    def _iter_hotels(self,
+                     destination: str,
+                     checkin_date: str,
+                     checkout_date: str,
+                     adults_number: int,
+                     room_number: int,
+                     max_price: Optional[float],
+                     limit: Optional[int],
+                     max_pages: int = MAX_PAGES,
+                     preferences: Optional[str] = None) -> Iterator[Hotel]:
+        """iter_hotels without error handling; request errors propagate."""
         # First get destination ID
         dest_id = self._get_destination_id(destination)
         if not dest_id:
-            return {"results": []}
+            return
 
         # Calculate number of nights
-        checkin = datetime.strptime(checkin_date, "%Y-%m-%d")
-        checkout = datetime.strptime(checkout_date, "%Y-%m-%d")
-        num_nights = (checkout - checkin).days
-
-        # Calculate price per night if total budget is provided
-        price_per_night = None
-        if max_price is not None:
-            price_per_night = float(max_price) / num_nights if num_nights > 0 else max_price
-
-        # Search for hotels using destination ID
-        endpoint = f"{self.base_url}/hotels/searchHotels"
-        params = {
-            "dest_id": dest_id,
-            "search_type": "CITY",
-            "arrival_date": checkin_date,
-            "departure_date": checkout_date,
-            "adults": str(adults_number),
-            "room_qty": str(room_number),
-            "page_number": "1",
-            "units": "metric",
-            "currency_code": "USD"
-        }
-        
-        # Add price filter if provided
-        if price_per_night is not None:
-            params["price_min"] = "1"
-            params["price_max"] = str(int(price_per_night))
-        
+        num_nights = count_nights(checkin_date, checkout_date)
+
+        def fetch_page(page_number: int) -> Optional[list]:
+            return self._search_page(dest_id, checkin_date, checkout_date, adults_number,
+                                     room_number, max_price, num_nights, page_number)
+
+        yielded = 0
+        next_page = None
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data or 'data' not in data:
-                console.print("[red]No hotels found for the given criteria[/red]")
-                return {"results": []}
-            
-            results = []
-            hotels = data.get('data', {}).get('hotels', [])
-            
-            for hotel in hotels:
-                property_data = hotel.get('property', {})
-                price_data = property_data.get('priceBreakdown', {}).get('grossPrice', {})
+            page_number = 1
+            next_page = self.lookups.submit(fetch_page, page_number)
+            while next_page is not None:
+                hotels = next_page.result()
+                if hotels is None:
+                    if page_number == 1:
+                        console.print("[red]No hotels found for the given criteria[/red]")
+                    return
+                
+                candidates = page_candidates(hotels, num_nights, room_number, max_price,
+                                             None if limit is None else limit - yielded,
+                                             self.amenity_index, preferences)
+                
+                # Start on the next page while this one is being enriched
+                page_number += 1
+                more_needed = limit is None or yielded + len(candidates) < limit
+                next_page = (self.lookups.submit(fetch_page, page_number)
+                             if hotels and page_number <= max_pages and more_needed else None)
                 
-                # Get detailed information for each hotel
-                hotel_details = self.get_hotel_details(
-                    str(hotel.get('hotel_id', '')),
+                # Get detailed information for the remaining hotels in parallel
+                all_details = self._iter_hotel_details(
+                    [candidate_hotel_id(candidate) for candidate in candidates],
                     checkin_date,
                     checkout_date
                 )
-                
-                # Extract price value and calculate total price
-                price_per_night_value = price_data.get('value', 'N/A')
-                total_price = None
-                
-                try:
-                    if price_per_night_value != 'N/A':
-                        price_per_night_value = float(price_per_night_value)
-                        # Calculate total price including all rooms
-                        total_price = price_per_night_value * num_nights * room_number
-                except (ValueError, TypeError):
-                    pass
-                
-                # Skip hotels with total price higher than budget
-                if max_price is not None and total_price is not None:
-                    if total_price > max_price:
-                        continue
-                
-                hotel_data = {
-                    'hotel_id': str(hotel.get('hotel_id', '')),
-                    'hotel_name': property_data.get('name', 'N/A'),
-                    'review_score': {
-                        'score': property_data.get('reviewScore', 'N/A'),
-                        'word': property_data.get('reviewScoreWord', 'N/A'),
-                        'reviews_count': property_data.get('reviewCount', 0)
-                    },
-                    'price': {
-                        'per_night': price_per_night_value,
-                        'per_room': price_per_night_value,
-                        'total': total_price,
-                        'currency': price_data.get('currency', 'USD'),
-                        'num_nights': num_nights,
-                        'num_rooms': room_number
-                    },
-                    'address': hotel_details.get('address', 'N/A'),
-                    'location': f"{hotel_details.get('city', 'N/A')}, {hotel_details.get('country', 'N/A')}",
-                    'website': hotel_details.get('url', 'N/A'),
-                    'facilities': hotel_details.get('facilities', []),
-                    'popular_facilities': hotel_details.get('popular_facilities', [])
-                }
-                results.append(hotel_data)
-            
-            return {"results": results}
-            
+                for candidate, hotel_details in zip(candidates, all_details):
+                    yield build_hotel_record(candidate, hotel_details, num_nights, room_number)
+                    yielded += 1
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    def _search_page(self,
+                     dest_id: str,
+                     checkin_date: str,
+                     checkout_date: str,
+                     adults_number: int,
+                     room_number: int,
+                     max_price: Optional[float],
+                     num_nights: int,
+                     page_number: int) -> Optional[list]:
+        """One page of searchHotels results, or None if the response has no data."""
+        params = build_search_params(dest_id, checkin_date, checkout_date, adults_number,
+                                     room_number, max_price, num_nights, page_number)
+        response = self._get(f"{self.base_url}/hotels/searchHotels", params)
+        response.raise_for_status()
+        hotels = parse_search_page(response_data(response))
+        if hotels is None:
+            return None
+        self._index_locations(hotels)
+        return hotels
+
+    @tracer.traced("booking.search_prices")
+    def search_prices(self,
+                      destination: str,
+                      checkin_date: str,
+                      checkout_date: str,
+                      adults_number: int,
+                      room_number: int = 1,
+                      max_price: float = None,
+                      max_results: Optional[int] = None) -> List[Hotel]:
+        """Priced hotels within budget for one stay, without their details.
+
+        Reads result pages like search_hotels but never requests hotel
+        details, so checking many date pairs costs one request per page.
+        """
+        if max_results is None:
+            max_results = int(os.getenv("BOOKING_MAX_RESULTS", DEFAULT_MAX_RESULTS))
+        cache_key = prices_cache_key(destination, checkin_date, checkout_date, adults_number,
+                                     room_number, max_price, max_results)
+
+        def fetch():
+            return self._fetch_prices(cache_key, destination, checkin_date, checkout_date,
+                                      adults_number, room_number, max_price, max_results)
+
+        cached = self._cache_get(cache_key, SEARCH_MAX_STALE, fetch)
+        if cached is not None:
+            return [Hotel.from_json(row) for row in cached]
+        try:
+            return list(self._in_flight.do(cache_key, fetch))
+        except CircuitOpenError as e:
+            cached = self._last_known(cache_key)
+            console.print(f"[yellow]{str(e)}; {'using cached' if cached else 'no'} prices for "
+                          f"{destination} {checkin_date} to {checkout_date}[/yellow]")
+            return [Hotel.from_json(row) for row in cached] if cached else []
+
+    def _fetch_prices(self,
+                      cache_key: str,
+                      destination: str,
+                      checkin_date: str,
+                      checkout_date: str,
+                      adults_number: int,
+                      room_number: int,
+                      max_price: Optional[float],
+                      max_results: int) -> List[Hotel]:
+        """Read result pages until ``max_results`` priced hotels are found and cache them."""
+        dest_id = self._get_destination_id(destination)
+        if not dest_id:
+            return []
+        num_nights = count_nights(checkin_date, checkout_date)
+        results = []
+        try:
+            for page_number in range(1, MAX_PAGES + 1):
+                hotels = self._search_page(dest_id, checkin_date, checkout_date, adults_number,
+                                           room_number, max_price, num_nights, page_number)
+                if not hotels:
+                    break
+                for candidate in price_candidates(hotels, num_nights, room_number, max_price):
+                    results.append(build_hotel_record(candidate, {}, num_nights, room_number))
+                if len(results) >= max_results:
+                    break
+        except CircuitOpenError:
+            if not results:
+                raise
+            return results[:max_results]
         except requests.exceptions.RequestException as e:
             console.print(f"[red]Error making API request: {str(e)}[/red]")
-            return {"results": []}
+            return results[:max_results]
 
+        results = results[:max_results]
+        if results:
+            self._cache_set(cache_key, [hotel.to_row() for hotel in results], SEARCH_TTL)
+        return results
+
+    @tracer.traced("booking.destination_id")
     def _get_destination_id(self, query: str) -> Optional[str]:
         """Get destination ID from location search."""
+        cache_key = destination_cache_key(query)
+        fetch = lambda: self._fetch_destination_id(cache_key, query)
+        cached = self._cache_get(cache_key, DESTINATION_MAX_STALE, fetch)
+        if cached is not None:
+            return cached
+
+        try:
+            return self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError:
+            dest_id = self._last_known(cache_key)
+            if dest_id is None:
+                raise
+            return dest_id
+
+    def _fetch_destination_id(self, cache_key: str, query: str) -> Optional[str]:
+        """Look up a destination ID upstream and cache it."""
         endpoint = f"{self.base_url}/hotels/searchDestination"
         params = {"query": query}
         
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params)
+            response = self._get(endpoint, params)
             response.raise_for_status()
-            data = response.json()
-            
-            if data and 'data' in data and data['data']:
-                return data['data'][0]['dest_id']
+            dest_id = parse_destination_id(response_data(response))
+            if dest_id:
+                self._cache_set(cache_key, dest_id, DESTINATION_TTL)
+                return dest_id
             
             console.print(f"[red]No destination found for: {query}[/red]")
             return None
@@ -151,98 +1161,267 @@ class BookingAPI:
             console.print(f"[red]Error searching destination: {str(e)}[/red]")
             return None
 
+    @tracer.traced("booking.hotel_details")
     def get_hotel_details(self, hotel_id: str, arrival_date: str, departure_date: str) -> Dict[str, Any]:
         """Get detailed information about a specific hotel."""
+        cache_key = hotel_details_cache_key(hotel_id, arrival_date, departure_date)
+        fetch = lambda: self._fetch_hotel_details(cache_key, hotel_id, arrival_date, departure_date)
+        cached = self._cache_get(cache_key, HOTEL_DETAILS_MAX_STALE, fetch)
+        if cached is not None:
+            return cached
+
+        try:
+            return self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError:
+            details = self._last_known(cache_key)
+            return {**details, "stale": True} if details else {}
+
+    def _fetch_hotel_details(self, cache_key: str, hotel_id: str, arrival_date: str, departure_date: str) -> Dict[str, Any]:
+        """Get hotel details upstream and cache them."""
         endpoint = f"{self.base_url}/hotels/getHotelDetails"
-        params = {
-            "hotel_id": hotel_id,
-            "arrival_date": arrival_date,
-            "departure_date": departure_date,
-            "currency_code": "USD",
-            "languagecode": "en-us"
-        }
+        params = build_details_params(hotel_id, arrival_date, departure_date)
         
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params)
+            response = self._get(endpoint, params)
             response.raise_for_status()
-            data = response.json()
+            data = response_data(response)
             
             if not data or 'data' not in data:
                 console.print("[red]No details found for this hotel[/red]")
                 return {}
             
-            hotel_data = data['data']
-            return {
-                'name': hotel_data.get('hotel_name', 'N/A'),
-                'address': hotel_data.get('address', 'N/A'),
-                'city': hotel_data.get('city', 'N/A'),
-                'country': hotel_data.get('country_trans', 'N/A'),
-                'website': hotel_data.get('url', 'N/A'),
-                'facilities': [
-                    facility.get('name') 
-                    for facility in hotel_data.get('property_highlight_strip', [])
-                ],
-                'popular_facilities': [
-                    facility.get('name')
-                    for facility in hotel_data.get('facilities_block', {}).get('facilities', [])
-                ],
-                'family_facilities': hotel_data.get('family_facilities', [])
-            }
+            details = parse_hotel_details(data['data'])
+            self._cache_set(cache_key, details, HOTEL_DETAILS_TTL)
+            if self.amenity_index is not None:
+                self.amenity_index.add(hotel_id, details_amenities(details))
+            return details
             
         except requests.exceptions.RequestException as e:
             console.print(f"[red]Error fetching hotel details: {str(e)}[/red]")
             return {}
 
-    def search_nearby(self, 
-                     latitude: float, 
-                     longitude: float,
-                     checkin_date: str,
-                     checkout_date: str) -> Dict[str, Any]:
-        """Search for hotels near a specific location."""
-        endpoint = f"{self.base_url}/hotels/nearby"
-        params = {
-            "latitude": str(latitude),
-            "longitude": str(longitude),
-            "checkin_date": checkin_date,
-            "checkout_date": checkout_date
-        }
-        
-        response = requests.get(endpoint, headers=self.headers, params=params)
-        return response.json()
+    def _iter_hotel_details(self, hotel_ids: List[str], arrival_date: str, departure_date: str) -> Iterator[Dict[str, Any]]:
+        """Get details for several hotels concurrently, yielded in the same order as hotel_ids."""
+        yield from self._map_lookups(
+            lambda hotel_id: self.get_hotel_details(hotel_id, arrival_date, departure_date),
+            hotel_ids
+        )
+
+    def warm_search(self,
+                    destination: str,
+                    checkin_date: str,
+                    checkout_date: str,
+                    adults_number: int,
+                    room_number: int = 1,
+                    max_price: float = None,
+                    max_results: Optional[int] = None,
+                    preferences: Optional[str] = None,
+                    margin: float = 0.0) -> Dict[str, int]:
+        """Refresh the cached entries behind one search ahead of their expiry.
+
+        The destination ID, the search results and the details of every
+        hotel in them are fetched again when missing or due to expire within
+        ``margin`` seconds; fresher entries are left alone. Returns how many
+        of each kind were refreshed.
+        """
+        refreshed = {"destinations": 0, "searches": 0, "details": 0}
+        if max_results is None:
+            max_results = int(os.getenv("BOOKING_MAX_RESULTS", DEFAULT_MAX_RESULTS))
+
+        dest_key = destination_cache_key(destination)
+        if self._expiring(dest_key, margin):
+            if not self._in_flight.do(dest_key, lambda: self._fetch_destination_id(dest_key, destination)):
+                return refreshed
+            refreshed["destinations"] += 1
+
+        search_key = search_cache_key(destination, checkin_date, checkout_date, adults_number, room_number,
+                                      max_price, max_results, preferences)
+        if self._expiring(search_key, margin):
+            hotels = self._in_flight.do(search_key, lambda: self._fetch_hotels(
+                search_key, destination, checkin_date, checkout_date, adults_number,
+                room_number, max_price, max_results, preferences
+            ))["results"]
+            refreshed["searches"] += 1
+        else:
+            hotels = self.search_hotels(destination, checkin_date, checkout_date, adults_number,
+                                        room_number, max_price, max_results, preferences)["results"]
+
+        # Details already being refreshed after a stale read are left to that refresh
+        expiring = {}
+        for hotel in hotels:
+            details_key = hotel_details_cache_key(hotel.hotel_id, checkin_date, checkout_date)
+            if details_key not in self._refreshing and self._expiring(details_key, margin):
+                expiring[details_key] = hotel.hotel_id
+        for details in self._map_lookups(
+            lambda item: self._in_flight.do(item[0], lambda: self._fetch_hotel_details(
+                item[0], item[1], checkin_date, checkout_date
+            )),
+            expiring.items()
+        ):
+            refreshed["details"] += bool(details)
+        return refreshed
+
+    @tracer.traced("booking.search_nearby")
+    def search_nearby(self,
+                      latitude: float,
+                      longitude: float,
+                      checkin_date: str,
+                      checkout_date: str,
+                      adults_number: int = 2,
+                      room_number: int = 1,
+                      radius_km: float = DEFAULT_NEARBY_RADIUS_KM,
+                      max_price: float = None,
+                      max_results: Optional[int] = None,
+                      preferences: Optional[str] = None) -> Dict[str, Any]:
+        """Search for hotels within ``radius_km`` of a point, nearest first.
+
+        Hotels are priced and enriched like search_hotels results and carry
+        their distance. When the geo index covers the whole circle the answer
+        comes from it and the hotel details (cached, with their prices), so
+        the nearby endpoint is only called for areas not swept yet.
+        ``source`` in the result says whether the hotels came from the
+        "cache", the "index" or the "api".
+        """
+        validate_nearby(latitude, longitude, radius_km, checkin_date, checkout_date)
+        if max_results is None:
+            max_results = int(os.getenv("BOOKING_MAX_RESULTS", DEFAULT_MAX_RESULTS))
+        cache_key = nearby_cache_key(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                     adults_number, room_number, max_price, max_results, preferences)
+
+        def fetch():
+            return self._fetch_nearby(cache_key, latitude, longitude, radius_km, checkin_date, checkout_date,
+                                      adults_number, room_number, max_price, max_results, preferences)
+
+        cached = self._cache_get(cache_key, SEARCH_MAX_STALE, fetch)
+        if cached is not None:
+            return {"results": cached_hotels(cached), "source": "cache"}
+
+        try:
+            results = self._in_flight.do(cache_key, fetch)
+        except CircuitOpenError as e:
+            cached = self._last_known(cache_key)
+            if cached is not None:
+                console.print(f"[yellow]{str(e)}; showing cached results[/yellow]")
+                return {"results": cached_hotels(cached), "source": "cache", "stale": True}
+            if self.geo_index is None:
+                console.print(f"[yellow]{str(e)}; no cached results[/yellow]")
+                return {"results": [], "source": "api"}
+            # Not cached, because hotels missing from the index are missing here too
+            console.print(f"[yellow]{str(e)}; showing the hotels indexed so far[/yellow]")
+            hotels = self._nearby_from_index(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                             count_nights(checkin_date, checkout_date), room_number,
+                                             max_price, max_results, preferences)
+            return {"results": hotels, "source": "index", "stale": True}
+        return {"results": list(results["results"]), "source": results["source"]}
+
+    def _fetch_nearby(self,
+                      cache_key: str,
+                      latitude: float,
+                      longitude: float,
+                      radius_km: float,
+                      checkin_date: str,
+                      checkout_date: str,
+                      adults_number: int,
+                      room_number: int,
+                      max_price: Optional[float],
+                      max_results: int,
+                      preferences: Optional[str]) -> Dict[str, Any]:
+        """Answer a nearby search from the geo index if it covers the area, else upstream."""
+        num_nights = count_nights(checkin_date, checkout_date)
+        if nearby_area_covered(self.geo_index, latitude, longitude, radius_km):
+            source = "index"
+            hotels = self._nearby_from_index(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                             num_nights, room_number, max_price, max_results, preferences)
+        else:
+            source = "api"
+            try:
+                hotels = self._nearby_from_api(latitude, longitude, radius_km, checkin_date, checkout_date,
+                                               num_nights, adults_number, room_number, max_price, max_results,
+                                               preferences)
+            except requests.exceptions.RequestException as e:
+                console.print(f"[red]Error making API request: {str(e)}[/red]")
+                return {"results": [], "source": source}
+        tracer.annotate(source=source)
+
+        if hotels:
+            self._cache_set(cache_key, hotels_entry(hotels), SEARCH_TTL)
+        return {"results": hotels, "source": source}
+
+    def _nearby_from_api(self,
+                         latitude: float,
+                         longitude: float,
+                         radius_km: float,
+                         checkin_date: str,
+                         checkout_date: str,
+                         num_nights: int,
+                         adults_number: int,
+                         room_number: int,
+                         max_price: Optional[float],
+                         max_results: int,
+                         preferences: Optional[str]) -> List[Hotel]:
+        """Sweep the area with the nearby endpoint, index what it lists and enrich the nearest hotels."""
+        sweep = NearbySweep(latitude, longitude, radius_km)
+        capped = False
+        for page_number in range(1, self.max_nearby_pages + 1):
+            params = build_nearby_params(latitude, longitude, sweep.sweep_km, checkin_date, checkout_date,
+                                         adults_number, room_number, page_number)
+            response = self._get(f"{self.base_url}/hotels/searchHotelsByCoordinates", params)
+            response.raise_for_status()
+            if not sweep.add(parse_nearby_hotels(response_data(response))):
+                break
+        else:
+            capped = True
+
+        hotels = sweep.hotels
+        self._index_locations(hotels)
+        area = sweep.covered_area(capped)
+        if area is not None and self.geo_index is not None:
+            self.geo_index.mark_covered(*area)
+        if not hotels:
+            console.print("[red]No hotels found near the given location[/red]")
+            return []
+
+        candidates, distances = nearby_candidates(hotels, latitude, longitude, radius_km, num_nights, room_number,
+                                                  max_price, max_results, self.amenity_index, preferences)
+        all_details = self._iter_hotel_details(
+            [candidate_hotel_id(candidate) for candidate in candidates], checkin_date, checkout_date
+        )
+        return nearby_records(candidates, all_details, distances, num_nights, room_number)
+
+    def _nearby_from_index(self,
+                           latitude: float,
+                           longitude: float,
+                           radius_km: float,
+                           checkin_date: str,
+                           checkout_date: str,
+                           num_nights: int,
+                           room_number: int,
+                           max_price: Optional[float],
+                           max_results: int,
+                           preferences: Optional[str]) -> List[Hotel]:
+        """Nearest indexed hotels within budget, priced from their details."""
+        nearby = order_by_amenities(self.geo_index.within(latitude, longitude, radius_km),
+                                    self.amenity_index, preferences, hotel_id=lambda item: item[0].hotel_id)
+        results = []
+        # Enough details are requested at once to fill the results if all are within budget
+        start = 0
+        while start < len(nearby) and len(results) < max_results:
+            batch = nearby[start:start + max_results - len(results)]
+            start += len(batch)
+            all_details = self._iter_hotel_details([location.hotel_id for location, _ in batch],
+                                                   checkin_date, checkout_date)
+            results.extend(indexed_records(batch, all_details, num_nights, room_number, max_price))
+        results.sort(key=lambda hotel: hotel.distance_km)
+        return results
 
     def rank_hotels(self, hotels: list, preferences: str = None) -> list:
         """Rank hotels based on preferences and ratings."""
         if not hotels:
             return []
 
-        def get_hotel_score(hotel):
-            # Get review score (normalized to 0-10 scale)
-            review_score = hotel.get('review_score', {})
-            rating = float(review_score.get('score', 0))
-            
-            # Get facilities for preference matching
-            facilities = set()
-            facilities.update(hotel.get('facilities', []))
-            facilities.update(hotel.get('popular_facilities', []))
-            facilities = {f.lower() for f in facilities}
-            
-            # Calculate preference match score (0-5)
-            preference_score = 0
-            if preferences:
-                pref_list = [p.strip().lower() for p in preferences.split(',')]
-                matches = sum(1 for p in pref_list if any(p in f for f in facilities))
-                preference_score = (matches / len(pref_list)) * 5 if pref_list else 0
-            
-            # Combined score (70% rating, 30% preferences)
-            total_score = (rating * 0.7) + (preference_score * 0.3)
-            
-            return total_score
-
-        # Sort hotels by combined score
-        ranked_hotels = sorted(hotels, key=get_hotel_score, reverse=True)
-        
-        # Return top 3 hotels
-        return ranked_hotels[:3]
+        # Combined score (70% rating, 30% preferences), top 3 hotels
+        with tracer.span("rank.local", ranker="local"):
+            return self.local_ranker.rank(hotels, preferences, TOP_K)
 
     def search_hotels_with_preferences(self, 
                                       destination: str, 
@@ -261,6 +1440,7 @@ class BookingAPI:
         
         return results 
 
+    @tracer.traced("booking.search_multiple_locations")
     def search_multiple_locations(self, 
                                 destinations: list, 
                                 checkin_date: str, 
@@ -268,36 +1448,98 @@ class BookingAPI:
                                 adults_number: int,
                                 room_number: int = 1,
                                 max_price: float = None,
-                                preferences: str = None) -> Dict[str, Any]:
-        """Search for hotels in multiple destinations and rank them."""
-        all_results = {}
-        openai_api = OpenAIAPI()  # Initialize OpenAI API
+                                preferences: str = None,
+                                timeout: Optional[float] = None,
+                                on_result: Optional[Callable[[str, list], None]] = None,
+                                ranker: str = DEFAULT_RANKER,
+                                max_results: Optional[int] = None,
+                                executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
+        """Search for hotels in multiple destinations concurrently and rank them.
+
+        Each destination gets at most ``timeout`` seconds; destinations that do
+        not finish in time are reported with no hotels. ``on_result`` is called
+        with (destination, hotels) as soon as each destination is done.
+        ``ranker`` is one of RANKERS; ``max_results`` caps the hotels ranked
+        per destination. Destinations answered from cached results because
+        the search endpoint is unavailable are listed under ``stale``.
+        With an ``executor`` the destinations run on it instead of on a pool
+        of their own, so searches sharing it share its bounded threads.
+        """
+        if ranker not in RANKERS:
+            raise ValueError(f"Unknown ranker '{ranker}', expected one of: {', '.join(RANKERS)}")
+        if timeout is None:
+            timeout = float(os.getenv("BOOKING_DESTINATION_TIMEOUT", DEFAULT_DESTINATION_TIMEOUT))
+        destinations = list(dict.fromkeys(destinations))
+        if not destinations:
+            return {"locations": {}}
+        results = LocationResults(destinations, on_result)
+
+        # Without an executor every destination starts at once so that the
+        # timeout applies to each of them equally; the request semaphore
+        # bounds the actual HTTP load
+        pool = executor or ThreadPoolExecutor(max_workers=len(destinations))
+        futures = {
+            pool.submit(
+                self._search_and_rank_destination,
+                destination, checkin_date, checkout_date, adults_number,
+                room_number, max_price, preferences, ranker, max_results
+            ): destination
+            for destination in destinations
+        }
         
-        for destination in destinations:
-            try:
-                results = self.search_hotels(
-                    destination=destination,
-                    checkin_date=checkin_date,
-                    checkout_date=checkout_date,
-                    adults_number=adults_number,
-                    room_number=room_number,
-                    max_price=max_price
-                )
-                
-                # Rank hotels for this location using OpenAI
-                hotels = results.get('results', [])
-                if preferences and hotels:
-                    ranked_hotels = openai_api.rank_hotels_by_preferences(hotels, preferences)
-                else:
-                    # If no preferences, rank by rating
-                    ranked_hotels = sorted(hotels, 
-                                        key=lambda x: float(x.get('review_score', {}).get('score', 0)), 
-                                        reverse=True)[:3]
-                
-                all_results[destination] = ranked_hotels
-                
-            except Exception as e:
-                console.print(f"[red]Error searching {destination}: {str(e)}[/red]")
-                all_results[destination] = []
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                destination = futures[future]
+                try:
+                    placed, unordered, from_cache = future.result()
+                except Exception as e:
+                    console.print(f"[red]Error searching {destination}: {str(e)}[/red]")
+                    placed, unordered, from_cache = [], [], False
+                results.add(destination, placed, unordered, from_cache)
+        except FuturesTimeoutError:
+            for destination in results.unfinished():
+                console.print(f"[yellow]Search for {destination} timed out after {timeout:g}s[/yellow]")
+                results.finish(destination, [])
+        finally:
+            # Don't block on destinations that timed out
+            if executor is None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            else:
+                for future in futures:
+                    future.cancel()
+        
+        # One OpenAI request covers every destination that needs it
+        if results.needs_model:
+            results.apply_model_order(self.openai_api.rank_destinations(results.model_request(), preferences))
+        return results.to_dict()
+
+    def _search_and_rank_destination(self,
+                                     destination: str,
+                                     checkin_date: str,
+                                     checkout_date: str,
+                                     adults_number: int,
+                                     room_number: int,
+                                     max_price: Optional[float],
+                                     preferences: Optional[str],
+                                     ranker: str,
+                                     max_results: Optional[int] = None) -> Tuple[list, list, bool]:
+        """Search a single destination and rank it as far as possible locally.
+
+        Returns the hotels whose place is settled, the hotels that still
+        need to be ordered by OpenAI (empty unless the ranker uses it) and
+        whether the results are stale ones served from the cache.
+        """
+        results = self.search_hotels(
+            destination=destination,
+            checkin_date=checkin_date,
+            checkout_date=checkout_date,
+            adults_number=adults_number,
+            room_number=room_number,
+            max_price=max_price,
+            max_results=max_results,
+            preferences=preferences
+        )
         
-        return {"locations": all_results} 
\ No newline at end of file
+        with tracer.span("rank.local", ranker=ranker):
+            placed, unordered = rank_locally(self.local_ranker, results.get('results', []), preferences, ranker)
+        return placed, unordered, results.get('stale', False)
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# Gauge values of the states in the metrics
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable, next attempt in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+def breaker_settings(prefix: str, slow_call_seconds: float = 10.0) -> Dict[str, Any]:
+    """Circuit breaker thresholds from ``<prefix>_BREAKER_*`` environment variables."""
+    return {
+        "failure_rate": float(os.getenv(f"{prefix}_BREAKER_FAILURE_RATE", 0.5)),
+        "window": int(os.getenv(f"{prefix}_BREAKER_WINDOW", 20)),
+        "min_calls": int(os.getenv(f"{prefix}_BREAKER_MIN_CALLS", 5)),
+        "slow_call_seconds": float(os.getenv(f"{prefix}_BREAKER_SLOW_CALL", slow_call_seconds)),
+        "open_seconds": float(os.getenv(f"{prefix}_BREAKER_OPEN_SECONDS", 30))
+    }
+
+class CircuitBreaker:
+    """Stops calling an endpoint that keeps failing or answering slowly.
+
+    The outcomes of the last ``window`` calls are kept. Once at least
+    ``min_calls`` are known and the share of failures (errors, and calls
+    slower than ``slow_call_seconds``) reaches ``failure_rate``, the breaker
+    opens: for ``open_seconds`` every call fails fast with CircuitOpenError.
+    Then a single probe call is let through (half-open); if it succeeds the
+    breaker closes, otherwise it opens again. Safe to share between threads
+    and coroutines.
+    """
+
+    def __init__(self,
+                 name: str,
+                 failure_rate: float = 0.5,
+                 window: int = 20,
+                 min_calls: int = 5,
+                 slow_call_seconds: float = 10.0,
+                 open_seconds: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_started_at = None
+        # True for each recent call that failed or was too slow
+        self.outcomes: Deque[bool] = deque(maxlen=max(window, self.min_calls))
+        self.times_opened = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return if a call may go ahead now, otherwise raise CircuitOpenError."""
+        with self.lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            retry_in = self.opened_at + self.open_seconds - now
+            if self.state == OPEN and retry_in <= 0:
+                self.state = HALF_OPEN
+                self.probe_started_at = None
+            # A probe that never reported back doesn't block the endpoint for good
+            if self.state == HALF_OPEN and (self.probe_started_at is None
+                                            or now - self.probe_started_at > self.open_seconds):
+                self.probe_started_at = now
+                return
+            self.rejected += 1
+        raise CircuitOpenError(self.name, max(retry_in, 0.0))
+
+    def record(self, ok: bool, duration: float = 0.0):
+        """Report the outcome of a call that ``allow`` let through."""
+        failed = not ok or duration > self.slow_call_seconds
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probe_started_at = None
+                if failed:
+                    self._open()
+                else:
+                    self.state = CLOSED
+                    self.outcomes.clear()
+                return
+            if self.state == OPEN:
+                # A call started before the breaker opened
+                return
+            self.outcomes.append(failed)
+            if len(self.outcomes) >= self.min_calls and sum(self.outcomes) >= self.failure_rate * len(self.outcomes):
+                self._open()
+
+    def cancel(self):
+        """Forget a call that ``allow`` let through but that never completed.
+
+        No outcome is recorded; a half-open breaker lets the next probe through.
+        """
+        with self.lock:
+            if self.state == HALF_OPEN:
+                self.probe_started_at = None
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self.outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            retry_in = self.opened_at + self.open_seconds - time.monotonic() if self.state == OPEN else 0.0
+            return {
+                "state": self.state,
+                "recent_failures": sum(self.outcomes),
+                "recent_calls": len(self.outcomes),
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_in_s": round(max(retry_in, 0.0), 1)
+            }
+
+class CircuitBreakers:
+    """One CircuitBreaker per endpoint, created on first use with shared settings."""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            with self.lock:
+                breaker = self.breakers.get(name)
+                if breaker is None:
+                    breaker = self.breakers[name] = CircuitBreaker(name, **self.settings)
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.stats() for name, breaker in sorted(self.breakers.items())}
+
+    def prometheus(self, prefix: str = "travel_agent") -> List[str]:
+        """Breaker state and counters as Prometheus text lines."""
+        stats = self.stats()
+        lines = [
+            f"# HELP {prefix}_circuit_state Circuit breaker state (0 closed, 1 half open, 2 open).",
+            f"# TYPE {prefix}_circuit_state gauge",
+        ]
+        lines.extend(f'{prefix}_circuit_state{{endpoint="{name}"}} {STATE_VALUES[s["state"]]}' for name, s in stats.items())
+        lines.append(f"# HELP {prefix}_circuit_rejected_total Calls failed fast by an open circuit breaker.")
+        lines.append(f"# TYPE {prefix}_circuit_rejected_total counter")
+        lines.extend(f'{prefix}_circuit_rejected_total{{endpoint="{name}"}} {s["rejected"]}' for name, s in stats.items())
+        lines.append(f"# HELP {prefix}_circuit_opened_total Times a circuit breaker opened.")
+        lines.append(f"# TYPE {prefix}_circuit_opened_total counter")
+        lines.extend(f'{prefix}_circuit_opened_total{{endpoint="{name}"}} {s["times_opened"]}' for name, s in stats.items())
+        return lines
@@ -0,0 +1,20 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library parser is used instead
+    orjson = None
+
+# Parser used for response bodies, shown by the decoding benchmark
+JSON_PARSER = "orjson" if orjson is not None else "json"
+
+def loads(content: Union[bytes, str]) -> Any:
+    """Parse a JSON document with orjson when it is installed.
+
+    Takes the raw response body, so the bytes are never decoded to a str
+    first when orjson is used.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
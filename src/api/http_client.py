@@ -0,0 +1,168 @@
+import asyncio
+import random
+import threading
+import time
+import requests
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Mapping, Optional
+
+# Responses worth retrying; everything else is returned to the caller as-is
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Client-side rate limiter shared by every request of one client.
+
+    Tokens refill at ``rate`` per second up to ``capacity``. The bucket can
+    also be paused until a given time when the server reports that the quota
+    is used up. It is safe to share between threads and coroutines.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token if one is available, otherwise return how long to wait."""
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Block until a token is available and take it."""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait without blocking the event loop until a token is available."""
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for the next ``seconds`` seconds."""
+        with self.lock:
+            now = time.monotonic()
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = 0
+            self.updated_at = max(now, self.paused_until)
+
+class RetryPolicy:
+    """Backoff and rate-limit header handling shared by the sync and async clients."""
+
+    def __init__(self, max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 30.0):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def retry_delay(self, attempt: int, status_code: int, headers: Mapping[str, str]) -> float:
+        """How long to wait before retrying a response with this status."""
+        delay = self.backoff(attempt)
+        if status_code == 429:
+            delay = max(delay, self.retry_after(headers) or 0)
+        return delay
+
+    def retry_after(self, headers: Mapping[str, str]) -> Optional[float]:
+        """Seconds the server asked us to wait, from Retry-After or RapidAPI's reset headers."""
+        retry_after = headers.get("Retry-After")
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+                except (TypeError, ValueError):
+                    pass
+        for header in ("X-RateLimit-Requests-Reset", "X-RateLimit-Reset"):
+            reset = _header_float(headers, header)
+            if reset is not None:
+                return min(reset, self.backoff_max)
+        return None
+
+    def observe(self, bucket: TokenBucket, status_code: int, headers: Mapping[str, str]):
+        """Pause the token bucket when RapidAPI reports an exhausted quota."""
+        for prefix in ("X-RateLimit-Requests", "X-RateLimit"):
+            remaining = _header_float(headers, f"{prefix}-Remaining")
+            if remaining is not None and remaining <= 0:
+                reset = _header_float(headers, f"{prefix}-Reset")
+                bucket.pause(min(reset if reset is not None else self.backoff_max, self.backoff_max))
+                return
+        if status_code == 429:
+            bucket.pause(self.retry_after(headers) or self.backoff(0))
+
+class HttpClient:
+    """Pooled keep-alive HTTP session with timeouts, retries and rate limiting."""
+
+    def __init__(self,
+                 headers: Dict[str, str],
+                 pool_size: int = 10,
+                 connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0,
+                 rate_limit: float = 5.0,
+                 burst: int = 10):
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry = RetryPolicy(max_retries, backoff_base, backoff_max)
+        self.bucket = TokenBucket(rate_limit, burst)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """Send a GET request, retrying connection errors, 429s and 5xx responses."""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                response = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.retry.max_retries:
+                    raise
+                time.sleep(self.retry.backoff(attempt))
+                attempt += 1
+                continue
+
+            self.retry.observe(self.bucket, response.status_code, response.headers)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retry.max_retries:
+                return response
+
+            time.sleep(self.retry.retry_delay(attempt, response.status_code, response.headers))
+            attempt += 1
+
+    def close(self):
+        self.session.close()
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
@@ -1,76 +1,254 @@
 import os
-from openai import OpenAI
-from typing import List, Dict
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import timedelta
+from typing import Any, List, Dict, Optional
 from rich.console import Console
 from dotenv import load_dotenv
+from api.circuit_breaker import CircuitBreakers, breaker_settings
+from api.ranking import DEFAULT_VOCABULARY, LocalRanker, parse_preferences
+from api.tracing import tracer
+from models.cache import Cache
+from models.hotel import Hotel
 
 load_dotenv()
 console = Console()
 
-class OpenAIAPI:
+# Rankings only depend on the hotels and preferences, not on live prices
+RANKING_TTL = timedelta(days=1)
+
+RANKING_MODEL = "gpt-3.5-turbo"
+RANKING_SYSTEM_PROMPT = (
+    "You are a hotel ranking assistant. Respond only with one line per destination "
+    "in the form '<destination number>: <comma-separated hotel indices>'."
+)
+# Completions slower than this count against the OpenAI circuit breaker
+OPENAI_SLOW_CALL_SECONDS = 20.0
+RANKING_LINE = re.compile(r"^\D*?(\d+)\s*:\s*([\d,\s]+)$")
+TOP_K = 3
+
+def ranking_cache_key(hotels: List[Hotel], preferences: str) -> str:
+    """Cache key for a ranking of these hotels against these preferences."""
+    payload = json.dumps([
+        ",".join(sorted(set(parse_preferences(preferences)))),
+        [[hotel.hotel_id, hotel.score] for hotel in hotels]
+    ], separators=(',', ':'))
+    return f"rank_hotels:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+def hotels_from_ids(hotels: List[Hotel], hotel_ids: List[str]) -> List[Hotel]:
+    """Pick hotels by ID, in the order of hotel_ids."""
+    hotels_by_id = {hotel.hotel_id: hotel for hotel in hotels}
+    return [hotels_by_id[hotel_id] for hotel_id in hotel_ids if hotel_id in hotels_by_id]
+
+def fallback_ranking(hotels: List[Hotel], preferences: Optional[str] = None) -> List[Hotel]:
+    """Local rating/preference ranking used when the model can't be used."""
+    return LocalRanker().rank(hotels, preferences)
+
+class RankingBatch:
+    """One OpenAI request ranking the hotels of several destinations.
+
+    Destinations already ranked in the cache are resolved up front and left
+    out of the prompt. Facility names are sent once as a numbered legend and
+    hotels refer to them by number, which keeps the prompt small when
+    destinations share facilities.
+    """
+
+    def __init__(self, hotels_by_destination: Dict[str, List[Hotel]], preferences: str, cache: Optional[Cache]):
+        self.preferences = preferences
+        self.cache = cache
+        self.results: Dict[str, List[Hotel]] = {}
+        self.pending: Dict[str, List[Hotel]] = {}
+        self.cache_keys: Dict[str, str] = {}
+
+        for destination, hotels in hotels_by_destination.items():
+            if not hotels:
+                self.results[destination] = hotels
+                continue
+            cache_key = self.cache_keys[destination] = ranking_cache_key(hotels, preferences)
+            cached_ids = cache.get(cache_key) if cache is not None else None
+            if cached_ids is not None:
+                self.results[destination] = hotels_from_ids(hotels, cached_ids)
+            else:
+                self.pending[destination] = hotels
+
+    @property
+    def hotel_count(self) -> int:
+        return sum(len(hotels) for hotels in self.pending.values())
+
+    def max_tokens(self) -> int:
+        return 20 + 15 * len(self.pending)
+
+    def messages(self) -> List[Dict]:
+        """Chat messages asking for the top hotels of every pending destination."""
+        # Facility vocabulary ID -> code in the prompt, numbered from 0
+        codes: Dict[int, int] = {}
+        sections = []
+        for number, hotels in enumerate(self.pending.values()):
+            lines = [f"Destination {number}:"]
+            for index, hotel in enumerate(hotels):
+                facility_ids = dict.fromkeys(hotel.popular_facility_ids + hotel.facility_ids)
+                facility_codes = ",".join(str(codes.setdefault(f, len(codes))) for f in facility_ids)
+                rating = hotel.score if hotel.score is not None else 'N/A'
+                lines.append(f"{index}|{rating}|{facility_codes}")
+            sections.append("\n".join(lines))
+
+        names = DEFAULT_VOCABULARY.names
+        legend = ";".join(f"{code}={names[facility_id]}" for facility_id, code in codes.items())
+        prompt = (
+            f"User preferences: '{self.preferences}'.\n"
+            f"For each destination, rank the top {TOP_K} hotels based on how well they match "
+            f"the preferences and their ratings.\n"
+            f"Facility codes: {legend}\n"
+            f"Hotels are listed as index|rating|facility codes.\n\n"
+            + "\n\n".join(sections)
+            + f"\n\nReturn one line per destination: '<destination number>: <indices of its top {TOP_K} hotels in order (0-based)>'."
+        )
+        return [
+            {"role": "system", "content": RANKING_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+
+    def apply_response(self, content: str):
+        """Resolve pending destinations from the model's answer and cache them."""
+        indices_by_number: Dict[int, List[int]] = {}
+        for line in content.strip().splitlines():
+            match = RANKING_LINE.match(line.strip())
+            if match:
+                indices = [int(idx) for idx in match.group(2).replace(' ', '').split(',') if idx]
+                indices_by_number[int(match.group(1))] = indices[:TOP_K]
+
+        # A bare list of indices is a valid answer for a single destination
+        if not indices_by_number and len(self.pending) == 1:
+            try:
+                indices_by_number[0] = [int(idx.strip()) for idx in content.strip().split(',')][:TOP_K]
+            except ValueError:
+                pass
+
+        if not indices_by_number:
+            console.print("[yellow]Error parsing OpenAI ranking response, using default ranking[/yellow]")
+
+        for number, (destination, hotels) in enumerate(self.pending.items()):
+            indices = indices_by_number.get(number)
+            ranked = [hotels[idx] for idx in indices if 0 <= idx < len(hotels)] if indices else []
+            if not ranked:
+                self.results[destination] = fallback_ranking(hotels, self.preferences)
+                continue
+            self.results[destination] = ranked
+            if self.cache is not None:
+                self.cache.set(self.cache_keys[destination], [hotel.hotel_id for hotel in ranked], RANKING_TTL)
+        self.pending = {}
+
+    def fallback(self):
+        """Rank every pending destination locally."""
+        for destination, hotels in self.pending.items():
+            self.results[destination] = fallback_ranking(hotels, self.preferences)
+        self.pending = {}
+
+def usage_record(response: Any, started: float, batch: RankingBatch) -> Dict[str, Any]:
+    """Token usage and latency of one ranking request."""
+    usage = getattr(response, 'usage', None)
+    return {
+        "destinations": len(batch.pending),
+        "hotels": batch.hotel_count,
+        "prompt_tokens": getattr(usage, 'prompt_tokens', 0) or 0,
+        "completion_tokens": getattr(usage, 'completion_tokens', 0) or 0,
+        "total_tokens": getattr(usage, 'total_tokens', 0) or 0,
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+class UsageLog:
+    """Thread-safe list of ranking requests made by one client."""
+
     def __init__(self):
+        self.lock = threading.Lock()
+        self.records: List[Dict[str, Any]] = []
+
+    def add(self, record: Dict[str, Any]):
+        with self.lock:
+            self.records.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            records = list(self.records)
+        return {
+            "calls": len(records),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+            "completion_tokens": sum(r["completion_tokens"] for r in records),
+            "total_tokens": sum(r["total_tokens"] for r in records),
+            "latency_ms": round(sum(r["latency_ms"] for r in records), 1)
+        }
+
+def openai_breakers() -> CircuitBreakers:
+    """Breaker for the completions endpoint; while it is open rankings fall back at once."""
+    return CircuitBreakers(**breaker_settings("OPENAI", OPENAI_SLOW_CALL_SECONDS))
+
+class OpenAIAPI:
+    def __init__(self, cache: Optional[Cache] = None):
         self.api_key = os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY not found in environment variables")
-        self.client = OpenAI(api_key=self.api_key)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.cache = cache
+        self.usage = UsageLog()
+        self.breakers = openai_breakers()
+
+    @property
+    def client(self):
+        """OpenAI client, built on first use; importing openai is slow."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(api_key=self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
 
-    def rank_hotels_by_preferences(self, hotels: List[Dict], preferences: str) -> List[Dict]:
+    def rank_hotels_by_preferences(self, hotels: List[Hotel], preferences: str) -> List[Hotel]:
         """Rank hotels based on user preferences using OpenAI."""
         if not hotels or not preferences:
             return hotels
+        return self.rank_destinations({"": hotels}, preferences)[""]
 
-        try:
-            # Prepare hotel information for the prompt
-            hotel_info = []
-            for hotel in hotels:
-                facilities = set()
-                facilities.update(hotel.get('facilities', []))
-                facilities.update(hotel.get('popular_facilities', []))
-                
-                hotel_info.append({
-                    'name': hotel.get('hotel_name'),
-                    'rating': hotel.get('review_score', {}).get('score', 'N/A'),
-                    'facilities': list(facilities)
-                })
-
-            # Create the prompt
-            prompt = f"""Given the following hotels and user preferences: '{preferences}',
-            rank the top 3 hotels based on how well they match the preferences and their ratings.
-            Consider both the facilities and the rating score.
-            
-            Hotels:
-            {hotel_info}
-            
-            Return only the indices of the top 3 hotels in order (0-based index), separated by commas."""
-
-            # Get ranking from OpenAI
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a hotel ranking assistant. Respond only with comma-separated indices."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=50,
-                temperature=0.3
-            )
-
-            # Parse response
-            indices_str = response.choices[0].message.content.strip()
+    @tracer.traced("openai.rank_destinations")
+    def rank_destinations(self, hotels_by_destination: Dict[str, List[Hotel]], preferences: str) -> Dict[str, List[Hotel]]:
+        """Rank the hotels of several destinations with a single OpenAI request."""
+        batch = RankingBatch(hotels_by_destination, preferences, self.cache)
+        tracer.annotate(cache="miss" if batch.pending else "hit")
+        if not batch.pending:
+            return batch.results
+
+        with tracer.span("openai.chat_completion", destinations=len(batch.pending)) as span:
             try:
-                indices = [int(idx.strip()) for idx in indices_str.split(',')][:3]
-                # Reorder hotels based on ranking
-                ranked_hotels = []
-                for idx in indices:
-                    if 0 <= idx < len(hotels):
-                        ranked_hotels.append(hotels[idx])
-                return ranked_hotels
-            except ValueError:
-                console.print("[yellow]Error parsing OpenAI ranking response, using default ranking[/yellow]")
-                return hotels[:3]
-
-        except Exception as e:
-            console.print(f"[yellow]Error using OpenAI for ranking: {str(e)}. Using default ranking.[/yellow]")
-            # Fall back to simple rating-based ranking
-            return sorted(hotels, 
-                        key=lambda x: float(x.get('review_score', {}).get('score', 0)), 
-                        reverse=True)[:3] 
\ No newline at end of file
+                breaker = self.breakers.get("openai.chat_completion")
+                breaker.allow()
+                started = time.perf_counter()
+                try:
+                    response = self.client.chat.completions.create(
+                        model=RANKING_MODEL,
+                        messages=batch.messages(),
+                        max_tokens=batch.max_tokens(),
+                        temperature=0.3
+                    )
+                except Exception:
+                    breaker.record(False, time.perf_counter() - started)
+                    raise
+                breaker.record(True, time.perf_counter() - started)
+                record = usage_record(response, started, batch)
+                self.usage.add(record)
+                span.set(prompt_tokens=record["prompt_tokens"], completion_tokens=record["completion_tokens"])
+                batch.apply_response(response.choices[0].message.content)
+
+            except Exception as e:
+                span.error = True
+                console.print(f"[yellow]Error using OpenAI for ranking: {str(e)}. Using default ranking.[/yellow]")
+                # Fall back to the local ranking
+                batch.fallback()
+
+        return batch.results
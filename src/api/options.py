@@ -0,0 +1,35 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+# Search options and their defaults, kept apart from the Booking.com client
+# so that the CLI can build its help and check its arguments without
+# importing the HTTP stack
+
+# How hotels are ranked against preferences: "local" scores them here,
+# "openai" asks the model, "hybrid" scores locally and only asks the model
+# to break ties at the top-3 cutoff
+RANKERS = ("local", "openai", "hybrid")
+DEFAULT_RANKER = "local"
+
+# Default and largest radius of a nearby search
+DEFAULT_NEARBY_RADIUS_KM = 2.0
+MAX_NEARBY_RADIUS_KM = 20.0
+
+def count_nights(checkin_date: str, checkout_date: str) -> int:
+    """Number of nights between two YYYY-MM-DD dates."""
+    checkin = datetime.strptime(checkin_date, "%Y-%m-%d")
+    checkout = datetime.strptime(checkout_date, "%Y-%m-%d")
+    return (checkout - checkin).days
+
+def default_dates(checkin_date: Optional[str], checkout_date: Optional[str]) -> Tuple[str, str]:
+    """Fill in tomorrow / the day after for missing dates and validate both."""
+    if not checkin_date:
+        checkin_date = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    if not checkout_date:
+        checkout_date = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+    for value in (checkin_date, checkout_date):
+        try:
+            datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+    return checkin_date, checkout_date
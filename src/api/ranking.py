@@ -0,0 +1,161 @@
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from models.hotel import Hotel
+
+# Preference terms users type, mapped to the phrases Booking.com uses for
+# the matching facilities. A preference always matches itself as well.
+FACILITY_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "pool": ("swimming pool", "outdoor pool", "indoor pool", "infinity pool", "rooftop pool", "plunge pool"),
+    "wifi": ("wi-fi", "wi fi", "internet", "wireless"),
+    "spa": ("spa and wellness", "wellness", "sauna", "hot tub", "jacuzzi", "massage", "steam room", "hammam"),
+    "gym": ("fitness centre", "fitness center", "fitness room", "fitness"),
+    "fitness": ("gym", "fitness centre", "fitness center"),
+    "parking": ("car park", "garage", "valet"),
+    "beach": ("beachfront", "private beach", "beach access"),
+    "breakfast": ("breakfast included", "continental breakfast", "buffet breakfast"),
+    "restaurant": ("dining", "on-site restaurant"),
+    "bar": ("lounge", "pub", "snack bar"),
+    "shuttle": ("airport shuttle", "shuttle service"),
+    "airport": ("airport shuttle", "airport transfer"),
+    "pets": ("pets allowed", "pet friendly", "pet-friendly"),
+    "pet": ("pets allowed", "pet friendly", "pet-friendly"),
+    "ac": ("air conditioning", "air-conditioned"),
+    "air conditioning": ("air-conditioned", "air con"),
+    "family": ("family rooms", "kids' club", "kids club", "children's playground", "babysitting"),
+    "kids": ("kids' club", "kids club", "children's playground", "family rooms"),
+    "accessible": ("facilities for disabled guests", "wheelchair accessible", "accessible"),
+    "kitchen": ("kitchenette", "kitchen facilities"),
+    "view": ("sea view", "city view", "mountain view", "lake view", "garden view"),
+    "non-smoking": ("non-smoking rooms", "non smoking"),
+    "room service": ("24-hour room service",),
+    "laundry": ("laundry service", "dry cleaning"),
+}
+
+RATING_WEIGHT = 0.7
+PREFERENCE_WEIGHT = 0.3
+# Preference matches are scored on a 0-5 scale
+MAX_PREFERENCE_SCORE = 5
+
+def parse_preferences(preferences: Optional[str]) -> List[str]:
+    """Split a comma-separated preference string into normalized terms."""
+    if not preferences:
+        return []
+    return [p.strip().lower() for p in preferences.split(',') if p.strip()]
+
+class FacilityVocabulary:
+    """Every facility name seen so far, interned as an integer ID.
+
+    A set of facilities is represented as an int bitmask over these IDs, so
+    checking a hotel against a preference is a single ``&``. Names keep
+    their original spelling for display and are matched case-insensitively.
+    Each preference is matched against each facility name only once; the
+    resulting masks are extended as new facility names are added.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids: Dict[str, int] = {}
+        self.names: List[str] = []
+        # preference -> (compiled matcher, matching mask, vocabulary size it covers)
+        self._matchers: Dict[str, Tuple["re.Pattern", int, int]] = {}
+
+    def intern(self, name: str) -> int:
+        """ID for a facility name, adding it if it is new."""
+        name = name.strip()
+        facility_id = self.ids.get(name)
+        if facility_id is None:
+            with self.lock:
+                facility_id = self.ids.get(name)
+                if facility_id is None:
+                    facility_id = self.ids[name] = len(self.names)
+                    self.names.append(name)
+        return facility_id
+
+    def mask(self, facilities: Iterable[str]) -> int:
+        """Bitmask of a hotel's facilities."""
+        mask = 0
+        for name in facilities:
+            if name:
+                mask |= 1 << self.intern(name)
+        return mask
+
+    def preference_mask(self, preference: str) -> int:
+        """Bitmask of every known facility that satisfies a preference."""
+        with self.lock:
+            pattern, mask, covered = self._matchers.get(preference, (None, 0, 0))
+            if pattern is None:
+                pattern = compile_preference(preference)
+            for facility_id in range(covered, len(self.names)):
+                if pattern.search(self.names[facility_id].lower()):
+                    mask |= 1 << facility_id
+            self._matchers[preference] = (pattern, mask, len(self.names))
+            return mask
+
+def compile_preference(preference: str) -> "re.Pattern":
+    """Regex matching a preference or any of its synonyms inside a facility name."""
+    terms = {preference, *FACILITY_SYNONYMS.get(preference, ())}
+    alternatives = sorted((re.escape(term) for term in terms), key=len, reverse=True)
+    # Substring matching, like the original ranking
+    return re.compile("|".join(alternatives))
+
+# Shared by every ranker in the process so facility names are interned once
+DEFAULT_VOCABULARY = FacilityVocabulary()
+
+class LocalRanker:
+    """Deterministic rating/preference ranking that needs no network calls.
+
+    Scores are 70% review score and 30% the share of preferences a hotel
+    matches, the same formula BookingAPI.rank_hotels has always used.
+    """
+
+    def __init__(self, vocabulary: Optional[FacilityVocabulary] = None):
+        self.vocabulary = vocabulary or DEFAULT_VOCABULARY
+
+    def facility_mask(self, hotel: "Hotel") -> int:
+        if self.vocabulary is DEFAULT_VOCABULARY:
+            return hotel.facility_mask
+        return self.vocabulary.mask([*hotel.facilities, *hotel.popular_facilities])
+
+    def scores(self, hotels: List["Hotel"], preferences: Optional[str]) -> List[float]:
+        """Combined score for every hotel, in the order given."""
+        pref_list = parse_preferences(preferences)
+        hotel_masks = [self.facility_mask(hotel) for hotel in hotels] if pref_list else []
+        # Computed after the hotels so that newly interned facilities are covered
+        pref_masks = [self.vocabulary.preference_mask(p) for p in pref_list]
+
+        scores = []
+        for index, hotel in enumerate(hotels):
+            preference_score = 0.0
+            if pref_masks:
+                hotel_mask = hotel_masks[index]
+                matches = sum(1 for pref_mask in pref_masks if hotel_mask & pref_mask)
+                preference_score = matches / len(pref_masks) * MAX_PREFERENCE_SCORE
+            scores.append(hotel.rating * RATING_WEIGHT + preference_score * PREFERENCE_WEIGHT)
+        return scores
+
+    def rank(self, hotels: List["Hotel"], preferences: Optional[str] = None, top_k: int = 3) -> List["Hotel"]:
+        """Top ``top_k`` hotels, best first; ties keep the input order."""
+        return [hotel for hotel, _ in self.rank_with_scores(hotels, preferences)[:top_k]]
+
+    def rank_with_scores(self, hotels: List["Hotel"], preferences: Optional[str] = None) -> List[Tuple["Hotel", float]]:
+        """All hotels with their scores, best first; ties keep the input order."""
+        scores = self.scores(hotels, preferences)
+        order = sorted(range(len(hotels)), key=lambda i: -scores[i])
+        return [(hotels[i], scores[i]) for i in order]
+
+def split_at_cutoff(ranked: List[Tuple["Hotel", float]], top_k: int) -> Tuple[List["Hotel"], List["Hotel"]]:
+    """Split ranked hotels into sure top-k picks and the group tied at the cutoff.
+
+    The tied group is empty when the top ``top_k`` are unambiguous.
+    """
+    if len(ranked) <= top_k:
+        return [hotel for hotel, _ in ranked], []
+    cutoff = ranked[top_k - 1][1]
+    if ranked[top_k][1] != cutoff:
+        return [hotel for hotel, _ in ranked[:top_k]], []
+    sure = [hotel for hotel, score in ranked if score > cutoff]
+    tied = [hotel for hotel, score in ranked if score == cutoff]
+    return sure, tied
@@ -0,0 +1,215 @@
+import functools
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, IO, Iterator, List, Optional
+
+# Upper bounds (seconds) of the Prometheus duration histogram buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Spans kept for --profile / JSON lines export; aggregates are unbounded in time
+MAX_RECORDED_SPANS = 100_000
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation and the attributes recorded on it."""
+
+    __slots__ = ("name", "started_at", "duration", "attributes", "error")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.attributes = attributes
+        self.error = False
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "started_at": round(self.started_at, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            **self.attributes
+        }
+
+class _Stats:
+    __slots__ = ("count", "errors", "total", "bytes", "cache_hits", "cache_misses", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+
+class Tracer:
+    """Collects spans around API calls.
+
+    Aggregates (counts, durations, bytes, cache hits) are always kept, so
+    metrics can be exported at any time. Individual spans are only kept
+    while ``recording`` is on, e.g. for the ``--profile`` flag.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.recording = False
+        self.spans: List[Span] = []
+        self.stats: Dict[str, _Stats] = {}
+        self.http_statuses: Dict[tuple, int] = {}
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        span = Span(name, attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException:
+            span.error = True
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            _current_span.reset(token)
+            self._finish(span)
+
+    def current(self) -> Optional[Span]:
+        """Innermost open span of the calling thread or task."""
+        return _current_span.get()
+
+    def annotate(self, **attributes):
+        """Add attributes to the current span, if there is one."""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attributes)
+
+    def traced(self, name: str):
+        """Decorator running a function or coroutine inside a span."""
+        def decorator(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, span: Span):
+        status = span.attributes.get("status")
+        if isinstance(status, int) and status >= 400:
+            span.error = True
+        with self.lock:
+            stats = self.stats.get(span.name)
+            if stats is None:
+                stats = self.stats[span.name] = _Stats()
+            stats.count += 1
+            stats.errors += span.error
+            stats.total += span.duration
+            stats.bytes += span.attributes.get("bytes", 0)
+            cache = span.attributes.get("cache")
+            if cache == "hit":
+                stats.cache_hits += 1
+            elif cache == "miss":
+                stats.cache_misses += 1
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if span.duration <= bound:
+                    stats.buckets[index] += 1
+                    break
+            if status is not None:
+                key = (span.name, str(status))
+                self.http_statuses[key] = self.http_statuses.get(key, 0) + 1
+            if self.recording and len(self.spans) < MAX_RECORDED_SPANS:
+                self.spans.append(span)
+
+    def start_recording(self):
+        """Keep individual spans from now on, dropping earlier ones."""
+        with self.lock:
+            self.spans = []
+            self.recording = True
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per-span breakdown of the recorded spans, slowest total first."""
+        with self.lock:
+            spans = list(self.spans)
+        grouped: Dict[str, List[Span]] = {}
+        for span in spans:
+            grouped.setdefault(span.name, []).append(span)
+
+        rows = []
+        for name, group in grouped.items():
+            durations = sorted(span.duration for span in group)
+            total = sum(durations)
+            rows.append({
+                "name": name,
+                "calls": len(group),
+                "total_ms": round(total * 1000, 1),
+                "mean_ms": round(total / len(group) * 1000, 1),
+                "p95_ms": round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 1),
+                "errors": sum(1 for span in group if span.error),
+                "bytes": sum(span.attributes.get("bytes", 0) for span in group),
+                "cache_hits": sum(1 for span in group if span.attributes.get("cache") == "hit"),
+                "cache_misses": sum(1 for span in group if span.attributes.get("cache") == "miss"),
+            })
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def write_jsonl(self, out: IO[str]):
+        """Write every recorded span as one JSON object per line."""
+        with self.lock:
+            spans = list(self.spans)
+        for span in spans:
+            out.write(json.dumps(span.to_dict()) + "\n")
+
+    def prometheus(self, prefix: str = "travel_agent") -> str:
+        """Aggregated metrics in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Duration of API calls and processing stages.",
+            f"# TYPE {prefix}_span_duration_seconds histogram",
+        ]
+        with self.lock:
+            stats_items = sorted(self.stats.items())
+            statuses = sorted(self.http_statuses.items())
+            for name, stats in stats_items:
+                cumulative = 0
+                for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {stats.count}')
+                lines.append(f'{prefix}_span_duration_seconds_sum{{span="{name}"}} {stats.total:.6f}')
+                lines.append(f'{prefix}_span_duration_seconds_count{{span="{name}"}} {stats.count}')
+
+            lines.append(f"# HELP {prefix}_span_errors_total Failed API calls and stages.")
+            lines.append(f"# TYPE {prefix}_span_errors_total counter")
+            lines.extend(f'{prefix}_span_errors_total{{span="{name}"}} {stats.errors}' for name, stats in stats_items)
+
+            lines.append(f"# HELP {prefix}_payload_bytes_total Response bytes received from upstream APIs.")
+            lines.append(f"# TYPE {prefix}_payload_bytes_total counter")
+            lines.extend(f'{prefix}_payload_bytes_total{{span="{name}"}} {stats.bytes}' for name, stats in stats_items if stats.bytes)
+
+            lines.append(f"# HELP {prefix}_cache_lookups_total Cache lookups by result.")
+            lines.append(f"# TYPE {prefix}_cache_lookups_total counter")
+            for name, stats in stats_items:
+                if stats.cache_hits or stats.cache_misses:
+                    lines.append(f'{prefix}_cache_lookups_total{{span="{name}",result="hit"}} {stats.cache_hits}')
+                    lines.append(f'{prefix}_cache_lookups_total{{span="{name}",result="miss"}} {stats.cache_misses}')
+
+            lines.append(f"# HELP {prefix}_http_responses_total Upstream HTTP responses by status code.")
+            lines.append(f"# TYPE {prefix}_http_responses_total counter")
+            lines.extend(f'{prefix}_http_responses_total{{span="{name}",status="{status}"}} {count}'
+                         for (name, status), count in statuses)
+        return "\n".join(lines) + "\n"
+
+# Process-wide tracer used by the API clients and the CLI
+tracer = Tracer()
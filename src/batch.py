@@ -0,0 +1,104 @@
+import json
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, IO, Iterable, Iterator
+from api.options import DEFAULT_RANKER, RANKERS, default_dates
+from models.hotel import locations_to_dicts
+
+if TYPE_CHECKING:
+    from api.booking_api import BookingAPI
+
+DEFAULT_BATCH_WORKERS = 4
+
+def parse_spec(line: str, default_ranker: str = DEFAULT_RANKER) -> Dict[str, Any]:
+    """Turn one JSONL line into keyword arguments for search_multiple_locations."""
+    spec = json.loads(line)
+    if not isinstance(spec, dict):
+        raise ValueError("Expected a JSON object")
+    return spec_params(spec, default_ranker)
+
+def spec_params(spec: Dict[str, Any], default_ranker: str = DEFAULT_RANKER) -> Dict[str, Any]:
+    """Keyword arguments for search_multiple_locations from a search spec.
+
+    ``destinations`` may be a list or a comma-separated string; the other
+    fields (checkin, checkout, adults, rooms, budget, preferences, ranker,
+    max_results) are optional and default like the search command.
+    """
+    destinations = spec.get("destinations") or spec.get("destination") or []
+    if isinstance(destinations, str):
+        destinations = destinations.split(",")
+    destinations = [str(d).strip() for d in destinations if str(d).strip()]
+    if not destinations:
+        raise ValueError("Please provide at least one destination")
+
+    ranker = spec.get("ranker") or default_ranker
+    if ranker not in RANKERS:
+        raise ValueError(f"Unknown ranker '{ranker}', expected one of: {', '.join(RANKERS)}")
+
+    checkin, checkout = default_dates(spec.get("checkin"), spec.get("checkout"))
+    budget = spec.get("budget")
+    max_results = spec.get("max_results")
+    return {
+        "destinations": destinations,
+        "checkin_date": checkin,
+        "checkout_date": checkout,
+        "adults_number": int(spec.get("adults", 2)),
+        "room_number": int(spec.get("rooms", 1)),
+        "max_price": float(budget) if budget is not None else None,
+        "preferences": spec.get("preferences"),
+        "ranker": ranker,
+        "max_results": int(max_results) if max_results is not None else None
+    }
+
+def run_search(booking_api: "BookingAPI", line_number: int, line: str, default_ranker: str) -> Dict[str, Any]:
+    """Run one search spec; failures become an ``error`` record instead of stopping the batch."""
+    record: Dict[str, Any] = {"line": line_number}
+    try:
+        params = parse_spec(line, default_ranker)
+        record["query"] = {
+            "destinations": params["destinations"],
+            "checkin": params["checkin_date"],
+            "checkout": params["checkout_date"],
+            "adults": params["adults_number"],
+            "rooms": params["room_number"],
+            "budget": params["max_price"],
+            "preferences": params["preferences"]
+        }
+        record.update(locations_to_dicts(booking_api.search_multiple_locations(**params)))
+    except Exception as e:
+        record["error"] = str(e)
+    return record
+
+def run_batch(booking_api: "BookingAPI",
+              lines: Iterable[str],
+              workers: int = DEFAULT_BATCH_WORKERS,
+              default_ranker: str = DEFAULT_RANKER) -> Iterator[Dict[str, Any]]:
+    """Run search specs through a shared worker pool, yielding results in input order.
+
+    Lines are read lazily and at most ``2 * workers`` searches are queued at
+    once, so memory stays flat however long the input is. Every search
+    shares the BookingAPI's cache and single-flight layer, so a destination
+    or hotel looked up by one itinerary is not fetched again by the others.
+    """
+    window = max(1, workers) * 2
+    pending: "deque[Future]" = deque()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            pending.append(executor.submit(run_search, booking_api, line_number, line, default_ranker))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def write_jsonl(records: Iterable[Dict[str, Any]], out: IO[str], flush: bool = True) -> Dict[str, int]:
+    """Write each record as soon as it is ready; returns counts of searches and errors."""
+    counts = {"searches": 0, "errors": 0}
+    for record in records:
+        out.write(json.dumps(record) + "\n")
+        if flush:
+            out.flush()
+        counts["searches"] += 1
+        counts["errors"] += "error" in record
+    return counts
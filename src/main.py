@@ -1,17 +1,45 @@
+import sys
+import time
 import typer
 from rich.console import Console
-from rich.table import Table
+from contextlib import ExitStack
 from datetime import datetime, timedelta
-from typing import Optional
-from api.booking_api import BookingAPI
-from api.openai_api import OpenAIAPI
-from models.cache import Cache
+from typing import TYPE_CHECKING, List, Optional
+from api.options import DEFAULT_NEARBY_RADIUS_KM, DEFAULT_RANKER, RANKERS
+from api.tracing import tracer
+from batch import DEFAULT_BATCH_WORKERS
+from models.snapshot import DEFAULT_SNAPSHOT_NAMESPACES
+from output import OUTPUT_FORMATS
+from warm import DEFAULT_WARM_EVERY, DEFAULT_WARM_MARGIN, DEFAULT_WARM_WORKERS
+
+if TYPE_CHECKING:
+    from api.booking_api import BookingAPI
+    from models.cache import Cache
+    from output import RecordWriter
 
 app = typer.Typer()
+cache_app = typer.Typer(help="Export and import cache snapshots.")
+app.add_typer(cache_app, name="cache")
 console = Console()
-booking_api = BookingAPI()
-openai_api = OpenAIAPI()
-cache = Cache()
+
+# Clients are created by the first command that needs them and then reused,
+# so --help never opens the cache or builds HTTP and OpenAI clients
+_cache: Optional["Cache"] = None
+_booking_api: Optional["BookingAPI"] = None
+
+def get_cache() -> "Cache":
+    global _cache
+    if _cache is None:
+        from models.cache import Cache
+        _cache = Cache()
+    return _cache
+
+def get_booking_api() -> "BookingAPI":
+    global _booking_api
+    if _booking_api is None:
+        from api.booking_api import BookingAPI
+        _booking_api = BookingAPI(cache=get_cache())
+    return _booking_api
 
 @app.command()
 def search(
@@ -21,25 +49,75 @@ def search(
     adults: int = typer.Option(2, help="Number of adults"),
     rooms: int = typer.Option(1, help="Number of rooms"),
     budget: Optional[float] = typer.Option(None, help="Maximum total budget for the entire stay in USD"),
-    preferences: Optional[str] = typer.Option(None, help="Comma-separated preferences (e.g., 'pool,beach,spa')")
+    preferences: Optional[str] = typer.Option(None, help="Comma-separated preferences (e.g., 'pool,beach,spa')"),
+    stream: bool = typer.Option(False, help="Show each destination's hotels as soon as that destination finishes"),
+    timeout: Optional[float] = typer.Option(None, help="Maximum seconds to wait for each destination"),
+    ranker: str = typer.Option(DEFAULT_RANKER, help="How to rank by preferences: local, openai or hybrid (local with OpenAI tie-breaking)"),
+    max_results: Optional[int] = typer.Option(None, help="Hotels within budget to consider per destination (default 20), read across result pages"),
+    sweep_to: Optional[str] = typer.Option(None, help="Sweep check-in dates from --checkin to this date (YYYY-MM-DD) and show a price matrix"),
+    nights: Optional[str] = typer.Option(None, help="Stay lengths to sweep, e.g. '2,3' or '2-4' (default: --checkin to --checkout)"),
+    overall_top: Optional[int] = typer.Option(None, help="Rank every destination together and show this many best hotels overall"),
+    min_rating: Optional[float] = typer.Option(None, help="With --overall-top, skip hotels rated below this review score"),
+    output: str = typer.Option("table", help="table, or json / ndjson to stream hotel records to stdout as they are ranked"),
+    profile: bool = typer.Option(False, help="Show time spent per stage, upstream call and cache lookup"),
+    trace_file: Optional[str] = typer.Option(None, help="Write every timed span to this file as JSON lines"),
+    metrics_file: Optional[str] = typer.Option(None, help="Write aggregated metrics to this file in Prometheus text format")
 ):
-    """Search for hotels in multiple destinations."""
-    # Set default dates if not provided
-    if not checkin:
-        checkin = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
-    if not checkout:
-        checkout = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+    """Search for hotels in multiple destinations.
+
+    With --sweep-to, every check-in date up to that date and every stay length in --nights
+    is priced and the cheapest hotels are shown with their price for each stay.
+    With --overall-top, one list of the best hotels across all destinations is shown
+    instead of the top hotels of each destination.
+    """
+    from api.options import count_nights, default_dates
+    try:
+        checkin, checkout = default_dates(checkin, checkout)
+    except ValueError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        return
+    num_nights = count_nights(checkin, checkout)
+    # A sweep given --nights never reads --checkout
+    if num_nights <= 0 and not nights:
+        console.print("[red]Check-out date must be after the check-in date[/red]")
+        return
 
     # Parse destinations
     destination_list = [d.strip() for d in destinations.split(",") if d.strip()]
     if not destination_list:
         console.print("[red]Please provide at least one destination[/red]")
         return
+    if ranker not in RANKERS:
+        console.print(f"[red]Unknown ranker '{ranker}', expected one of: {', '.join(RANKERS)}[/red]")
+        return
+    if sweep_to or nights:
+        # A sweep prices one destination after another and ranks hotels locally
+        unsupported = [flag for flag, given in (("--stream", stream), ("--timeout", timeout is not None),
+                                                (f"--ranker {ranker}", ranker != "local")) if given]
+        if unsupported:
+            console.print(f"[red]{', '.join(unsupported)} can't be used with --sweep-to or --nights[/red]")
+            return
+    elif overall_top is not None and stream:
+        # The overall list is only known once every destination has finished
+        console.print("[red]--stream can't be used with --overall-top[/red]")
+        return
+    writer = open_writer(output)
+
+    if sweep_to or nights:
+        started = start_profiling(profile, trace_file)
+        sweep_search(destination_list, checkin, sweep_to or checkin, nights or str(num_nights),
+                     adults, rooms, budget, preferences, max_results, writer)
+        close_writer(writer)
+        finish_profiling(started, profile, trace_file, metrics_file)
+        return
 
-    # Calculate number of nights
-    checkin_date = datetime.strptime(checkin, "%Y-%m-%d")
-    checkout_date = datetime.strptime(checkout, "%Y-%m-%d")
-    num_nights = (checkout_date - checkin_date).days
+    if overall_top is not None:
+        started = start_profiling(profile, trace_file)
+        overall_search(destination_list, checkin, checkout, adults, rooms, budget, preferences,
+                       overall_top, min_rating, max_results, ranker, timeout, writer)
+        close_writer(writer)
+        finish_profiling(started, profile, trace_file, metrics_file)
+        return
 
     console.print(f"\n[bold blue]Searching for hotels in multiple locations[/bold blue]")
     console.print(f"Destinations: {', '.join(destination_list)}")
@@ -50,46 +128,189 @@ def search(
     if preferences:
         console.print(f"Preferences: {preferences}")
     
+    on_result = display_location_results if stream else None
+    if writer is not None:
+        from output import hotel_records
+        # Each destination's hotels are written as soon as they are ranked
+        on_result = lambda destination, hotels: writer.write_all(hotel_records(hotels, destination=destination))
+
+    started = start_profiling(profile, trace_file)
     with console.status("[bold green]Searching and ranking hotels...[/bold green]"):
         try:
-            results = booking_api.search_multiple_locations(
+            results = get_booking_api().search_multiple_locations(
                 destinations=destination_list,
                 checkin_date=checkin,
                 checkout_date=checkout,
                 adults_number=adults,
                 room_number=rooms,
                 max_price=budget,
-                preferences=preferences
+                preferences=preferences,
+                timeout=timeout,
+                on_result=on_result,
+                ranker=ranker,
+                max_results=max_results
             )
             
             if not results.get('locations'):
                 console.print("[yellow]No hotels found in any location.[/yellow]")
-                return
-            
-            display_multiple_results(results, show_ranking=True)
+            else:
+                if on_result is None:
+                    display_multiple_results(results, show_ranking=True)
+                display_cache_stats()
+                display_llm_usage()
                 
         except Exception as e:
             console.print(f"[red]Error: {str(e)}[/red]")
+    close_writer(writer)
+    finish_profiling(started, profile, trace_file, metrics_file)
+
+def overall_search(destinations: list, checkin: str, checkout: str, adults: int, rooms: int,
+                   budget: Optional[float], preferences: Optional[str], top: int, min_rating: Optional[float],
+                   max_results: Optional[int], ranker: str, timeout: Optional[float],
+                   writer: Optional["RecordWriter"] = None):
+    """Rank the hotels of every destination together and show the best ``top`` in one list."""
+    import overall as overall_mode
+    console.print(f"\n[bold blue]Searching for the best hotels across all destinations[/bold blue]")
+    console.print(f"Destinations: {', '.join(destinations)}")
+    console.print(f"Check-in: {checkin}, Check-out: {checkout}")
+    console.print(f"Adults: {adults}, Rooms: {rooms}")
+    if budget:
+        console.print(f"Total Budget: ${budget}")
+    if min_rating is not None:
+        console.print(f"Minimum Rating: {min_rating}")
+    if preferences:
+        console.print(f"Preferences: {preferences}")
+
+    with console.status("[bold green]Searching and ranking hotels...[/bold green]"):
+        try:
+            best = overall_mode.run_overall(get_booking_api(), destinations, checkin, checkout, adults, rooms,
+                                            budget, preferences, top, min_rating, max_results, ranker, timeout)
+        except Exception as e:
+            console.print(f"[red]Error: {str(e)}[/red]")
+            return
+    if writer is not None:
+        writer.write_all(best.records())
+    else:
+        display_best_overall(best)
+    display_cache_stats()
+    display_llm_usage()
+
+def display_best_overall(best):
+    """Display the best hotels across all destinations with the destination each came from."""
+    console.print(f"\n[bold blue]Best options across all destinations:[/bold blue]")
+    if not best.hotels:
+        console.print("[yellow]No hotels found in any location.[/yellow]")
+    else:
+        display_results({"results": [hotel for _, hotel in best.hotels]}, show_ranking=True,
+                        destinations=[destination for destination, _ in best.hotels])
+    console.print(f"[dim]{best.candidates} hotels within budget, details fetched for {best.details_fetched}[/dim]")
+    if best.missing:
+        console.print(f"[yellow]No results from: {', '.join(best.missing)}[/yellow]")
+
+def sweep_search(destinations: list, first_checkin: str, last_checkin: str, nights: str, adults: int,
+                 rooms: int, budget: Optional[float], preferences: Optional[str], max_results: Optional[int],
+                 writer: Optional["RecordWriter"] = None):
+    """Price every stay in the sweep for each destination and show one matrix per destination.
+
+    With a ``writer``, each destination's matrix is written as one record instead.
+    """
+    import sweep as sweep_mode
+    try:
+        stays = sweep_mode.stay_dates(first_checkin, last_checkin, sweep_mode.parse_nights(nights))
+    except ValueError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        return
+
+    console.print(f"\n[bold blue]Sweeping hotel prices[/bold blue]")
+    console.print(f"Destinations: {', '.join(destinations)}")
+    console.print(f"Check-in: {first_checkin} to {last_checkin}, stays of {nights} nights ({len(stays)} stays)")
+    console.print(f"Adults: {adults}, Rooms: {rooms}")
+    if budget:
+        console.print(f"Total Budget: ${budget}")
+    if preferences:
+        console.print(f"Preferences: {preferences}")
+
+    for destination in destinations:
+        with console.status(f"[bold green]Pricing {len(stays)} stays in {destination}...[/bold green]"):
+            try:
+                matrix, hotels = sweep_mode.run_sweep(get_booking_api(), destination, stays, adults, rooms,
+                                                      budget, max_results, preferences, sweep_mode.DEFAULT_SWEEP_WORKERS)
+            except Exception as e:
+                console.print(f"[red]Error sweeping {destination}: {str(e)}[/red]")
+                continue
+        if writer is not None:
+            writer.write_all([matrix.to_dict([hotel.hotel_id for hotel in hotels])])
+        else:
+            display_price_matrix(matrix, hotels)
+    display_cache_stats()
+
+@tracer.traced("render.matrix")
+def display_price_matrix(matrix, hotels: list):
+    """Display each hotel's total price for every swept stay, cheapest per night highlighted."""
+    console.print(f"\n[bold blue]Prices in {matrix.destination}:[/bold blue]")
+    if not hotels:
+        console.print(f"[yellow]No hotels found in {matrix.destination}[/yellow]")
+        return
+
+    from rich.table import Table
+    table = Table(show_header=True, header_style="bold magenta", show_lines=True)
+    table.add_column("Hotel", width=28)
+    for checkin in matrix.checkins:
+        table.add_column(datetime.strptime(checkin, "%Y-%m-%d").strftime("%a %m-%d"), justify="right")
+    table.add_column("Cheapest", width=22)
+
+    for hotel in hotels:
+        cheapest = matrix.cheapest_stay(hotel.hotel_id)
+        cells = []
+        for checkin in matrix.checkins:
+            lines = []
+            for stay in matrix.nights:
+                price = matrix.price(hotel.hotel_id, checkin, stay)
+                text = f"{stay}n ${price:,.0f}" if price is not None else f"{stay}n -"
+                if cheapest and (checkin, stay) == cheapest[:2]:
+                    text = f"[bold green]{text}[/bold green]"
+                lines.append(text)
+            cells.append("\n".join(lines))
+        best = (
+            f"{cheapest[0]}, {cheapest[1]} nights\n${cheapest[2]:,.2f} (${cheapest[2] / cheapest[1]:,.2f}/night)"
+            if cheapest else "N/A"
+        )
+        score = f"{hotel.score}" if hotel.score is not None else "N/A"
+        table.add_row(f"{hotel.name}\n[dim]{hotel.hotel_id} · {score} {hotel.score_word}[/dim]", *cells, best)
+
+    console.print(table)
 
 def display_multiple_results(results: dict, show_ranking: bool = False):
     """Display hotel results for multiple locations."""
     locations_data = results.get('locations', {})
     
     for location, hotels in locations_data.items():
-        console.print(f"\n[bold blue]Top Rated Hotels for the requirement in {location}:[/bold blue]")
-        
-        if not hotels:
-            console.print(f"[yellow]No hotels found in {location}[/yellow]")
-            continue
-        
-        display_results({"results": hotels}, show_ranking=True)
-        console.print("\n" + "="*100)  # Separator between locations
+        display_location_results(location, hotels)
+    if results.get('stale'):
+        console.print(f"[yellow]Live search unavailable, showing earlier results for: {', '.join(results['stale'])}[/yellow]")
+
+def display_location_results(location: str, hotels: list):
+    """Display the ranked hotels for a single location."""
+    console.print(f"\n[bold blue]Top Rated Hotels for the requirement in {location}:[/bold blue]")
+    
+    if not hotels:
+        console.print(f"[yellow]No hotels found in {location}[/yellow]")
+        return
+    
+    display_results({"results": hotels}, show_ranking=True)
+    console.print("\n" + "="*100)  # Separator between locations
+
+@tracer.traced("render.table")
+def display_results(results: dict, show_ranking: bool = False, destinations: Optional[List[str]] = None):
+    """Display hotel results in a formatted table.
 
-def display_results(results: dict, show_ranking: bool = False):
-    """Display hotel results in a formatted table."""
+    ``destinations`` names the searched destination of each hotel, for lists
+    mixing several.
+    """
     if not results.get('results'):
         return
         
+    from rich.table import Table
     table = Table(show_header=True, header_style="bold magenta", width=150)
     if show_ranking:
         table.add_column("Rank", style="bold", width=8)
@@ -102,34 +323,35 @@ def display_results(results: dict, show_ranking: bool = False):
 
     for idx, hotel in enumerate(results['results'], 1):
         # Format rating
-        review_info = hotel.get('review_score', {})
         rating_display = (
-            f"Score: {review_info.get('score', 'N/A')}\n"
-            f"{review_info.get('word', 'N/A')}\n"
-            f"({review_info.get('reviews_count', 0)} reviews)"
+            f"Score: {hotel.score if hotel.score is not None else 'N/A'}\n"
+            f"{hotel.score_word}\n"
+            f"({hotel.reviews_count} reviews)"
         )
 
         # Format price with room information
-        price_info = hotel.get('price', {})
-        num_rooms = price_info.get('num_rooms', 1)
-        room_text = "room" if num_rooms == 1 else "rooms"
+        room_text = "room" if hotel.num_rooms == 1 else "rooms"
         price_display = (
-            f"Per night/room: ${price_info.get('per_room', 'N/A')}\n"
-            f"Total for {num_rooms} {room_text}\n"
-            f"({price_info.get('num_nights', 0)} nights): "
-            f"${price_info.get('total', 'N/A')} {price_info.get('currency', 'USD')}"
+            f"Per night/room: ${hotel.price_per_night if hotel.price_per_night is not None else 'N/A'}\n"
+            f"Total for {hotel.num_rooms} {room_text}\n"
+            f"({hotel.num_nights} nights): "
+            f"${hotel.total_price if hotel.total_price is not None else 'N/A'} {hotel.currency}"
         )
 
         # Format location and contact
         location_contact = (
-            f"[bold]Address:[/bold]\n{hotel.get('address', 'N/A')}\n"
-            f"[bold]Location:[/bold]\n{hotel.get('location', 'N/A')}\n"
-            f"[bold]Website:[/bold]\n{hotel.get('website', 'N/A')}"
+            f"[bold]Address:[/bold]\n{hotel.address}\n"
+            f"[bold]Location:[/bold]\n{hotel.location}\n"
+            f"[bold]Website:[/bold]\n{hotel.website}"
         )
+        if hotel.distance_km is not None:
+            location_contact += f"\n[bold]Distance:[/bold] {hotel.distance_km:.2f} km"
+        if destinations:
+            location_contact += f"\n[bold]Searched:[/bold] {destinations[idx - 1]}"
 
         # Format facilities
-        popular_facilities = hotel.get('popular_facilities', [])[:3]  # Show top 3
-        other_facilities = hotel.get('facilities', [])[:2]  # Show top 2
+        popular_facilities = hotel.popular_facilities[:3]  # Show top 3
+        other_facilities = hotel.facilities[:2]  # Show top 2
         
         facilities_display = []
         if popular_facilities:
@@ -144,8 +366,8 @@ def display_results(results: dict, show_ranking: bool = False):
         facilities = "\n".join(facilities_display) if facilities_display else "No facilities listed"
 
         row_data = [
-            hotel.get('hotel_id', 'N/A'),
-            hotel.get('hotel_name', 'N/A'),
+            hotel.hotel_id,
+            hotel.name,
             rating_display,
             price_display,
             location_contact,
@@ -164,11 +386,86 @@ def display_results(results: dict, show_ranking: bool = False):
     # Print a note about detailed view
     console.print("\n[italic]Note: Use 'details <hotel_id>' command to see full hotel information including all facilities.[/italic]")
 
+@app.command()
+def nearby(
+    latitude: float = typer.Argument(..., help="Latitude of the point to search around"),
+    longitude: float = typer.Argument(..., help="Longitude of the point to search around"),
+    radius: float = typer.Option(DEFAULT_NEARBY_RADIUS_KM, help="Search radius in km"),
+    checkin: Optional[str] = typer.Option(None, help="Check-in date (YYYY-MM-DD)"),
+    checkout: Optional[str] = typer.Option(None, help="Check-out date (YYYY-MM-DD)"),
+    adults: int = typer.Option(2, help="Number of adults"),
+    rooms: int = typer.Option(1, help="Number of rooms"),
+    budget: Optional[float] = typer.Option(None, help="Maximum total budget for the entire stay in USD"),
+    preferences: Optional[str] = typer.Option(None, help="Comma-separated preferences (e.g., 'pool,beach,spa')"),
+    max_results: Optional[int] = typer.Option(None, help="Nearest hotels within budget to consider (default 20)"),
+    output: str = typer.Option("table", help="table, or json / ndjson to write hotel records to stdout"),
+    profile: bool = typer.Option(False, help="Show time spent per stage, upstream call and cache lookup"),
+    trace_file: Optional[str] = typer.Option(None, help="Write every timed span to this file as JSON lines"),
+    metrics_file: Optional[str] = typer.Option(None, help="Write aggregated metrics to this file in Prometheus text format")
+):
+    """Search for hotels around a point, e.g. a landmark.
+
+    Put negative coordinates after --, e.g. nearby -- -33.8568 151.2153
+    """
+    from api.options import default_dates
+    try:
+        checkin, checkout = default_dates(checkin, checkout)
+    except ValueError as e:
+        console.print(f"[red]{str(e)}[/red]")
+        return
+    writer = open_writer(output)
+
+    console.print(f"\n[bold blue]Searching for hotels within {radius:g} km of {latitude}, {longitude}[/bold blue]")
+    console.print(f"Check-in: {checkin}, Check-out: {checkout}")
+    console.print(f"Adults: {adults}, Rooms: {rooms}")
+    if budget:
+        console.print(f"Total Budget: ${budget}")
+    if preferences:
+        console.print(f"Preferences: {preferences}")
+
+    started = start_profiling(profile, trace_file)
+    with console.status("[bold green]Searching and ranking hotels...[/bold green]"):
+        try:
+            booking_api = get_booking_api()
+            results = booking_api.search_nearby(
+                latitude=latitude,
+                longitude=longitude,
+                checkin_date=checkin,
+                checkout_date=checkout,
+                adults_number=adults,
+                room_number=rooms,
+                radius_km=radius,
+                max_price=budget,
+                max_results=max_results,
+                preferences=preferences
+            )
+            hotels = booking_api.rank_hotels(results['results'], preferences)
+            if writer is not None:
+                from output import hotel_records
+                writer.write_all(hotel_records(hotels, source=results['source'], stale=results.get('stale', False)))
+            elif not hotels:
+                console.print("[yellow]No hotels found near this location.[/yellow]")
+            else:
+                console.print(f"\n[bold blue]Top Rated Hotels within {radius:g} km:[/bold blue]")
+                display_results({"results": hotels}, show_ranking=True)
+            console.print(f"[dim]Hotels from: {results['source']}{' (stale)' if results.get('stale') else ''}[/dim]")
+            display_cache_stats()
+        except ValueError as e:
+            console.print(f"[red]{str(e)}[/red]")
+        except Exception as e:
+            console.print(f"[red]Error: {str(e)}[/red]")
+    close_writer(writer)
+    finish_profiling(started, profile, trace_file, metrics_file)
+
 @app.command()
 def details(
     hotel_id: str,
     checkin: Optional[str] = typer.Option(None, help="Check-in date (YYYY-MM-DD)"),
-    checkout: Optional[str] = typer.Option(None, help="Check-out date (YYYY-MM-DD)")
+    checkout: Optional[str] = typer.Option(None, help="Check-out date (YYYY-MM-DD)"),
+    output: str = typer.Option("table", help="table, or json / ndjson to write the details to stdout"),
+    profile: bool = typer.Option(False, help="Show time spent per stage, upstream call and cache lookup"),
+    trace_file: Optional[str] = typer.Option(None, help="Write every timed span to this file as JSON lines"),
+    metrics_file: Optional[str] = typer.Option(None, help="Write aggregated metrics to this file in Prometheus text format")
 ):
     """Get detailed information about a specific hotel."""
     # Set default dates if not provided
@@ -176,14 +473,28 @@ def details(
         checkin = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
     if not checkout:
         checkout = (datetime.now() + timedelta(days=2)).strftime("%Y-%m-%d")
+    writer = open_writer(output)
 
+    started = start_profiling(profile, trace_file)
     with console.status("[bold green]Fetching hotel details...[/bold green]"):
         try:
-            details = booking_api.get_hotel_details(hotel_id, checkin, checkout)
-            display_hotel_details(details)
+            details = get_booking_api().get_hotel_details(hotel_id, checkin, checkout)
+            if writer is not None:
+                from output import details_record
+                record = details_record(hotel_id, details)
+                if record is None:
+                    console.print("[yellow]No details found for this hotel.[/yellow]")
+                else:
+                    writer.write_all([record])
+            else:
+                display_hotel_details(details)
+            display_cache_stats()
         except Exception as e:
             console.print(f"[red]Error: {str(e)}[/red]")
+    close_writer(writer)
+    finish_profiling(started, profile, trace_file, metrics_file)
 
+@tracer.traced("render.details")
 def display_hotel_details(details: dict):
     """Display detailed hotel information."""
     if not details:
@@ -191,6 +502,8 @@ def display_hotel_details(details: dict):
         return
         
     console.print("\n[bold]Hotel Details[/bold]")
+    if details.get('stale'):
+        console.print("[yellow]Live details unavailable, showing the last ones fetched.[/yellow]")
     console.print(f"Name: {details.get('name', 'N/A')}")
     console.print(f"Address: {details.get('address', 'N/A')}")
     console.print(f"Location: {details.get('city', 'N/A')}, {details.get('country', 'N/A')}")
@@ -214,6 +527,229 @@ def display_hotel_details(details: dict):
 
     console.print("\n[italic]Note: Some facilities may be subject to additional charges.[/italic]")
 
+def display_cache_stats():
+    """Display how many lookups were answered from the cache."""
+    stats = get_cache().stats()
+    console.print(
+        f"\n[dim]Cache: {stats['hits']} hits ({stats['stale_hits']} stale), {stats['misses']} misses, "
+        f"{stats['bytes_saved'] / 1024:.1f} KB saved[/dim]"
+    )
+
+def display_llm_usage():
+    """Display the token usage and latency of OpenAI ranking calls, if any were made."""
+    if _booking_api is None or not _booking_api.openai_api_loaded:
+        return
+    usage = _booking_api.openai_api.usage.summary()
+    if not usage['calls']:
+        return
+    console.print(
+        f"[dim]OpenAI ranking: {usage['calls']} calls, {usage['total_tokens']} tokens "
+        f"({usage['prompt_tokens']} prompt), {usage['latency_ms']:.0f} ms[/dim]"
+    )
+
+@app.command()
+def serve(
+    host: str = typer.Option("0.0.0.0", help="Interface to listen on"),
+    port: int = typer.Option(8000, help="Port to listen on"),
+    warm_list: Optional[str] = typer.Option(None, help="JSONL file of searches to keep warm in the background"),
+    warm_every: float = typer.Option(DEFAULT_WARM_EVERY, help="Seconds between warm passes over --warm-list"),
+    snapshot: Optional[List[str]] = typer.Option(None, help="Cache snapshot to import before serving (repeatable)")
+):
+    """Serve search, details and nearby lookups over HTTP from one warm process."""
+    import server
+    if snapshot:
+        import_cache_snapshots(snapshot)
+    booking_api = get_booking_api()
+    if warm_list:
+        import warm as warm_mode
+        warm_mode.start_warming(booking_api, load_hot_list(warm_list), warm_every)
+    server.serve(booking_api, host, port)
+
+@app.command()
+def warm(
+    hot_list: str = typer.Argument(..., help="JSONL file of searches to keep warm, or - for stdin"),
+    every: Optional[float] = typer.Option(None, help="Repeat every N seconds instead of running once"),
+    margin: float = typer.Option(DEFAULT_WARM_MARGIN, help="Refresh entries expiring within this many seconds"),
+    workers: int = typer.Option(DEFAULT_WARM_WORKERS, help="Searches warmed at the same time")
+):
+    """Refresh cached destination IDs, results and hotel details before they expire.
+
+    The hot list uses the batch format; a line may give {"checkin_in_days": 7, "nights": 2}
+    instead of fixed dates to keep a rolling window warm.
+    """
+    import warm as warm_mode
+    specs = load_hot_list(hot_list)
+    try:
+        if every is None:
+            warm_mode.display_totals(warm_mode.warm_once(get_booking_api(), specs, margin, workers))
+        else:
+            warm_mode.warm_forever(get_booking_api(), specs, every, margin, workers)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        get_cache().flush()
+    display_cache_stats()
+
+@cache_app.command("export")
+def cache_export(
+    path: str = typer.Argument(..., help="Snapshot file to write"),
+    namespaces: str = typer.Option(",".join(DEFAULT_SNAPSHOT_NAMESPACES),
+                                   help="Comma-separated kinds of entries to include")
+):
+    """Write destination IDs, hotel details and rankings from the cache to a compressed snapshot."""
+    from models.snapshot import write_snapshot
+    started = time.perf_counter()
+    try:
+        count = write_snapshot(get_cache(), path, [n.strip() for n in namespaces.split(",") if n.strip()])
+    except OSError as e:
+        console.print(f"[red]Could not write snapshot: {str(e)}[/red]")
+        raise typer.Exit(1)
+    console.print(f"[dim]Exported {count} entries to {path} in {time.perf_counter() - started:.2f}s[/dim]")
+
+@cache_app.command("import")
+def cache_import(
+    paths: List[str] = typer.Argument(..., help="Snapshot files to merge into the cache")
+):
+    """Merge snapshots into the cache; for keys in several, the copy that expires last wins."""
+    import_cache_snapshots(paths)
+
+def import_cache_snapshots(paths: List[str]):
+    """Import snapshots into the cache, exiting with an error if one can't be read."""
+    from models.snapshot import import_snapshots
+    try:
+        totals = import_snapshots(get_cache(), paths)
+    except (OSError, EOFError, ValueError) as e:
+        console.print(f"[red]Could not import snapshot: {str(e)}[/red]")
+        raise typer.Exit(1)
+    console.print(
+        f"[dim]Imported {totals['read']} entries from {totals['snapshots']} snapshots "
+        f"({totals['written']} new or newer) in {totals['seconds']:.2f}s[/dim]"
+    )
+
+def load_hot_list(path: str) -> list:
+    """Read and validate a hot list, exiting with an error if it is malformed."""
+    import warm as warm_mode
+    try:
+        if path == "-":
+            return warm_mode.load_hot_list(sys.stdin)
+        with open(path) as source:
+            return warm_mode.load_hot_list(source)
+    except (OSError, ValueError) as e:
+        console.print(f"[red]Invalid hot list: {str(e)}[/red]")
+        raise typer.Exit(1)
+
+@app.command()
+def batch(
+    input_file: str = typer.Argument("-", help="JSONL file with one search per line, or - for stdin"),
+    out_file: str = typer.Option("-", help="File to write JSONL results to, or - for stdout"),
+    workers: int = typer.Option(DEFAULT_BATCH_WORKERS, help="Searches run at the same time"),
+    ranker: str = typer.Option(DEFAULT_RANKER, help="Ranker for lines that don't set one: local, openai or hybrid")
+):
+    """Run searches from a JSONL file, one JSON result per line.
+
+    Each line is an object such as {"destinations": "Goa,Pune", "checkin": "2025-03-02",
+    "checkout": "2025-03-05", "adults": 2, "rooms": 1, "budget": 500, "preferences": "pool"}.
+    """
+    import batch as batch_mode
+    if ranker not in RANKERS:
+        console.print(f"[red]Unknown ranker '{ranker}', expected one of: {', '.join(RANKERS)}[/red]")
+        raise typer.Exit(1)
+    if out_file == "-":
+        # Keep stdout for results; messages go to stderr
+        redirect_console_to_stderr()
+
+    started = time.perf_counter()
+    with ExitStack() as files:
+        try:
+            source = sys.stdin if input_file == "-" else files.enter_context(open(input_file))
+            sink = sys.stdout if out_file == "-" else files.enter_context(open(out_file, "w"))
+        except OSError as e:
+            console.print(f"[red]Could not open batch file: {str(e)}[/red]")
+            raise typer.Exit(1)
+        records = batch_mode.run_batch(get_booking_api(), source, workers, ranker)
+        counts = batch_mode.write_jsonl(records, sink)
+
+    console.print(
+        f"[dim]{counts['searches']} searches ({counts['errors']} failed) "
+        f"in {time.perf_counter() - started:.1f}s[/dim]"
+    )
+    display_cache_stats()
+    display_llm_usage()
+
+def open_writer(output: str) -> Optional["RecordWriter"]:
+    """Record writer on stdout for --output json/ndjson, None for tables.
+
+    Messages move to stderr so that stdout carries only the records.
+    """
+    if output not in OUTPUT_FORMATS:
+        console.print(f"[red]Unknown output format '{output}', expected one of: {', '.join(OUTPUT_FORMATS)}[/red]")
+        raise typer.Exit(1)
+    if output == "table":
+        return None
+    from output import RecordWriter
+    redirect_console_to_stderr()
+    return RecordWriter(sys.stdout, output)
+
+def close_writer(writer: Optional["RecordWriter"]):
+    if writer is not None:
+        writer.close()
+
+def redirect_console_to_stderr():
+    """Send Rich output from the CLI and the API clients to stderr."""
+    import api.booking_api
+    import api.openai_api
+    for module_console in (console, api.booking_api.console, api.openai_api.console):
+        module_console.stderr = True
+
+def start_profiling(profile: bool, trace_file: Optional[str]) -> float:
+    """Start keeping individual spans if they will be shown or written out."""
+    if profile or trace_file:
+        tracer.start_recording()
+    return time.perf_counter()
+
+def finish_profiling(started: float, profile: bool, trace_file: Optional[str], metrics_file: Optional[str]):
+    """Show the profile and write the trace and metrics files that were asked for."""
+    if trace_file:
+        with open(trace_file, "w") as f:
+            tracer.write_jsonl(f)
+    if metrics_file:
+        with open(metrics_file, "w") as f:
+            f.write(tracer.prometheus())
+    if profile:
+        display_profile(time.perf_counter() - started)
+
+def display_profile(wall_seconds: float):
+    """Display where the time of a command went, slowest stage first."""
+    from rich.table import Table
+    table = Table(show_header=True, header_style="bold magenta", title=f"Profile ({wall_seconds * 1000:.0f} ms wall time)")
+    table.add_column("Stage")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total ms", justify="right")
+    table.add_column("Mean ms", justify="right")
+    table.add_column("p95 ms", justify="right")
+    table.add_column("Errors", justify="right")
+    table.add_column("KB", justify="right")
+    table.add_column("Cache hit/miss", justify="right")
+
+    for row in tracer.summary():
+        cache_lookups = row['cache_hits'] + row['cache_misses']
+        table.add_row(
+            row['name'],
+            str(row['calls']),
+            f"{row['total_ms']:.1f}",
+            f"{row['mean_ms']:.1f}",
+            f"{row['p95_ms']:.1f}",
+            str(row['errors']),
+            f"{row['bytes'] / 1024:.1f}" if row['bytes'] else "",
+            f"{row['cache_hits']}/{row['cache_misses']}" if cache_lookups else ""
+        )
+
+    console.print()
+    console.print(table)
+    console.print("[dim]Stages overlap when they run concurrently, so totals can exceed the wall time.[/dim]")
+
 if __name__ == "__main__":
-    console.print("[bold blue]Welcome to Travel Booking Agent![/bold blue]")
+    # Not when piped, e.g. `batch` results going to another program
+    if sys.stdout.isatty():
+        console.print("[bold blue]Welcome to Travel Booking Agent![/bold blue]")
     app() 
\ No newline at end of file
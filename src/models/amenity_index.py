@@ -0,0 +1,186 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from api.ranking import compile_preference, parse_preferences
+from models.cache import thread_connection
+
+# SQLite limits the number of bound parameters per statement
+MAX_QUERY_PARAMS = 900
+# Hotels kept in the index, and how long a hotel's amenities are kept
+# without its details being fetched again
+DEFAULT_MAX_HOTELS = 100_000
+DEFAULT_MAX_AGE_DAYS = 30
+# Hotels added between two prunes
+PRUNE_EVERY = 200
+
+def normalize_amenity(name: str) -> str:
+    return name.strip().lower()
+
+class AmenityIndex:
+    """Persistent inverted index from amenity to the hotels that have it.
+
+    Filled from hotel details as they are fetched and kept in SQLite, by
+    default in the cache database, so it outlives the cache entries it was
+    built from. Only the distinct amenity names are held in memory; which
+    hotels have them is answered by indexed queries.
+
+    Hotels indexed more than ``max_age`` seconds ago are forgotten, and
+    beyond ``max_hotels`` the least recently indexed ones are, when the
+    index is opened and every PRUNE_EVERY additions after that.
+    """
+
+    def __init__(self, db_path: str, max_hotels: Optional[int] = None, max_age: Optional[float] = None):
+        self.db_path = db_path
+        self.max_hotels = max_hotels or int(os.getenv("AMENITY_INDEX_MAX_HOTELS", DEFAULT_MAX_HOTELS))
+        self.max_age = max_age or float(os.getenv("AMENITY_INDEX_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)) * 86400
+        self.lock = threading.Lock()
+        self._added_since_prune = 0
+        self._local = threading.local()
+        self._amenities: Optional[List[str]] = None
+        self._known: Set[str] = set()
+        # preference -> (matching amenities, number of amenities checked)
+        self._matches: Dict[str, Tuple[Set[str], int]] = {}
+        self.create_tables()
+        self.prune()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread."""
+        return thread_connection(self._local, self.db_path)
+
+    def create_tables(self):
+        with self.conn as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS hotel_amenities (
+                    amenity TEXT NOT NULL,
+                    hotel_id TEXT NOT NULL,
+                    PRIMARY KEY (amenity, hotel_id)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_hotel_amenities_hotel_id ON hotel_amenities (hotel_id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS indexed_hotels (
+                    hotel_id TEXT PRIMARY KEY,
+                    indexed_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_indexed_hotels_indexed_at ON indexed_hotels (indexed_at)")
+
+    def _load_amenities(self) -> List[str]:
+        if self._amenities is None:
+            rows = self.conn.execute("SELECT DISTINCT amenity FROM hotel_amenities").fetchall()
+            self._amenities = [row[0] for row in rows]
+            self._known = set(self._amenities)
+        return self._amenities
+
+    def add(self, hotel_id: str, facilities: Iterable[str]):
+        """Record a hotel's amenities, replacing what was indexed for it before."""
+        amenities = {normalize_amenity(name) for name in facilities if name}
+        with self.conn as conn:
+            conn.execute("DELETE FROM hotel_amenities WHERE hotel_id = ?", (hotel_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO hotel_amenities (amenity, hotel_id) VALUES (?, ?)",
+                [(amenity, hotel_id) for amenity in amenities]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO indexed_hotels (hotel_id, indexed_at) VALUES (?, ?)",
+                (hotel_id, time.time())
+            )
+        with self.lock:
+            known = self._load_amenities()
+            for amenity in amenities - self._known:
+                known.append(amenity)
+                self._known.add(amenity)
+            self._added_since_prune += 1
+            due = self._added_since_prune >= PRUNE_EVERY
+            if due:
+                self._added_since_prune = 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Forget hotels indexed too long ago or beyond ``max_hotels``; returns how many."""
+        # Too old, or past the newest max_hotels
+        expired = (
+            "SELECT hotel_id FROM indexed_hotels WHERE indexed_at <= ? "
+            "UNION SELECT hotel_id FROM (SELECT hotel_id FROM indexed_hotels ORDER BY indexed_at DESC LIMIT -1 OFFSET ?)"
+        )
+        params = (time.time() - self.max_age, self.max_hotels)
+        with self.conn as conn:
+            conn.execute(f"DELETE FROM hotel_amenities WHERE hotel_id IN ({expired})", params)
+            removed = conn.execute(f"DELETE FROM indexed_hotels WHERE hotel_id IN ({expired})", params).rowcount
+        if removed:
+            with self.lock:
+                # Amenity names may no longer be used by any hotel
+                self._amenities = None
+                self._matches = {}
+        return removed
+
+    def matching_amenities(self, preference: str) -> Set[str]:
+        """Indexed amenities that satisfy a preference or one of its synonyms."""
+        with self.lock:
+            amenities = self._load_amenities()
+            matched, covered = self._matches.get(preference, (set(), 0))
+            if covered < len(amenities):
+                pattern = compile_preference(preference)
+                matched = matched | {a for a in amenities[covered:] if pattern.search(a)}
+                self._matches[preference] = (matched, len(amenities))
+            return matched
+
+    def indexed(self, hotel_ids: Iterable[str]) -> Set[str]:
+        """The given hotels whose amenities are in the index."""
+        found = set()
+        for chunk in _chunks(list(hotel_ids)):
+            rows = self.conn.execute(
+                f"SELECT hotel_id FROM indexed_hotels WHERE hotel_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+
+    def hotels_with(self, preference: str, hotel_ids: Optional[Iterable[str]] = None) -> Set[str]:
+        """Hotels known to satisfy a preference, optionally only among ``hotel_ids``."""
+        amenities = list(self.matching_amenities(preference))
+        if not amenities:
+            return set()
+        found = set()
+        for amenity_chunk in _chunks(amenities):
+            amenity_params = ','.join('?' * len(amenity_chunk))
+            if hotel_ids is None:
+                rows = self.conn.execute(
+                    f"SELECT DISTINCT hotel_id FROM hotel_amenities WHERE amenity IN ({amenity_params})",
+                    amenity_chunk
+                ).fetchall()
+                found.update(row[0] for row in rows)
+                continue
+            for id_chunk in _chunks(list(hotel_ids), MAX_QUERY_PARAMS - len(amenity_chunk)):
+                rows = self.conn.execute(
+                    f"SELECT DISTINCT hotel_id FROM hotel_amenities "
+                    f"WHERE amenity IN ({amenity_params}) AND hotel_id IN ({','.join('?' * len(id_chunk))})",
+                    [*amenity_chunk, *id_chunk]
+                ).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def match_counts(self, hotel_ids: List[str], preferences: Optional[str]) -> Dict[str, Optional[int]]:
+        """How many preferences each hotel satisfies; None for hotels not indexed yet."""
+        pref_list = parse_preferences(preferences)
+        known = self.indexed(hotel_ids)
+        counts: Dict[str, Optional[int]] = {hotel_id: (0 if hotel_id in known else None) for hotel_id in hotel_ids}
+        if not pref_list or not known:
+            return counts
+        for preference in pref_list:
+            for hotel_id in self.hotels_with(preference, known):
+                counts[hotel_id] += 1
+        return counts
+
+    def close(self):
+        # Dropping the thread-local storage closes every thread's connection
+        self._local = threading.local()
+
+def _chunks(items: List[str], size: int = MAX_QUERY_PARAMS) -> Iterable[List[str]]:
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -1,42 +1,319 @@
+import atexit
+import os
 import sqlite3
 import json
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+from api.decoding import loads
+
+DEFAULT_TTL = timedelta(hours=24)
+DEFAULT_MAX_ROWS = 50_000
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MEMORY_ITEMS = 1024
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL = 1.0
+# How long expired entries are kept so they can still be served stale
+DEFAULT_STALE_SECONDS = 24 * 60 * 60
+
+def make_cache_key(namespace: str, params: Dict[str, Any]) -> str:
+    """Build a cache key that doesn't depend on parameter order, case or padding."""
+    normalized = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        normalized[name] = value
+    return f"{namespace}:{json.dumps(normalized, sort_keys=True, separators=(',', ':'))}"
+
+class _ThreadConnection:
+    """One thread's connection, closed when the holder is dropped.
+
+    A sqlite3 connection that is garbage collected without being closed
+    can keep its database files open, so connections are kept in
+    thread-local storage through one of these: the storage, and the
+    holder with it, is freed when its thread exits.
+    """
+
+    __slots__ = ("conn",)
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __del__(self):
+        self.conn.close()
+
+def thread_connection(local: threading.local, db_path: str) -> sqlite3.Connection:
+    """The calling thread's connection to ``db_path``, opened in WAL mode on first use.
+
+    It is closed when the thread exits or ``local`` is dropped.
+    """
+    holder = getattr(local, "conn", None)
+    if holder is None:
+        conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        holder = local.conn = _ThreadConnection(conn)
+    return holder.conn
 
 class Cache:
-    def __init__(self, db_path="cache.db"):
-        self.conn = sqlite3.connect(db_path)
+    """Size-bounded SQLite cache with an in-process LRU tier in front of it.
+
+    Entries carry their own expiry time. Writes and access-time updates are
+    buffered and committed in batches; expired entries are deleted and the
+    least recently used ones evicted whenever the table exceeds ``max_rows``
+    or ``max_bytes``. Each thread gets its own connection and the database
+    runs in WAL mode, so one file can be shared by many threads and processes.
+    A thread's connection is closed when the thread exits.
+
+    Expired entries are kept for ``stale_seconds`` more, during which
+    ``lookup`` can still return them flagged as stale so callers can serve
+    them while they refresh.
+    """
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 max_rows: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 memory_items: Optional[int] = None,
+                 batch_size: Optional[int] = None,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 stale_seconds: Optional[float] = None):
+        self.db_path = db_path or os.getenv("CACHE_DB_PATH", "cache.db")
+        self.max_rows = max_rows or int(os.getenv("CACHE_MAX_ROWS", DEFAULT_MAX_ROWS))
+        self.max_bytes = max_bytes or int(os.getenv("CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.memory_items = memory_items if memory_items is not None else int(os.getenv("CACHE_MEMORY_ITEMS", DEFAULT_MEMORY_ITEMS))
+        self.batch_size = batch_size or int(os.getenv("CACHE_BATCH_SIZE", DEFAULT_BATCH_SIZE))
+        self.flush_interval = flush_interval
+        self.stale_seconds = stale_seconds if stale_seconds is not None else float(os.getenv("CACHE_STALE_SECONDS", DEFAULT_STALE_SECONDS))
+
+        self.lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        # key -> (value, expires_at, size), most recently used last
+        self._memory: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        # Writes and access times not yet committed to SQLite
+        self._pending_writes: Dict[str, Tuple[str, float, float, int]] = {}
+        self._pending_touches: Dict[str, float] = {}
+        self._last_flush = time.monotonic()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
         self.create_table()
+        atexit.register(self.close)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread."""
+        return thread_connection(self._local, self.db_path)
 
     def create_table(self):
-        cursor = self.conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cache (
-                key TEXT PRIMARY KEY,
-                value TEXT,
-                timestamp DATETIME
-            )
-        """)
-        self.conn.commit()
+        conn = self.conn
+        with conn:
+            # Older versions stored ISO timestamps in a "cache" table
+            conn.execute("DROP TABLE IF EXISTS cache")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries (expires_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed_at ON entries (accessed_at)")
 
     def get(self, key: str):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT value, timestamp FROM cache WHERE key = ?",
+        """Value of an unexpired entry, or None."""
+        value, _ = self.lookup(key)
+        return value
+
+    def lookup(self, key: str, max_stale: float = 0.0, flush: bool = True) -> Tuple[Any, bool]:
+        """Value of an entry and whether it is stale.
+
+        Entries that expired less than ``max_stale`` seconds ago are returned
+        with ``stale`` set; anything older counts as a miss and gives
+        ``(None, False)``. ``flush`` works as for ``set``.
+        """
+        now = time.time()
+        entry = self._entry(key)
+        with self.lock:
+            if entry is None or entry[1] + max_stale <= now:
+                if entry is not None and entry[1] + self.stale_seconds <= now:
+                    self._memory.pop(key, None)
+                self.misses += 1
+                return None, False
+            value, expires_at, size = entry
+            stale = expires_at <= now
+            self.hits += 1
+            self.stale_hits += stale
+            self.bytes_saved += size
+            self._pending_touches[key] = now
+
+        if flush:
+            self._maybe_flush()
+        return loads(value), stale
+
+    def expires_in(self, key: str) -> Optional[float]:
+        """Seconds until an entry expires (negative once it has), None if there is none."""
+        entry = self._entry(key)
+        return entry[1] - time.time() if entry is not None else None
+
+    def _entry(self, key: str) -> Optional[Tuple[str, float, int]]:
+        """(serialized value, expires_at, size) from memory, pending writes or SQLite."""
+        with self.lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            if key in self._pending_writes:
+                value, expires_at, _, size = self._pending_writes[key]
+                return value, expires_at, size
+
+        row = self.conn.execute(
+            "SELECT value, expires_at, size FROM entries WHERE key = ?",
             (key,)
-        )
-        result = cursor.fetchone()
-        
-        if result:
-            value, timestamp = result
-            stored_time = datetime.fromisoformat(timestamp)
-            if datetime.now() - stored_time < timedelta(hours=24):
-                return json.loads(value)
-        return None
-
-    def set(self, key: str, value: dict):
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "INSERT OR REPLACE INTO cache (key, value, timestamp) VALUES (?, ?, ?)",
-            (key, json.dumps(value), datetime.now().isoformat())
-        )
-        self.conn.commit() 
\ No newline at end of file
+        ).fetchone()
+        if row is None:
+            return None
+        entry = tuple(row)
+        if entry[1] + self.stale_seconds > time.time():
+            self._remember(key, entry)
+        return entry
+
+    def set(self, key: str, value: Any, ttl: timedelta = DEFAULT_TTL, flush: bool = True):
+        """Store a value. With ``flush`` False the write is only buffered, even
+        if a flush is due; the caller runs ``flush`` itself (see ``flush_due``)."""
+        now = time.time()
+        serialized = json.dumps(value, separators=(',', ':'))
+        expires_at = now + ttl.total_seconds()
+        size = len(serialized)
+        with self.lock:
+            self._pending_writes[key] = (serialized, expires_at, now, size)
+            self._pending_touches.pop(key, None)
+        self._remember(key, (serialized, expires_at, size))
+        if flush:
+            self._maybe_flush()
+
+    def _remember(self, key: str, entry: Tuple[str, float, int]):
+        """Keep an entry in the in-memory LRU tier."""
+        if self.memory_items <= 0:
+            return
+        with self.lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def flush_due(self) -> bool:
+        """Whether buffered writes or access times should be committed now."""
+        with self.lock:
+            if not self._pending_writes and not self._pending_touches:
+                return False
+            return (len(self._pending_writes) >= self.batch_size
+                    or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def _maybe_flush(self):
+        if self.flush_due():
+            self.flush()
+
+    def flush(self):
+        """Commit buffered writes and access times, then enforce the size limits."""
+        with self._flush_lock:
+            with self.lock:
+                writes, self._pending_writes = self._pending_writes, {}
+                touches, self._pending_touches = self._pending_touches, {}
+                self._last_flush = time.monotonic()
+
+            conn = self.conn
+            with conn:
+                if writes:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)",
+                        [(key, *row) for key, row in writes.items()]
+                    )
+                if touches:
+                    conn.executemany(
+                        "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                        [(accessed_at, key) for key, accessed_at in touches.items()]
+                    )
+                if writes:
+                    self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Delete entries too old to serve stale, then least recently used ones over the limits."""
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time() - self.stale_seconds,))
+        rows, total_size = conn.execute("SELECT COUNT(*), TOTAL(size) FROM entries").fetchone()
+        if rows > self.max_rows:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            )
+        if total_size > self.max_bytes:
+            conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC) AS running FROM entries) "
+                "WHERE running > ?)",
+                (self.max_bytes,)
+            )
+
+    def export_entries(self, namespaces: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, str, float]]:
+        """(key, serialized value, expires_at) of every entry that can still be
+        served, optionally only from some key namespaces."""
+        self.flush()
+        query = "SELECT key, value, expires_at FROM entries WHERE expires_at > ?"
+        params: list = [time.time() - self.stale_seconds]
+        namespaces = list(namespaces or [])
+        if namespaces:
+            # Keys are "<namespace>:<params>"; range scans use the primary key index
+            query += " AND (" + " OR ".join("(key >= ? AND key < ?)" for _ in namespaces) + ")"
+            for namespace in namespaces:
+                params.extend([f"{namespace}:", f"{namespace};"])
+        yield from self.conn.execute(query, params)
+
+    def merge_entries(self, entries: Iterable[Tuple[str, str, float]]) -> int:
+        """Add serialized entries, keeping whichever copy of a key expires last.
+
+        Returns the number of entries that were new or newer than the cached
+        ones. Entries too old to be served stale are skipped.
+        """
+        self.flush()
+        now = time.time()
+        since = now - self.stale_seconds
+        conn = self.conn
+        with conn:
+            before = conn.total_changes
+            conn.executemany("""
+                INSERT INTO entries (key, value, expires_at, accessed_at, size) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    value = excluded.value,
+                    expires_at = excluded.expires_at,
+                    size = excluded.size
+                WHERE excluded.expires_at > entries.expires_at
+            """, ((key, value, expires_at, now, len(value)) for key, value, expires_at in entries if expires_at > since))
+            written = conn.total_changes - before
+            self._evict(conn)
+        with self.lock:
+            # May hold older copies of merged keys
+            self._memory.clear()
+        return written
+
+    def close(self):
+        """Flush pending writes and close every connection."""
+        with self.lock:
+            pending = bool(self._pending_writes or self._pending_touches)
+        if pending:
+            self.flush()
+        # Dropping the thread-local storage closes every thread's connection
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for this cache instance."""
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses, "bytes_saved": self.bytes_saved}
@@ -0,0 +1,269 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from models.cache import thread_connection
+
+# Geohash precision of the index cells, about 1.2 x 0.6 km at the equator
+CELL_PRECISION = 6
+EARTH_RADIUS_KM = 6371.0
+# SQLite limits the number of bound parameters per statement
+MAX_QUERY_PARAMS = 900
+# Hotels kept in the index, and how long a hotel or covered cell is kept
+# without being seen again
+DEFAULT_MAX_HOTELS = 200_000
+DEFAULT_MAX_AGE_DAYS = 30
+# Hotel positions written between two prunes
+PRUNE_EVERY = 2000
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+class HotelLocation(NamedTuple):
+    hotel_id: str
+    latitude: float
+    longitude: float
+    name: Optional[str] = None
+    score: Optional[float] = None
+    score_word: Optional[str] = None
+    reviews_count: Optional[int] = None
+
+def geohash(latitude: float, longitude: float, precision: int = CELL_PRECISION) -> str:
+    """Standard base32 geohash of a point."""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            rng[0] = middle
+        else:
+            rng[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def cell_size(precision: int = CELL_PRECISION) -> Tuple[float, float]:
+    """Height and width of a geohash cell in degrees."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+def cell_diagonal_km(latitude: float, precision: int = CELL_PRECISION) -> float:
+    """Diagonal of a cell at the given latitude, the most a point can be from its neighbours."""
+    height, width = cell_size(precision)
+    km_per_degree = math.pi * EARTH_RADIUS_KM / 180
+    return math.hypot(height * km_per_degree, width * km_per_degree * math.cos(math.radians(latitude)))
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def cells_in_radius(latitude: float, longitude: float, radius_km: float,
+                    precision: int = CELL_PRECISION) -> List[Tuple[str, bool]]:
+    """Cells overlapping a circle, each with whether it lies entirely inside it.
+
+    Circles crossing the antimeridian are clipped to it.
+    """
+    height, width = cell_size(precision)
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lon_delta = lat_delta / max(math.cos(math.radians(latitude)), 1e-6)
+    min_lat, max_lat = max(-90.0, latitude - lat_delta), min(90.0, latitude + lat_delta)
+    min_lon, max_lon = max(-180.0, longitude - lon_delta), min(180.0, longitude + lon_delta)
+
+    cells = []
+    for row in range(math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height) + 1):
+        south = -90 + row * height
+        for column in range(math.floor((min_lon + 180) / width), math.floor((max_lon + 180) / width) + 1):
+            west = -180 + column * width
+            # Closest point of the cell to the centre decides whether it overlaps
+            nearest_lat = min(max(latitude, south), south + height)
+            nearest_lon = min(max(longitude, west), west + width)
+            if distance_km(latitude, longitude, nearest_lat, nearest_lon) > radius_km:
+                continue
+            corners = ((south, west), (south, west + width), (south + height, west), (south + height, west + width))
+            inside = all(distance_km(latitude, longitude, lat, lon) <= radius_km for lat, lon in corners)
+            cells.append((geohash(south + height / 2, west + width / 2, precision), inside))
+    return cells
+
+class GeoIndex:
+    """Persistent spatial index of the hotels seen so far, by geohash cell.
+
+    Hotel coordinates, names and review scores are added from search pages
+    and nearby searches. Cells whose hotels were all listed by a nearby
+    search are recorded as covered, so later radius queries inside them can
+    be answered from the index instead of calling the API. Kept in SQLite,
+    by default in the cache database.
+
+    Hotels and covered cells not seen for ``max_age`` seconds are dropped,
+    and beyond ``max_hotels`` the least recently seen hotels are, together
+    with the coverage of their cells, which is no longer complete. This
+    happens when the index is opened and every PRUNE_EVERY positions
+    written after that.
+    """
+
+    def __init__(self, db_path: str, precision: int = CELL_PRECISION,
+                 max_hotels: Optional[int] = None, max_age: Optional[float] = None):
+        self.db_path = db_path
+        self.precision = precision
+        self.max_hotels = max_hotels or int(os.getenv("GEO_INDEX_MAX_HOTELS", DEFAULT_MAX_HOTELS))
+        self.max_age = max_age or float(os.getenv("GEO_INDEX_MAX_AGE_DAYS", DEFAULT_MAX_AGE_DAYS)) * 86400
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._written_since_prune = 0
+        self.create_tables()
+        self.prune()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection owned by the calling thread."""
+        return thread_connection(self._local, self.db_path)
+
+    def create_tables(self):
+        with self.conn as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS hotel_locations (
+                    hotel_id TEXT PRIMARY KEY,
+                    cell TEXT NOT NULL,
+                    latitude REAL NOT NULL,
+                    longitude REAL NOT NULL,
+                    name TEXT,
+                    score REAL,
+                    score_word TEXT,
+                    reviews_count INTEGER,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_hotel_locations_cell ON hotel_locations (cell)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_hotel_locations_updated_at ON hotel_locations (updated_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS covered_cells (
+                    cell TEXT PRIMARY KEY,
+                    covered_at REAL NOT NULL,
+                    complete INTEGER NOT NULL DEFAULT 1
+                )
+            """)
+            # Indexes created before sweeps could stop at the page limit
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(covered_cells)")]
+            if "complete" not in columns:
+                conn.execute("ALTER TABLE covered_cells ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+
+    def add(self, locations: Iterable[HotelLocation]):
+        """Record hotel positions; summary fields that are None keep their indexed value."""
+        now = time.time()
+        rows = [
+            (str(location.hotel_id), geohash(location.latitude, location.longitude, self.precision),
+             location.latitude, location.longitude, location.name, location.score,
+             location.score_word, location.reviews_count, now)
+            for location in locations
+        ]
+        if not rows:
+            return
+        with self.conn as conn:
+            conn.executemany("""
+                INSERT INTO hotel_locations
+                    (hotel_id, cell, latitude, longitude, name, score, score_word, reviews_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (hotel_id) DO UPDATE SET
+                    cell = excluded.cell,
+                    latitude = excluded.latitude,
+                    longitude = excluded.longitude,
+                    name = COALESCE(excluded.name, name),
+                    score = COALESCE(excluded.score, score),
+                    score_word = COALESCE(excluded.score_word, score_word),
+                    reviews_count = COALESCE(excluded.reviews_count, reviews_count),
+                    updated_at = excluded.updated_at
+            """, rows)
+        with self.lock:
+            self._written_since_prune += len(rows)
+            due = self._written_since_prune >= PRUNE_EVERY
+            if due:
+                self._written_since_prune = 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop hotels and coverage not seen recently, and hotels beyond ``max_hotels``.
+
+        A covered cell losing any of its hotels stops being covered, so a
+        later search there goes back to the API. Returns the hotels dropped.
+        """
+        since = time.time() - self.max_age
+        # Too old, or past the newest max_hotels
+        expired = (
+            "SELECT hotel_id FROM hotel_locations WHERE updated_at <= ? "
+            "UNION SELECT hotel_id FROM (SELECT hotel_id FROM hotel_locations ORDER BY updated_at DESC LIMIT -1 OFFSET ?)"
+        )
+        with self.conn as conn:
+            conn.execute(
+                f"DELETE FROM covered_cells WHERE covered_at <= ? "
+                f"OR cell IN (SELECT cell FROM hotel_locations WHERE hotel_id IN ({expired}))",
+                (since, since, self.max_hotels)
+            )
+            return conn.execute(f"DELETE FROM hotel_locations WHERE hotel_id IN ({expired})",
+                                (since, self.max_hotels)).rowcount
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> List[Tuple[HotelLocation, float]]:
+        """Indexed hotels within ``radius_km`` of a point with their distance, nearest first."""
+        cells = [cell for cell, _ in cells_in_radius(latitude, longitude, radius_km, self.precision)]
+        found = []
+        for start in range(0, len(cells), MAX_QUERY_PARAMS):
+            chunk = cells[start:start + MAX_QUERY_PARAMS]
+            rows = self.conn.execute(
+                f"SELECT hotel_id, latitude, longitude, name, score, score_word, reviews_count "
+                f"FROM hotel_locations WHERE cell IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for row in rows:
+                location = HotelLocation(*row)
+                distance = distance_km(latitude, longitude, location.latitude, location.longitude)
+                if distance <= radius_km:
+                    found.append((location, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def mark_covered(self, latitude: float, longitude: float, radius_km: float, complete: bool = True) -> int:
+        """Record that the hotels inside a circle are indexed; returns the cells covered.
+
+        ``complete`` is False when the sweep stopped at its page limit, so
+        only the hotels the API listed first are known.
+        """
+        now = time.time()
+        cells = [(cell, now, int(complete))
+                 for cell, inside in cells_in_radius(latitude, longitude, radius_km, self.precision) if inside]
+        with self.conn as conn:
+            conn.executemany("INSERT OR REPLACE INTO covered_cells (cell, covered_at, complete) VALUES (?, ?, ?)", cells)
+        return len(cells)
+
+    def covered(self, latitude: float, longitude: float, radius_km: float, max_age: float,
+                partial_max_age: float = 0.0) -> bool:
+        """Whether every cell touching a circle was covered less than ``max_age`` seconds ago.
+
+        Cells covered by a sweep that stopped at its page limit only count
+        for ``partial_max_age`` seconds.
+        """
+        cells = [cell for cell, _ in cells_in_radius(latitude, longitude, radius_km, self.precision)]
+        now = time.time()
+        found = 0
+        for start in range(0, len(cells), MAX_QUERY_PARAMS):
+            chunk = cells[start:start + MAX_QUERY_PARAMS]
+            found += self.conn.execute(
+                f"SELECT COUNT(*) FROM covered_cells WHERE covered_at > ? AND (complete OR covered_at > ?) "
+                f"AND cell IN ({','.join('?' * len(chunk))})",
+                [now - max_age, now - partial_max_age, *chunk]
+            ).fetchone()[0]
+        return found == len(cells)
+
+    def close(self):
+        # Dropping the thread-local storage closes every thread's connection
+        self._local = threading.local()
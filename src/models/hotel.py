@@ -0,0 +1,167 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from api.ranking import DEFAULT_VOCABULARY
+
+def _float_or_none(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _or_na(value: Any) -> Any:
+    return "N/A" if value is None else value
+
+class Hotel:
+    """One priced search result, parsed once.
+
+    Scores and prices are floats (None when Booking.com has none) and
+    facility names are interned as integer IDs in the shared facility
+    vocabulary, with their bitmask precomputed for ranking. ``to_row`` and
+    ``from_row`` are the compact JSON form used by the cache; ``to_dict``
+    gives the nested dict the CLI has always returned.
+    """
+
+    __slots__ = (
+        "hotel_id", "name", "score", "score_word", "reviews_count",
+        "price_per_night", "total_price", "currency", "num_nights", "num_rooms",
+        "address", "location", "website", "facility_ids", "popular_facility_ids", "facility_mask",
+        "distance_km",
+    )
+
+    def __init__(self,
+                 hotel_id: str,
+                 name: str,
+                 score: Optional[float] = None,
+                 score_word: str = "N/A",
+                 reviews_count: int = 0,
+                 price_per_night: Optional[float] = None,
+                 total_price: Optional[float] = None,
+                 currency: str = "USD",
+                 num_nights: int = 0,
+                 num_rooms: int = 1,
+                 address: str = "N/A",
+                 location: str = "N/A",
+                 website: str = "N/A",
+                 facilities: Iterable[str] = (),
+                 popular_facilities: Iterable[str] = (),
+                 distance_km: Optional[float] = None):
+        self.hotel_id = hotel_id
+        self.name = name
+        self.score = score
+        self.score_word = score_word
+        self.reviews_count = reviews_count
+        self.price_per_night = price_per_night
+        self.total_price = total_price
+        self.currency = currency
+        self.num_nights = num_nights
+        self.num_rooms = num_rooms
+        self.address = address
+        self.location = location
+        self.website = website
+        intern = DEFAULT_VOCABULARY.intern
+        self.facility_ids: Tuple[int, ...] = tuple(intern(name) for name in facilities if name)
+        self.popular_facility_ids: Tuple[int, ...] = tuple(intern(name) for name in popular_facilities if name)
+        mask = 0
+        for facility_id in self.facility_ids + self.popular_facility_ids:
+            mask |= 1 << facility_id
+        self.facility_mask = mask
+        # Distance from the searched point, for nearby searches
+        self.distance_km = distance_km
+
+    @property
+    def rating(self) -> float:
+        """Review score for ranking, 0 when there is none."""
+        return self.score if self.score is not None else 0.0
+
+    @property
+    def facilities(self) -> List[str]:
+        names = DEFAULT_VOCABULARY.names
+        return [names[facility_id] for facility_id in self.facility_ids]
+
+    @property
+    def popular_facilities(self) -> List[str]:
+        names = DEFAULT_VOCABULARY.names
+        return [names[facility_id] for facility_id in self.popular_facility_ids]
+
+    def to_row(self) -> list:
+        """Compact JSON-ready form, as stored in the cache."""
+        return [
+            self.hotel_id, self.name, self.score, self.score_word, self.reviews_count,
+            self.price_per_night, self.total_price, self.currency, self.num_nights, self.num_rooms,
+            self.address, self.location, self.website, self.facilities, self.popular_facilities,
+            self.distance_km,
+        ]
+
+    @classmethod
+    def from_row(cls, row: list) -> "Hotel":
+        return cls(*row)
+
+    @classmethod
+    def from_json(cls, value: Any) -> "Hotel":
+        """Hotel from a cached row, or from a nested dict cached by older versions."""
+        if isinstance(value, dict):
+            return cls.from_dict(value)
+        return cls.from_row(value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The nested dict shape used by JSON output."""
+        data = {
+            'hotel_id': self.hotel_id,
+            'hotel_name': self.name,
+            'review_score': {
+                'score': _or_na(self.score),
+                'word': self.score_word,
+                'reviews_count': self.reviews_count
+            },
+            'price': {
+                'per_night': _or_na(self.price_per_night),
+                'per_room': _or_na(self.price_per_night),
+                'total': self.total_price,
+                'currency': self.currency,
+                'num_nights': self.num_nights,
+                'num_rooms': self.num_rooms
+            },
+            'address': self.address,
+            'location': self.location,
+            'website': self.website,
+            'facilities': self.facilities,
+            'popular_facilities': self.popular_facilities
+        }
+        if self.distance_km is not None:
+            data['distance_km'] = self.distance_km
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Hotel":
+        review = data.get('review_score', {})
+        price = data.get('price', {})
+        return cls(
+            hotel_id=str(data.get('hotel_id', '')),
+            name=data.get('hotel_name', 'N/A'),
+            score=_float_or_none(review.get('score')),
+            score_word=review.get('word', 'N/A'),
+            reviews_count=review.get('reviews_count', 0),
+            price_per_night=_float_or_none(price.get('per_night')),
+            total_price=_float_or_none(price.get('total')),
+            currency=price.get('currency', 'USD'),
+            num_nights=price.get('num_nights', 0),
+            num_rooms=price.get('num_rooms', 1),
+            address=data.get('address', 'N/A'),
+            location=data.get('location', 'N/A'),
+            website=data.get('website', 'N/A'),
+            facilities=data.get('facilities', []),
+            popular_facilities=data.get('popular_facilities', []),
+            distance_km=_float_or_none(data.get('distance_km'))
+        )
+
+    def __repr__(self) -> str:
+        return f"Hotel({self.hotel_id!r}, {self.name!r})"
+
+def locations_to_dicts(results: Dict[str, Any]) -> Dict[str, Any]:
+    """A search_multiple_locations result with its hotels as plain dicts, for JSON."""
+    return {
+        **results,
+        "locations": {
+            destination: [hotel.to_dict() for hotel in hotels]
+            for destination, hotels in results.get("locations", {}).items()
+        }
+    }
@@ -0,0 +1,82 @@
+import gzip
+import json
+import os
+import time
+from typing import IO, TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    from models.cache import Cache
+
+SNAPSHOT_FORMAT = "travel-agent-cache"
+SNAPSHOT_VERSION = 1
+# Long-lived entries worth shipping to new replicas; prices expire in minutes
+DEFAULT_SNAPSHOT_NAMESPACES = ("destination_id", "hotel_details", "rank_hotels")
+COMPRESS_LEVEL = 6
+
+def write_snapshot(cache: "Cache", path: str, namespaces: Iterable[str] = DEFAULT_SNAPSHOT_NAMESPACES) -> int:
+    """Write the cache's entries in ``namespaces`` to a snapshot file; returns the entry count.
+
+    A snapshot is gzip-compressed text: a JSON header line with the format
+    and version, then one ``expires_at<TAB>key<TAB>value`` line per entry.
+    Keys and values are compact JSON, which never contains a raw tab or
+    newline, so values are copied as stored without re-encoding. The file
+    is written next to ``path`` and renamed into place when complete.
+    """
+    namespaces = list(namespaces)
+    temporary = f"{path}.tmp"
+    count = 0
+    with gzip.open(temporary, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL) as out:
+        out.write(json.dumps({
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "created_at": round(time.time(), 3),
+            "namespaces": namespaces
+        }) + "\n")
+        for key, value, expires_at in cache.export_entries(namespaces):
+            out.write(f"{expires_at:.3f}\t{key}\t{value}\n")
+            count += 1
+    os.replace(temporary, path)
+    return count
+
+def read_header(source: IO[str]) -> Dict[str, Any]:
+    """Parse and check the header line of an open snapshot."""
+    try:
+        header = json.loads(source.readline())
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError("Not a cache snapshot")
+    if not isinstance(header.get("version"), int) or header["version"] > SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {header.get('version')}, expected at most {SNAPSHOT_VERSION}")
+    return header
+
+def read_snapshot(path: str) -> Iterator[Tuple[str, str, float]]:
+    """(key, serialized value, expires_at) of every entry in a snapshot file."""
+    with gzip.open(path, "rt", encoding="utf-8") as source:
+        read_header(source)
+        for line_number, line in enumerate(source, 2):
+            try:
+                expires_at, key, value = line.rstrip("\n").split("\t", 2)
+                yield key, value, float(expires_at)
+            except ValueError:
+                raise ValueError(f"{path} line {line_number}: malformed entry")
+
+def import_snapshots(cache: "Cache", paths: List[str]) -> Dict[str, Any]:
+    """Merge snapshot files into the cache, newest expiry winning for each key.
+
+    Snapshots from several nodes can be imported in any order with the same
+    result.
+    """
+    started = time.perf_counter()
+    totals = {"snapshots": 0, "read": 0, "written": 0}
+
+    def counted(entries: Iterator[Tuple[str, str, float]]) -> Iterator[Tuple[str, str, float]]:
+        for entry in entries:
+            totals["read"] += 1
+            yield entry
+
+    for path in paths:
+        totals["written"] += cache.merge_entries(counted(read_snapshot(path)))
+        totals["snapshots"] += 1
+    totals["seconds"] = round(time.perf_counter() - started, 3)
+    return totals
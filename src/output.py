@@ -0,0 +1,66 @@
+import json
+from typing import IO, Any, Dict, Iterable, Optional
+
+# "table" is the Rich rendering in main.py; the others are written here
+OUTPUT_FORMATS = ("table", "json", "ndjson")
+
+class RecordWriter:
+    """Write machine-readable records to a stream as soon as they are ready.
+
+    ``ndjson`` writes one JSON object per line; ``json`` writes a single
+    array whose elements are written as they arrive. Every record is
+    encoded on its own, so the cost per record does not grow with the
+    number written before it, and ``flush`` hands what was written so far
+    to the consumer.
+    """
+
+    def __init__(self, out: IO[str], output_format: str):
+        if output_format not in ("json", "ndjson"):
+            raise ValueError(f"Unknown output format '{output_format}', expected json or ndjson")
+        self.out = out
+        self.format = output_format
+        self.count = 0
+        self.closed = False
+
+    def write(self, record: Dict[str, Any]):
+        encoded = json.dumps(record, separators=(',', ':'))
+        if self.format == "ndjson":
+            self.out.write(encoded + "\n")
+        else:
+            self.out.write(("[\n" if self.count == 0 else ",\n") + encoded)
+        self.count += 1
+
+    def write_all(self, records: Iterable[Dict[str, Any]]):
+        """Write a group of records and flush them."""
+        for record in records:
+            self.write(record)
+        self.flush()
+
+    def flush(self):
+        self.out.flush()
+
+    def close(self):
+        """End the JSON array, if any, and flush."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.format == "json":
+            self.out.write("[]\n" if self.count == 0 else "\n]\n")
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def hotel_records(hotels: Iterable[Any], **fields) -> Iterable[Dict[str, Any]]:
+    """Ranked Hotel objects as output records, each with its rank and ``fields``."""
+    for rank, hotel in enumerate(hotels, 1):
+        yield {**fields, "rank": rank, **hotel.to_dict()}
+
+def details_record(hotel_id: str, details: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Output record for a hotel's details, or None if there are none."""
+    if not details:
+        return None
+    return {"hotel_id": hotel_id, **details}
@@ -0,0 +1,231 @@
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from rich.console import Console
+from api.booking_api import (BookingAPI, DEFAULT_DESTINATION_TIMEOUT, DEFAULT_RANKER, RANKERS,
+                             order_by_amenities, with_details)
+from api.ranking import MAX_PREFERENCE_SCORE, PREFERENCE_WEIGHT, RATING_WEIGHT, parse_preferences, split_at_cutoff
+from api.tracing import tracer
+from models.hotel import Hotel
+
+console = Console()
+
+DEFAULT_OVERALL_TOP = 10
+# Label the pooled hotels are sent to the model under
+OVERALL_LABEL = "all destinations"
+
+def score_bound(hotel: Hotel, with_preferences: bool) -> float:
+    """Highest LocalRanker score a hotel can reach, known from its search result alone.
+
+    The rating part is exact; the preference part is only known once the
+    hotel's facilities are, so it is taken at its maximum.
+    """
+    bound = hotel.rating * RATING_WEIGHT
+    if with_preferences:
+        bound += MAX_PREFERENCE_SCORE * PREFERENCE_WEIGHT
+    return bound
+
+class BestOverall:
+    """The best hotels across every searched destination, best first."""
+
+    def __init__(self, hotels: List[Tuple[str, Hotel]], candidates: int, details_fetched: int, missing: List[str]):
+        # (destination, hotel) pairs
+        self.hotels = hotels
+        # Priced hotels within budget and rating found across destinations
+        self.candidates = candidates
+        self.details_fetched = details_fetched
+        # Destinations that failed or timed out
+        self.missing = missing
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for rank, (destination, hotel) in enumerate(self.hotels, 1):
+            yield {"destination": destination, "rank": rank, **hotel.to_dict()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "results": list(self.records()),
+            "candidates": self.candidates,
+            "details_fetched": self.details_fetched
+        }
+        if self.missing:
+            data["missing"] = self.missing
+        return data
+
+def gather_candidates(booking_api: BookingAPI,
+                      destinations: List[str],
+                      checkin_date: str,
+                      checkout_date: str,
+                      adults_number: int,
+                      room_number: int,
+                      max_price: Optional[float],
+                      min_rating: Optional[float],
+                      max_results: Optional[int],
+                      timeout: float,
+                      executor: Optional[ThreadPoolExecutor] = None) -> Tuple[List[Tuple[str, Hotel]], List[str]]:
+    """Priced hotels within budget and rating from every destination's result pages.
+
+    Returns (destination, hotel) pairs in destination order, each hotel once,
+    and the destinations that failed or did not finish within ``timeout``.
+    Destinations run on ``executor`` when given, otherwise on a pool of their own.
+    """
+    found: Dict[str, List[Hotel]] = {}
+    pool = executor or ThreadPoolExecutor(max_workers=len(destinations))
+    futures = {
+        pool.submit(booking_api.search_prices, destination, checkin_date, checkout_date,
+                        adults_number, room_number, max_price, max_results): destination
+        for destination in destinations
+    }
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            destination = futures[future]
+            try:
+                found[destination] = future.result()
+            except Exception as e:
+                console.print(f"[red]Error searching {destination}: {str(e)}[/red]")
+    except FuturesTimeoutError:
+        for destination in destinations:
+            if destination not in found:
+                console.print(f"[yellow]Search for {destination} timed out after {timeout:g}s[/yellow]")
+    finally:
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        else:
+            for future in futures:
+                future.cancel()
+
+    candidates = {}
+    for destination in destinations:
+        for hotel in found.get(destination, []):
+            if min_rating is not None and hotel.rating < min_rating:
+                continue
+            # Overlapping destinations can return the same hotel
+            candidates.setdefault(hotel.hotel_id, (destination, hotel))
+    return list(candidates.values()), [destination for destination in destinations if destination not in found]
+
+def enrich_best(booking_api: BookingAPI,
+                candidates: List[Tuple[str, Hotel]],
+                checkin_date: str,
+                checkout_date: str,
+                preferences: Optional[str],
+                top: int,
+                keep_ties: bool,
+                executor: Optional[ThreadPoolExecutor] = None) -> List[Tuple[str, Hotel]]:
+    """Fetch details for the candidates that can still reach the top ``top``.
+
+    Candidates are visited by their score bound, highest first, a batch of
+    ``max_workers`` at a time. A min-heap keeps the ``top`` best exact
+    scores so far; once the next bound cannot beat the smallest of them (or
+    equal it, with ``keep_ties``) no later candidate can either, and the
+    rest are never fetched. Returns the fetched candidates in visiting order.
+    Details are fetched on ``executor`` when given, otherwise on a pool of
+    their own.
+    """
+    with_preferences = bool(parse_preferences(preferences))
+    if not with_preferences:
+        # Scores are exact on the search page: only the winners need details
+        candidates = heapq.nlargest(top, candidates, key=lambda candidate: candidate[1].rating)
+    else:
+        candidates = order_by_amenities(candidates, booking_api.amenity_index, preferences,
+                                        hotel_id=lambda candidate: candidate[1].hotel_id)
+        candidates = sorted(candidates, key=lambda candidate: -score_bound(candidate[1], True))
+
+    best_scores: List[float] = []
+    enriched: List[Tuple[str, Hotel]] = []
+
+    def may_place(candidate: Tuple[str, Hotel]) -> bool:
+        if not with_preferences or len(best_scores) < top:
+            return True
+        bound = score_bound(candidate[1], True)
+        return bound > best_scores[0] or (keep_ties and bound == best_scores[0])
+
+    position = 0
+    workers = max(1, min(booking_api.max_workers, len(candidates) or 1))
+    pool = executor or ThreadPoolExecutor(max_workers=workers)
+    try:
+        while position < len(candidates) and may_place(candidates[position]):
+            batch = []
+            while position < len(candidates) and len(batch) < workers and may_place(candidates[position]):
+                batch.append(candidates[position])
+                position += 1
+            all_details = pool.map(
+                lambda candidate: booking_api.get_hotel_details(candidate[1].hotel_id, checkin_date, checkout_date),
+                batch
+            )
+            hotels = [(destination, with_details(hotel, details))
+                      for (destination, hotel), details in zip(batch, all_details)]
+            scores = booking_api.local_ranker.scores([hotel for _, hotel in hotels], preferences)
+            for score in scores:
+                if len(best_scores) < top:
+                    heapq.heappush(best_scores, score)
+                elif score > best_scores[0]:
+                    heapq.heapreplace(best_scores, score)
+            enriched.extend(hotels)
+    finally:
+        if executor is None:
+            pool.shutdown()
+    tracer.annotate(candidates=len(candidates), details_fetched=len(enriched))
+    return enriched
+
+@tracer.traced("booking.search_overall")
+def run_overall(booking_api: BookingAPI,
+                destinations: List[str],
+                checkin_date: str,
+                checkout_date: str,
+                adults_number: int,
+                room_number: int = 1,
+                max_price: Optional[float] = None,
+                preferences: Optional[str] = None,
+                top: int = DEFAULT_OVERALL_TOP,
+                min_rating: Optional[float] = None,
+                max_results: Optional[int] = None,
+                ranker: str = DEFAULT_RANKER,
+                timeout: Optional[float] = None,
+                executor: Optional[ThreadPoolExecutor] = None) -> BestOverall:
+    """Rank the hotels of every destination together and keep the best ``top``.
+
+    Hotels are priced from the result pages with search_prices, so hotels
+    over budget or rated below ``min_rating`` never cost a details request.
+    Details are then fetched only for hotels whose score bound can still
+    place them (see enrich_best). With the openai ranker the model orders
+    the best ``top`` of those; with hybrid it only settles ties at the
+    cutoff. Either way it gets one request for all destinations.
+    Searches and detail lookups run on ``executor`` when one is given.
+    """
+    if ranker not in RANKERS:
+        raise ValueError(f"Unknown ranker '{ranker}', expected one of: {', '.join(RANKERS)}")
+    if top < 1:
+        raise ValueError("The overall top must be at least 1")
+    if timeout is None:
+        timeout = float(os.getenv("BOOKING_DESTINATION_TIMEOUT", DEFAULT_DESTINATION_TIMEOUT))
+    destinations = list(dict.fromkeys(destinations))
+    if not destinations:
+        return BestOverall([], 0, 0, [])
+
+    candidates, missing = gather_candidates(booking_api, destinations, checkin_date, checkout_date, adults_number,
+                                            room_number, max_price, min_rating, max_results, timeout, executor)
+    uses_model = bool(parse_preferences(preferences)) and ranker != "local"
+    enriched = enrich_best(booking_api, candidates, checkin_date, checkout_date, preferences, top,
+                           keep_ties=uses_model and ranker == "hybrid", executor=executor)
+
+    destination_of = {hotel.hotel_id: destination for destination, hotel in enriched}
+    with tracer.span("rank.overall", ranker=ranker):
+        ranked = booking_api.local_ranker.rank_with_scores([hotel for _, hotel in enriched], preferences)
+    if not uses_model:
+        placed = [hotel for hotel, _ in ranked[:top]]
+    elif ranker == "openai":
+        placed = model_order(booking_api, [hotel for hotel, _ in ranked[:top]], preferences)
+    else:
+        sure, tied = split_at_cutoff(ranked, top)
+        placed = sure + model_order(booking_api, tied, preferences)[:top - len(sure)] if tied else sure
+
+    return BestOverall([(destination_of[hotel.hotel_id], hotel) for hotel in placed],
+                       len(candidates), len(enriched), missing)
+
+def model_order(booking_api: BookingAPI, hotels: List[Hotel], preferences: str) -> List[Hotel]:
+    """Hotels in the model's order: its picks first, then the rest as given."""
+    if not hotels:
+        return hotels
+    picks = booking_api.openai_api.rank_destinations({OVERALL_LABEL: hotels}, preferences)[OVERALL_LABEL]
+    picked = {hotel.hotel_id for hotel in picks}
+    return picks + [hotel for hotel in hotels if hotel.hotel_id not in picked]
@@ -0,0 +1,273 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+from rich.console import Console
+from rich.markup import escape
+from api.booking_api import BookingAPI
+from api.options import DEFAULT_NEARBY_RADIUS_KM, DEFAULT_RANKER, RANKERS, default_dates
+from api.circuit_breaker import CircuitBreakers
+from api.tracing import tracer
+from models.hotel import locations_to_dicts
+from overall import run_overall
+
+console = Console()
+
+# Connections served at the same time, one thread each; more are answered 503
+DEFAULT_MAX_REQUESTS = 32
+# Threads searching destinations, shared by every request
+DEFAULT_DESTINATION_WORKERS = 16
+# Seconds an idle keep-alive connection may hold its thread
+KEEP_ALIVE_TIMEOUT = 30
+
+class BadRequest(ValueError):
+    """A request parameter is missing or malformed."""
+
+def _dates(query: Dict[str, list]):
+    try:
+        return default_dates(_param(query, "checkin"), _param(query, "checkout"))
+    except ValueError as e:
+        raise BadRequest(str(e))
+
+def _param(query: Dict[str, list], name: str, cast: Callable = str, default: Any = None, required: bool = False):
+    values = query.get(name)
+    if not values or values[0] == "":
+        if required:
+            raise BadRequest(f"Missing parameter '{name}'")
+        return default
+    try:
+        return cast(values[0])
+    except ValueError:
+        raise BadRequest(f"Invalid value for '{name}': {values[0]}")
+
+class TravelAgentServer(ThreadingHTTPServer):
+    """HTTP front end sharing one warm BookingAPI across every request.
+
+    Each connection runs on its own thread, up to ``max_requests`` of them;
+    further connections are answered 503 without starting a thread.
+    Destinations are searched on one executor of ``destination_workers``
+    threads shared by every request. The BookingAPI's connection pool,
+    cache, in-flight deduplication and request limit are shared too.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, booking_api: BookingAPI, max_requests: Optional[int] = None,
+                 destination_workers: Optional[int] = None):
+        super().__init__(address, RequestHandler)
+        self.booking_api = booking_api
+        self.started_at = time.time()
+        self.max_requests = max_requests or int(os.getenv("SERVER_MAX_REQUESTS", DEFAULT_MAX_REQUESTS))
+        self._request_slots = threading.BoundedSemaphore(self.max_requests)
+        self.executor = ThreadPoolExecutor(
+            max_workers=destination_workers or int(os.getenv("SERVER_DESTINATION_WORKERS", DEFAULT_DESTINATION_WORKERS)),
+            thread_name_prefix="server-search"
+        )
+
+    def process_request(self, request, client_address):
+        if not self._request_slots.acquire(blocking=False):
+            self.reject(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except BaseException:
+            self._request_slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._request_slots.release()
+
+    def reject(self, request):
+        """Answer 503 on the accepting thread and close the connection."""
+        body = json.dumps({"error": "Too many requests in progress, retry later"}).encode()
+        head = ("HTTP/1.1 503 Service Unavailable\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Retry-After: 1\r\n"
+                "Connection: close\r\n\r\n")
+        try:
+            request.sendall(head.encode() + body)
+        except OSError:
+            pass
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def breakers(self) -> List[CircuitBreakers]:
+        """Circuit breakers of the upstream APIs created so far."""
+        breakers = [self.booking_api.breakers]
+        if self.booking_api.openai_api_loaded:
+            breakers.append(self.booking_api.openai_api.breakers)
+        return breakers
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server: TravelAgentServer
+    protocol_version = "HTTP/1.1"
+    # Idle keep-alive connections are closed so they don't hold a request slot
+    timeout = KEEP_ALIVE_TIMEOUT
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        route = self.routes().get(url.path.rstrip("/") or "/")
+        if route is None:
+            self.send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+
+        try:
+            with tracer.span(f"server{url.path}") as span:
+                status, body = route(parse_qs(url.query))
+                span.set(status=status)
+        except BadRequest as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        except Exception as e:
+            console.print(f"[red]Error handling {escape(url.path)}: {str(e)}[/red]")
+            self.send_json(502, {"error": str(e)})
+            return
+
+        if isinstance(body, str):
+            self.send_body(status, body.encode(), "text/plain; version=0.0.4")
+        else:
+            self.send_json(status, body)
+
+    def routes(self) -> Dict[str, Callable]:
+        return {
+            "/health": self.health,
+            "/metrics": self.metrics,
+            "/search": self.search,
+            "/details": self.details,
+            "/nearby": self.nearby,
+        }
+
+    def health(self, query):
+        booking_api = self.server.booking_api
+        circuits = {}
+        for breakers in self.server.breakers():
+            circuits.update(breakers.stats())
+        # Still answering, but from the cache for the endpoints that are down
+        degraded = any(circuit["state"] != "closed" for circuit in circuits.values())
+        body = {
+            "status": "degraded" if degraded else "ok",
+            "uptime_s": round(time.time() - self.server.started_at, 1),
+            "circuits": circuits
+        }
+        if booking_api.cache is not None:
+            body["cache"] = booking_api.cache.stats()
+        return 200, body
+
+    def metrics(self, query):
+        lines = []
+        for breakers in self.server.breakers():
+            lines.extend(breakers.prometheus())
+        return 200, tracer.prometheus() + "".join(line + "\n" for line in lines)
+
+    def search(self, query):
+        destinations = [d.strip() for d in _param(query, "destinations", required=True).split(",") if d.strip()]
+        if not destinations:
+            raise BadRequest("Please provide at least one destination")
+        ranker = _param(query, "ranker", default=DEFAULT_RANKER)
+        if ranker not in RANKERS:
+            raise BadRequest(f"Unknown ranker '{ranker}', expected one of: {', '.join(RANKERS)}")
+        checkin, checkout = _dates(query)
+
+        overall_top = _param(query, "overall_top", int)
+        if overall_top is not None:
+            if overall_top < 1:
+                raise BadRequest("overall_top must be at least 1")
+            return 200, run_overall(
+                self.server.booking_api,
+                destinations,
+                checkin,
+                checkout,
+                adults_number=_param(query, "adults", int, 2),
+                room_number=_param(query, "rooms", int, 1),
+                max_price=_param(query, "budget", float),
+                preferences=_param(query, "preferences"),
+                top=overall_top,
+                min_rating=_param(query, "min_rating", float),
+                max_results=_param(query, "max_results", int),
+                ranker=ranker,
+                timeout=_param(query, "timeout", float),
+                executor=self.server.executor
+            ).to_dict()
+
+        return 200, locations_to_dicts(self.server.booking_api.search_multiple_locations(
+            destinations=destinations,
+            checkin_date=checkin,
+            checkout_date=checkout,
+            adults_number=_param(query, "adults", int, 2),
+            room_number=_param(query, "rooms", int, 1),
+            max_price=_param(query, "budget", float),
+            preferences=_param(query, "preferences"),
+            timeout=_param(query, "timeout", float),
+            ranker=ranker,
+            max_results=_param(query, "max_results", int),
+            executor=self.server.executor
+        ))
+
+    def details(self, query):
+        hotel_id = _param(query, "hotel_id", required=True)
+        checkin, checkout = _dates(query)
+        details = self.server.booking_api.get_hotel_details(hotel_id, checkin, checkout)
+        if not details:
+            return 404, {"error": f"No details found for hotel {hotel_id}"}
+        return 200, details
+
+    def nearby(self, query):
+        checkin, checkout = _dates(query)
+        try:
+            results = self.server.booking_api.search_nearby(
+                latitude=_param(query, "latitude", float, required=True),
+                longitude=_param(query, "longitude", float, required=True),
+                checkin_date=checkin,
+                checkout_date=checkout,
+                adults_number=_param(query, "adults", int, 2),
+                room_number=_param(query, "rooms", int, 1),
+                radius_km=_param(query, "radius", float, DEFAULT_NEARBY_RADIUS_KM),
+                max_price=_param(query, "budget", float),
+                max_results=_param(query, "max_results", int),
+                preferences=_param(query, "preferences")
+            )
+        except ValueError as e:
+            raise BadRequest(str(e))
+        return 200, {
+            "results": [hotel.to_dict() for hotel in results["results"]],
+            "source": results["source"],
+            "stale": results.get("stale", False)
+        }
+
+    def send_json(self, status: int, body: Any):
+        self.send_body(status, json.dumps(body).encode(), "application/json")
+
+    def send_body(self, status: int, payload: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        console.print(f"[dim]{self.address_string()} - {escape(format % args)}[/dim]", soft_wrap=True)
+
+def serve(booking_api: BookingAPI, host: str = "0.0.0.0", port: int = 8000):
+    """Serve the API until interrupted."""
+    server = TravelAgentServer((host, port), booking_api)
+    console.print(f"[bold blue]Serving on http://{host}:{port}[/bold blue] (/health, /search, /details, /nearby, /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if booking_api.cache is not None:
+            booking_api.cache.flush()
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from api.booking_api import BookingAPI, with_details
+from api.options import count_nights
+from models.hotel import Hotel
+
+DEFAULT_SWEEP_WORKERS = 4
+# Upper bound on check-in date and stay length combinations per destination
+MAX_SWEEP_STAYS = 62
+# Hotels shown per destination
+SWEEP_TOP_HOTELS = 10
+
+def parse_nights(text: str) -> List[int]:
+    """Stay lengths from a comma-separated list such as "2,3" or "2-4"."""
+    nights = set()
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                low, high = (int(value) for value in part.split("-", 1))
+                nights.update(range(low, high + 1))
+            else:
+                nights.add(int(part))
+        except ValueError:
+            raise ValueError(f"Invalid stay length '{part}', expected numbers such as 2,3 or 2-4")
+    if not nights or min(nights) < 1:
+        raise ValueError("Stay lengths must be at least one night")
+    return sorted(nights)
+
+def stay_dates(first_checkin: str, last_checkin: str, nights: List[int]) -> List[Tuple[str, str]]:
+    """Every (checkin, checkout) pair for check-ins from first to last and each stay length."""
+    first = datetime.strptime(first_checkin, "%Y-%m-%d")
+    last = datetime.strptime(last_checkin, "%Y-%m-%d")
+    if last < first:
+        raise ValueError("The last check-in date must not be before the first")
+    days = (last - first).days + 1
+    if days * len(nights) > MAX_SWEEP_STAYS:
+        raise ValueError(f"A sweep covers at most {MAX_SWEEP_STAYS} stays, "
+                         f"this one would need {days * len(nights)}")
+    return [
+        ((first + timedelta(days=day)).strftime("%Y-%m-%d"),
+         (first + timedelta(days=day + stay)).strftime("%Y-%m-%d"))
+        for day in range(days)
+        for stay in nights
+    ]
+
+class PriceMatrix:
+    """Total price of every hotel found for each stay in a sweep."""
+
+    def __init__(self, destination: str, checkins: List[str], nights: List[int]):
+        self.destination = destination
+        self.checkins = checkins
+        self.nights = nights
+        self.hotels: Dict[str, Hotel] = {}
+        # hotel_id -> (checkin, nights) -> total price
+        self.prices: Dict[str, Dict[Tuple[str, int], float]] = {}
+
+    def add(self, checkin: str, nights: int, hotels: List[Hotel]):
+        for hotel in hotels:
+            self.hotels.setdefault(hotel.hotel_id, hotel)
+            if hotel.total_price is not None:
+                self.prices.setdefault(hotel.hotel_id, {})[(checkin, nights)] = hotel.total_price
+
+    def price(self, hotel_id: str, checkin: str, nights: int) -> Optional[float]:
+        return self.prices.get(hotel_id, {}).get((checkin, nights))
+
+    def cheapest_stay(self, hotel_id: str) -> Optional[Tuple[str, int, float]]:
+        """(checkin, nights, total) of the stay with the lowest price per night."""
+        stays = self.prices.get(hotel_id)
+        if not stays:
+            return None
+        (checkin, nights), total = min(stays.items(), key=lambda item: item[1] / item[0][1])
+        return checkin, nights, total
+
+    def cheapest_first(self) -> List[str]:
+        """Hotels with prices, by their lowest price per night."""
+        def nightly(hotel_id: str) -> float:
+            _, nights, total = self.cheapest_stay(hotel_id)
+            return total / nights
+        return sorted(self.prices, key=nightly)
+
+    def to_dict(self, hotel_ids: List[str]) -> Dict[str, Any]:
+        """JSON-ready matrix for the given hotels: prices[checkin][nights] = total."""
+        hotels = []
+        for hotel_id in hotel_ids:
+            prices: Dict[str, Dict[str, float]] = {}
+            for (checkin, nights), total in sorted(self.prices.get(hotel_id, {}).items()):
+                prices.setdefault(checkin, {})[str(nights)] = total
+            cheapest = self.cheapest_stay(hotel_id)
+            hotels.append({
+                **self.hotels[hotel_id].to_dict(),
+                "prices": prices,
+                "cheapest": {"checkin": cheapest[0], "nights": cheapest[1], "total": cheapest[2]} if cheapest else None
+            })
+        return {"destination": self.destination, "checkins": self.checkins, "nights": self.nights, "hotels": hotels}
+
+def run_sweep(booking_api: BookingAPI,
+              destination: str,
+              stays: List[Tuple[str, str]],
+              adults_number: int,
+              room_number: int = 1,
+              max_price: Optional[float] = None,
+              max_results: Optional[int] = None,
+              preferences: Optional[str] = None,
+              workers: int = DEFAULT_SWEEP_WORKERS,
+              top: int = SWEEP_TOP_HOTELS) -> Tuple[PriceMatrix, List[Hotel]]:
+    """Price every stay in one destination and pick the hotels to show.
+
+    Stays are priced concurrently with search_prices, which shares the
+    BookingAPI's destination ID cache, rate limit and request slots and
+    never fetches hotel details. Without preferences the cheapest hotels
+    per night are shown. With preferences, details are fetched once per
+    priced hotel, whatever the number of stays, and hotels are ranked on
+    them.
+    """
+    checkins = list(dict.fromkeys(checkin for checkin, _ in stays))
+    nights = sorted({count_nights(checkin, checkout) for checkin, checkout in stays})
+    matrix = PriceMatrix(destination, checkins, nights)
+
+    def price(stay: Tuple[str, str]) -> List[Hotel]:
+        return booking_api.search_prices(destination, stay[0], stay[1], adults_number,
+                                         room_number, max_price, max_results)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for (checkin, checkout), hotels in zip(stays, executor.map(price, stays)):
+            matrix.add(checkin, count_nights(checkin, checkout), hotels)
+
+    hotel_ids = matrix.cheapest_first()
+    if not preferences:
+        return matrix, [matrix.hotels[hotel_id] for hotel_id in hotel_ids[:top]]
+
+    first_checkin, first_checkout = stays[0]
+    with ThreadPoolExecutor(max_workers=max(1, min(booking_api.max_workers, len(hotel_ids) or 1))) as executor:
+        all_details = executor.map(
+            lambda hotel_id: booking_api.get_hotel_details(hotel_id, first_checkin, first_checkout), hotel_ids
+        )
+        hotels = [with_details(matrix.hotels[hotel_id], details) for hotel_id, details in zip(hotel_ids, all_details)]
+    return matrix, booking_api.local_ranker.rank(hotels, preferences, top)
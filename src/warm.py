@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+from rich.console import Console
+from batch import spec_params
+
+if TYPE_CHECKING:
+    from api.booking_api import BookingAPI
+
+console = Console()
+
+DEFAULT_WARM_WORKERS = 4
+# Entries expiring within this many seconds are refreshed by a warm pass
+DEFAULT_WARM_MARGIN = 120.0
+DEFAULT_WARM_EVERY = 300.0
+
+def load_hot_list(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """Read the searches to keep warm, one JSON object per line.
+
+    Lines use the batch format. Instead of fixed dates a line may give
+    ``checkin_in_days`` and ``nights``, which are resolved against today's
+    date on every pass so a rolling window stays warm.
+    """
+    specs = []
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            spec = json.loads(line)
+            if not isinstance(spec, dict):
+                raise ValueError("Expected a JSON object")
+            spec_params(resolve_dates(spec))
+        except ValueError as e:
+            raise ValueError(f"Line {line_number}: {str(e)}")
+        specs.append(spec)
+    return specs
+
+def resolve_dates(spec: Dict[str, Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """The spec with relative ``checkin_in_days``/``nights`` turned into dates."""
+    if "checkin_in_days" not in spec and "nights" not in spec:
+        return spec
+    today = today or date.today()
+    checkin = today + timedelta(days=int(spec.get("checkin_in_days", 1)))
+    checkout = checkin + timedelta(days=int(spec.get("nights", 1)))
+    return {**spec, "checkin": checkin.isoformat(), "checkout": checkout.isoformat()}
+
+def warm_targets(specs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One warm_search call per distinct destination and date window in the hot list."""
+    targets = {}
+    for spec in specs:
+        params = spec_params(resolve_dates(spec))
+        for destination in params["destinations"]:
+            target = {
+                "destination": destination,
+                "checkin_date": params["checkin_date"],
+                "checkout_date": params["checkout_date"],
+                "adults_number": params["adults_number"],
+                "room_number": params["room_number"],
+                "max_price": params["max_price"],
+                "max_results": params["max_results"],
+                "preferences": params["preferences"],
+            }
+            targets[json.dumps(target, sort_keys=True)] = target
+    return list(targets.values())
+
+def warm_once(booking_api: "BookingAPI",
+              specs: List[Dict[str, Any]],
+              margin: float = DEFAULT_WARM_MARGIN,
+              workers: int = DEFAULT_WARM_WORKERS) -> Dict[str, Any]:
+    """Refresh every hot search whose cache entries expire within ``margin`` seconds."""
+    started = time.perf_counter()
+    totals = {"searches": 0, "errors": 0, "destinations": 0, "refreshed_searches": 0, "details": 0}
+
+    def warm(target: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        try:
+            return booking_api.warm_search(**target, margin=margin)
+        except Exception as e:
+            console.print(f"[red]Error warming {target['destination']}: {str(e)}[/red]")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for refreshed in executor.map(warm, warm_targets(specs)):
+            totals["searches"] += 1
+            if refreshed is None:
+                totals["errors"] += 1
+                continue
+            totals["destinations"] += refreshed["destinations"]
+            totals["refreshed_searches"] += refreshed["searches"]
+            totals["details"] += refreshed["details"]
+
+    if booking_api.cache is not None:
+        booking_api.cache.flush()
+    totals["seconds"] = round(time.perf_counter() - started, 2)
+    return totals
+
+def warm_forever(booking_api: "BookingAPI",
+                 specs: List[Dict[str, Any]],
+                 every: float = DEFAULT_WARM_EVERY,
+                 margin: float = DEFAULT_WARM_MARGIN,
+                 workers: int = DEFAULT_WARM_WORKERS,
+                 stop: Optional[threading.Event] = None):
+    """Run a warm pass every ``every`` seconds until ``stop`` is set.
+
+    Each pass also refreshes entries that would expire before the next one.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        display_totals(warm_once(booking_api, specs, margin + every, workers))
+        stop.wait(every)
+
+def start_warming(booking_api: "BookingAPI",
+                  specs: List[Dict[str, Any]],
+                  every: float = DEFAULT_WARM_EVERY,
+                  margin: float = DEFAULT_WARM_MARGIN,
+                  workers: int = DEFAULT_WARM_WORKERS) -> threading.Event:
+    """Keep the hot list warm from a daemon thread; set the returned event to stop it."""
+    stop = threading.Event()
+    threading.Thread(
+        target=warm_forever,
+        args=(booking_api, specs, every, margin, workers, stop),
+        name="cache-warmer",
+        daemon=True
+    ).start()
+    return stop
+
+def display_totals(totals: Dict[str, Any]):
+    console.print(
+        f"[dim]Warmed {totals['searches']} searches in {totals['seconds']:.1f}s: "
+        f"refreshed {totals['destinations']} destination IDs, {totals['refreshed_searches']} result lists "
+        f"and {totals['details']} hotel details ({totals['errors']} failed)[/dim]"
+    )
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+# The modules under test import each other from src/, as main.py does;
+# the replay transport used in place of RapidAPI lives in benchmarks/
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from models.cache import Cache
+
+class Clock:
+    """Stand-in for time.time or time.monotonic that only moves when told to."""
+
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+@pytest.fixture
+def make_cache(tmp_path):
+    """Factory for caches in tmp_path, closed after the test.
+
+    Every write is committed at once and read back from SQLite unless the
+    test asks for batching or a memory tier.
+    """
+    caches = []
+
+    def make(name: str = "cache", **settings) -> Cache:
+        settings.setdefault("batch_size", 1)
+        settings.setdefault("memory_items", 0)
+        cache = Cache(str(tmp_path / f"{name}.db"), **settings)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+@pytest.fixture
+def make_booking_api(make_cache, monkeypatch):
+    """Factory for a BookingAPI answered by the replay transport, and its call counter."""
+    monkeypatch.setenv("BOOKING_RATE_LIMIT", "0")
+    from replay import CallCounter, ReplayAdapter, install
+    from api.booking_api import BookingAPI
+    apis = []
+
+    def make(**settings):
+        counter = CallCounter()
+        booking_api = BookingAPI(cache=make_cache(f"booking{len(apis)}"), **settings)
+        install(booking_api, ReplayAdapter(counter=counter))
+        apis.append(booking_api)
+        return booking_api, counter
+
+    yield make
+    for booking_api in apis:
+        booking_api.amenity_index.close()
+        booking_api.geo_index.close()
@@ -0,0 +1,95 @@
+import pytest
+
+from api.booking_api import order_by_amenities
+from conftest import Clock
+from models.amenity_index import AmenityIndex
+
+DAY = 86400
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("models.amenity_index.time.time", clock)
+    return clock
+
+@pytest.fixture
+def make_index(tmp_path):
+    indexes = []
+
+    def make(**settings) -> AmenityIndex:
+        index = AmenityIndex(str(tmp_path / "amenities.db"), **settings)
+        indexes.append(index)
+        return index
+
+    yield make
+    for index in indexes:
+        index.close()
+
+def indexed_ids(index: AmenityIndex) -> list:
+    return sorted(hotel_id for hotel_id, in index.conn.execute("SELECT hotel_id FROM indexed_hotels"))
+
+def test_counts_preferences_matched_through_synonyms(make_index):
+    index = make_index()
+    index.add("a", ["Outdoor swimming pool", "Free WiFi"])
+    index.add("b", ["Fitness centre"])
+    index.add("c", [])
+    counts = index.match_counts(["a", "b", "c", "unknown"], "pool, wifi, gym")
+    assert counts == {"a": 2, "b": 1, "c": 0, "unknown": None}
+
+def test_readding_a_hotel_replaces_its_amenities(make_index):
+    index = make_index()
+    index.add("a", ["Swimming pool"])
+    index.add("a", ["Garden"])
+    assert index.match_counts(["a"], "pool") == {"a": 0}
+
+def test_amenities_added_after_a_match_are_found(make_index):
+    index = make_index()
+    index.add("a", ["Garden"])
+    assert index.hotels_with("pool") == set()
+    index.add("b", ["Rooftop pool"])
+    assert index.hotels_with("pool") == {"b"}
+
+def candidates(*hotel_ids: str) -> list:
+    """Priced search results as order_by_amenities gets them; only the hotel ID matters."""
+    return [({"hotel_id": hotel_id},) for hotel_id in hotel_ids]
+
+def candidate_ids(candidates: list) -> list:
+    return [candidate[0]["hotel_id"] for candidate in candidates]
+
+def test_candidates_known_to_match_more_preferences_go_first(make_index):
+    index = make_index()
+    index.add("none", ["Garden"])
+    index.add("one", ["Swimming pool"])
+    index.add("two", ["Swimming pool", "Spa and wellness centre"])
+    ordered = order_by_amenities(candidates("none", "unknown", "one", "two"), index, "pool,spa")
+    # Hotels not indexed yet go between those matching something and those matching nothing
+    assert candidate_ids(ordered) == ["two", "one", "unknown", "none"]
+
+def test_order_is_kept_without_preferences_or_an_index(make_index):
+    index = make_index()
+    index.add("b", ["Swimming pool"])
+    assert candidate_ids(order_by_amenities(candidates("a", "b"), index, None)) == ["a", "b"]
+    assert candidate_ids(order_by_amenities(candidates("a", "b"), None, "pool")) == ["a", "b"]
+
+def test_hotels_indexed_too_long_ago_are_forgotten(make_index, clock):
+    index = make_index(max_age=30 * DAY)
+    index.add("old", ["Swimming pool"])
+    clock.advance(20 * DAY)
+    index.add("recent", ["Swimming pool"])
+    clock.advance(15 * DAY)
+    assert index.prune() == 1
+    assert indexed_ids(index) == ["recent"]
+    assert index.hotels_with("pool") == {"recent"}
+
+def test_hotels_beyond_max_hotels_are_forgotten_least_recent_first(make_index, clock):
+    index = make_index(max_hotels=2)
+    for hotel_id in ("a", "b", "c"):
+        index.add(hotel_id, ["Swimming pool"])
+        clock.advance(1)
+    assert index.prune() == 1
+    assert indexed_ids(index) == ["b", "c"]
+
+def test_the_index_is_pruned_when_opened(make_index, clock):
+    make_index().add("old", ["Swimming pool"])
+    clock.advance(31 * DAY)
+    assert indexed_ids(make_index(max_age=30 * DAY)) == []
@@ -0,0 +1,107 @@
+import os
+import threading
+from datetime import timedelta
+
+import pytest
+
+from conftest import Clock
+from models.cache import Cache
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("models.cache.time.time", clock)
+    return clock
+
+def stored_keys(cache: Cache):
+    return sorted(key for key, in cache.conn.execute("SELECT key FROM entries"))
+
+def test_rows_over_max_rows_evict_least_recently_used(make_cache, clock):
+    cache = make_cache(max_rows=3)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+        clock.advance(1)
+    assert cache.get("a") == "a"
+    clock.advance(1)
+
+    cache.set("d", "d")
+
+    assert stored_keys(cache) == ["a", "c", "d"]
+
+def test_bytes_over_max_bytes_evict_least_recently_used(make_cache, clock):
+    value = "x" * 100
+    cache = make_cache(max_bytes=250)
+    for key in ("a", "b", "c"):
+        cache.set(key, value)
+        clock.advance(1)
+
+    assert stored_keys(cache) == ["b", "c"]
+    total, = cache.conn.execute("SELECT TOTAL(size) FROM entries").fetchone()
+    assert total <= 250
+
+def test_entries_past_the_stale_window_are_deleted(make_cache, clock):
+    cache = make_cache(stale_seconds=60)
+    cache.set("old", 1, ttl=timedelta(seconds=10))
+    cache.set("kept", 2, ttl=timedelta(seconds=120))
+    clock.advance(100)
+
+    assert cache.lookup("old", max_stale=60) == (None, False)
+    cache.set("new", 3)
+
+    assert stored_keys(cache) == ["kept", "new"]
+
+def test_expired_entries_are_served_stale_within_max_stale(make_cache, clock):
+    cache = make_cache(stale_seconds=60)
+    cache.set("key", {"rooms": 2}, ttl=timedelta(seconds=10))
+    clock.advance(30)
+
+    assert cache.get("key") is None
+    assert cache.lookup("key", max_stale=60) == ({"rooms": 2}, True)
+    assert cache.lookup("key", max_stale=10) == (None, False)
+
+def test_memory_tier_keeps_at_most_memory_items(make_cache):
+    cache = make_cache(memory_items=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+
+    assert list(cache._memory) == ["b", "c"]
+    # Entries dropped from memory are still read from SQLite
+    assert cache.get("a") == "a"
+
+def test_buffered_writes_are_read_back_before_a_flush(make_cache):
+    cache = make_cache(batch_size=10, flush_interval=60)
+    cache.set("key", [1, 2, 3])
+
+    assert stored_keys(cache) == []
+    assert cache.get("key") == [1, 2, 3]
+    cache.flush()
+    assert stored_keys(cache) == ["key"]
+
+def open_files(path: str) -> int:
+    """Open file descriptors of this process on ``path`` (with its -wal and -shm files)."""
+    count = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}").startswith(path)
+        except OSError:
+            pass
+    return count
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc to count open files")
+def test_connections_of_finished_threads_are_closed(make_cache):
+    cache = make_cache()
+    cache.set("a", 1)
+
+    def read_in_threads(count: int):
+        for _ in range(count):
+            thread = threading.Thread(target=cache.get, args=("a",))
+            thread.start()
+            thread.join()
+
+    read_in_threads(5)
+    opened = open_files(cache.db_path)
+    # Each thread opens a connection of its own; none may outlive it
+    read_in_threads(50)
+    assert open_files(cache.db_path) == opened
+    cache.close()
+    assert open_files(cache.db_path) == 0
@@ -0,0 +1,151 @@
+import pytest
+
+from conftest import Clock
+from api.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers, CircuitOpenError
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("api.circuit_breaker.time.monotonic", clock)
+    return clock
+
+def make_breaker(**settings) -> CircuitBreaker:
+    settings = {"failure_rate": 0.5, "window": 10, "min_calls": 4, "slow_call_seconds": 2.0,
+                "open_seconds": 30.0, **settings}
+    return CircuitBreaker("searchHotels", **settings)
+
+def call(breaker: CircuitBreaker, ok: bool = True, duration: float = 0.1):
+    breaker.allow()
+    breaker.record(ok, duration)
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.min_calls):
+        call(breaker, ok=False)
+    assert breaker.state == OPEN
+
+def test_stays_closed_until_min_calls_are_known(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        call(breaker, ok=False)
+
+    assert breaker.state == CLOSED
+    breaker.allow()
+
+def test_opens_when_the_failure_rate_is_reached(clock):
+    breaker = make_breaker()
+    call(breaker)
+    call(breaker)
+    call(breaker, ok=False)
+    assert breaker.state == CLOSED
+
+    call(breaker, ok=False)
+
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 1
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.allow()
+    assert raised.value.retry_in == pytest.approx(30.0)
+    assert breaker.rejected == 1
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        call(breaker, ok=True, duration=5.0)
+
+    assert breaker.state == OPEN
+
+def test_only_the_window_of_recent_calls_counts(clock):
+    breaker = make_breaker(window=4)
+    call(breaker, ok=False)
+    for _ in range(6):
+        call(breaker)
+    call(breaker, ok=False)
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recent_failures"] == 1
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    clock.advance(1)
+
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record(True, 0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recent_calls"] == 0
+    breaker.allow()
+
+def test_failed_probe_opens_again(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.advance(30)
+
+    breaker.allow()
+    breaker.record(False, 0.1)
+
+    assert breaker.state == OPEN
+    assert breaker.times_opened == 2
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+def test_probe_that_never_reports_back_is_replaced(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.advance(30)
+    breaker.allow()
+    clock.advance(30)
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+    clock.advance(1)
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+
+def test_cancelled_probe_lets_the_next_one_through(clock):
+    breaker = make_breaker()
+    open_breaker(breaker)
+    clock.advance(30)
+    breaker.allow()
+
+    breaker.cancel()
+
+    assert breaker.state == HALF_OPEN
+    breaker.allow()
+
+def test_cancelled_calls_record_no_outcome(clock):
+    breaker = make_breaker()
+    for _ in range(10):
+        breaker.allow()
+        breaker.cancel()
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recent_calls"] == 0
+
+def test_outcomes_of_calls_started_before_opening_are_ignored(clock):
+    breaker = make_breaker()
+    breaker.allow()
+    open_breaker(breaker)
+
+    breaker.record(True, 0.1)
+
+    assert breaker.state == OPEN
+
+def test_breakers_are_created_once_per_endpoint(clock):
+    breakers = CircuitBreakers(min_calls=1, open_seconds=30.0)
+    search = breakers.get("searchHotels")
+    assert breakers.get("searchHotels") is search
+    call(search, ok=False)
+    breakers.get("getHotelDetails")
+
+    assert {name: stats["state"] for name, stats in breakers.stats().items()} == {
+        "getHotelDetails": CLOSED,
+        "searchHotels": OPEN
+    }
+    assert 'travel_agent_circuit_state{endpoint="searchHotels"} 2' in breakers.prometheus()
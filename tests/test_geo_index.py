@@ -0,0 +1,101 @@
+import pytest
+
+from conftest import Clock
+from models.geo_index import GeoIndex, HotelLocation, cell_diagonal_km, cells_in_radius, distance_km, geohash
+
+DAY = 86400
+# About 111 m of latitude
+STEP = 0.001
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("models.geo_index.time.time", clock)
+    return clock
+
+@pytest.fixture
+def make_index(tmp_path):
+    indexes = []
+
+    def make(**settings) -> GeoIndex:
+        index = GeoIndex(str(tmp_path / "geo.db"), **settings)
+        indexes.append(index)
+        return index
+
+    yield make
+    for index in indexes:
+        index.close()
+
+def row_of_hotels(latitude: float, longitude: float, count: int) -> list:
+    """Hotels due north of a point, 111 m apart."""
+    return [HotelLocation(str(n), latitude + n * STEP, longitude, f"Hotel {n}") for n in range(count)]
+
+def test_geohash_matches_known_values():
+    assert geohash(57.64911, 10.40744, 6) == "u4pruy"
+    assert geohash(-25.382708, -49.265506, 5) == "6gkzw"
+
+def test_distance_is_the_great_circle_distance():
+    assert distance_km(0.0, 0.0, 0.0, 1.0) == pytest.approx(111.19, abs=0.01)
+    assert distance_km(18.92, 72.83, 18.92, 72.83) == 0.0
+
+def test_within_returns_hotels_inside_the_radius_nearest_first(make_index):
+    index = make_index()
+    index.add(reversed(row_of_hotels(18.92, 72.83, 30)))
+    found = index.within(18.92, 72.83, 1.0)
+    # Hotels 0-8 are up to 0.9 km away; hotel 9 is 1.0008 km away
+    assert [location.hotel_id for location, _ in found] == [str(n) for n in range(9)]
+    distances = [distance for _, distance in found]
+    assert distances == sorted(distances) and distances[-1] <= 1.0
+
+def test_readding_a_hotel_moves_it_and_keeps_known_fields(make_index):
+    index = make_index()
+    index.add([HotelLocation("a", 18.92, 72.83, "Hotel A", 8.5)])
+    index.add([HotelLocation("a", 18.95, 72.83)])
+    assert index.within(18.92, 72.83, 1.0) == []
+    (location, _), = index.within(18.95, 72.83, 1.0)
+    assert (location.name, location.score) == ("Hotel A", 8.5)
+
+def test_cells_in_radius_flags_the_cells_entirely_inside():
+    cells = cells_in_radius(18.92, 72.83, 3.0)
+    inside = [cell for cell, whole in cells if whole]
+    assert geohash(18.92, 72.83) in inside
+    assert len(inside) < len(cells)
+
+def test_an_area_is_covered_only_inside_the_swept_circle(make_index):
+    index = make_index()
+    index.mark_covered(18.92, 72.83, 2.0 + cell_diagonal_km(18.92))
+    assert index.covered(18.92, 72.83, 2.0, max_age=DAY)
+    assert not index.covered(18.92, 72.83, 5.0, max_age=DAY)
+    assert not index.covered(19.5, 72.83, 1.0, max_age=DAY)
+
+def test_coverage_expires_and_partial_coverage_expires_sooner(make_index, clock):
+    index = make_index()
+    index.mark_covered(18.92, 72.83, 3.0)
+    index.mark_covered(28.61, 77.21, 3.0, complete=False)
+    clock.advance(2 * DAY)
+    assert index.covered(18.92, 72.83, 1.0, max_age=7 * DAY, partial_max_age=DAY)
+    assert not index.covered(28.61, 77.21, 1.0, max_age=7 * DAY, partial_max_age=DAY)
+    clock.advance(6 * DAY)
+    assert not index.covered(18.92, 72.83, 1.0, max_age=7 * DAY, partial_max_age=DAY)
+
+def test_hotels_not_seen_for_max_age_are_dropped_with_their_coverage(make_index, clock):
+    index = make_index(max_age=30 * DAY)
+    index.add(row_of_hotels(18.92, 72.83, 3))
+    index.mark_covered(18.92, 72.83, 3.0)
+    clock.advance(31 * DAY)
+    assert index.prune() == 3
+    assert index.within(18.92, 72.83, 1.0) == []
+    assert not index.covered(18.92, 72.83, 1.0, max_age=365 * DAY)
+
+def test_evicting_hotels_beyond_max_hotels_uncovers_their_cells(make_index, clock):
+    index = make_index(max_hotels=2)
+    index.add([HotelLocation("far", 28.61, 77.21)])
+    clock.advance(1)
+    index.add(row_of_hotels(18.92, 72.83, 2))
+    index.mark_covered(28.61, 77.21, 3.0)
+    index.mark_covered(18.92, 72.83, 3.0)
+    assert index.prune() == 1
+    assert [location.hotel_id for location, _ in index.within(18.92, 72.83, 1.0)] == ["0", "1"]
+    # The cell that lost a hotel is no longer trusted; the others still are
+    assert not index.covered(28.61, 77.21, 0.1, max_age=DAY)
+    assert index.covered(18.92, 72.83, 0.1, max_age=DAY)
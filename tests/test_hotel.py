@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+from models.hotel import Hotel, locations_to_dicts
+
+def make_hotel(**fields) -> Hotel:
+    values = {
+        "hotel_id": "42", "name": "Grand Hotel", "score": 8.6, "score_word": "Fabulous", "reviews_count": 2543,
+        "price_per_night": 120.5, "total_price": 361.5, "currency": "EUR", "num_nights": 3, "num_rooms": 1,
+        "address": "Apollo Bunder", "location": "Mumbai, India", "website": "https://example.com/grand",
+        "facilities": ["Swimming pool", "Free WiFi"], "popular_facilities": ["Spa"],
+        **fields
+    }
+    return Hotel(**values)
+
+def fields(hotel: Hotel) -> dict:
+    return {name: getattr(hotel, name) for name in Hotel.__slots__}
+
+def test_hotels_have_no_instance_dict():
+    hotel = make_hotel()
+    assert not hasattr(hotel, "__dict__")
+    with pytest.raises(AttributeError):
+        hotel.stars = 5
+
+def test_rows_round_trip_through_json():
+    hotel = make_hotel(distance_km=1.25)
+    row = json.loads(json.dumps(hotel.to_row()))
+    restored = Hotel.from_json(row)
+    assert fields(restored) == fields(hotel)
+    assert restored.facilities == ["Swimming pool", "Free WiFi"]
+    assert restored.popular_facilities == ["Spa"]
+
+def test_rows_keep_missing_scores_and_prices():
+    hotel = make_hotel(score=None, price_per_night=None, total_price=None)
+    restored = Hotel.from_row(json.loads(json.dumps(hotel.to_row())))
+    assert restored.score is None and restored.total_price is None
+    assert restored.rating == 0.0
+
+def test_dicts_cached_by_older_versions_are_read():
+    hotel = make_hotel()
+    restored = Hotel.from_json(hotel.to_dict())
+    assert fields(restored) == fields(hotel)
+
+def test_to_dict_has_the_nested_cli_shape():
+    data = make_hotel(score=None).to_dict()
+    assert data["hotel_name"] == "Grand Hotel"
+    assert data["review_score"] == {"score": "N/A", "word": "Fabulous", "reviews_count": 2543}
+    assert data["price"]["total"] == 361.5
+    assert data["price"]["per_night"] == 120.5
+    assert "distance_km" not in data
+    assert make_hotel(distance_km=0.4).to_dict()["distance_km"] == 0.4
+
+def test_equal_facilities_share_their_ids_and_mask():
+    first = make_hotel(facilities=["Swimming pool"], popular_facilities=[])
+    second = make_hotel(hotel_id="43", facilities=["Swimming pool"], popular_facilities=[])
+    assert first.facility_ids == second.facility_ids
+    assert first.facility_mask == second.facility_mask != 0
+
+def test_locations_to_dicts_converts_every_destination():
+    results = {"locations": {"Goa": [make_hotel()], "Pune": []}, "stale": ["Goa"]}
+    converted = locations_to_dicts(results)
+    assert converted["stale"] == ["Goa"]
+    assert converted["locations"]["Goa"][0]["hotel_id"] == "42"
+    assert converted["locations"]["Pune"] == []
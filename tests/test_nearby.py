@@ -0,0 +1,71 @@
+import pytest
+
+from conftest import Clock
+
+CHECKIN, CHECKOUT = "2025-03-02", "2025-03-05"
+DAY = 86400
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("models.geo_index.time.time", clock)
+    return clock
+
+def test_first_search_sweeps_the_api_and_returns_hotels_nearest_first(make_booking_api):
+    booking_api, calls = make_booking_api()
+    results = booking_api.search_nearby(18.92, 72.83, CHECKIN, CHECKOUT, radius_km=1.5, max_results=10)
+
+    assert results["source"] == "api"
+    hotels = results["results"]
+    assert len(hotels) == 10
+    distances = [hotel.distance_km for hotel in hotels]
+    assert distances == sorted(distances) and distances[-1] <= 1.5
+    assert calls.snapshot()["getHotelDetails"] == 10
+
+def test_searches_inside_a_swept_area_are_answered_from_the_index(make_booking_api):
+    booking_api, calls = make_booking_api()
+    swept = booking_api.search_nearby(18.92, 72.83, CHECKIN, CHECKOUT, radius_km=1.5, max_results=10)
+    calls.reset()
+
+    # Other dates and a point close by
+    results = booking_api.search_nearby(18.921, 72.831, "2025-04-02", "2025-04-04", radius_km=1.0, max_results=10)
+    assert results["source"] == "index"
+    assert "searchHotelsByCoordinates" not in calls.snapshot()
+    assert [hotel.distance_km for hotel in results["results"]] == sorted(hotel.distance_km for hotel in results["results"])
+    assert all(hotel.distance_km <= 1.0 for hotel in results["results"])
+
+    # The same search again comes from the cache
+    calls.reset()
+    again = booking_api.search_nearby(18.92, 72.83, CHECKIN, CHECKOUT, radius_km=1.5, max_results=10)
+    assert again["source"] == "cache"
+    assert [hotel.hotel_id for hotel in again["results"]] == [hotel.hotel_id for hotel in swept["results"]]
+    assert calls.snapshot() == {}
+
+def test_searches_outside_the_swept_area_call_the_api(make_booking_api):
+    booking_api, calls = make_booking_api()
+    booking_api.search_nearby(18.92, 72.83, CHECKIN, CHECKOUT, radius_km=1.0, max_results=5)
+    calls.reset()
+    results = booking_api.search_nearby(18.99, 72.83, CHECKIN, CHECKOUT, radius_km=1.0, max_results=5)
+    assert results["source"] == "api"
+    assert calls.snapshot()["searchHotelsByCoordinates"] >= 1
+
+def test_sweeps_stopped_at_the_page_limit_cover_the_area_for_less_time(make_booking_api, monkeypatch, clock):
+    monkeypatch.setenv("BOOKING_MAX_NEARBY_PAGES", "1")
+    booking_api, calls = make_booking_api()
+    booking_api.search_nearby(18.92, 72.83, CHECKIN, CHECKOUT, radius_km=1.5, max_results=5)
+    assert calls.snapshot()["searchHotelsByCoordinates"] == 1
+    assert booking_api.geo_index.conn.execute("SELECT DISTINCT complete FROM covered_cells").fetchall() == [(0,)]
+
+    results = booking_api.search_nearby(18.92, 72.83, "2025-04-02", "2025-04-04", radius_km=1.5, max_results=5)
+    assert results["source"] == "index"
+
+    clock.advance(2 * DAY)
+    results = booking_api.search_nearby(18.92, 72.83, "2025-05-02", "2025-05-04", radius_km=1.5, max_results=5)
+    assert results["source"] == "api"
+
+def test_invalid_searches_are_rejected(make_booking_api):
+    booking_api, _ = make_booking_api()
+    with pytest.raises(ValueError):
+        booking_api.search_nearby(91.0, 72.83, CHECKIN, CHECKOUT)
+    with pytest.raises(ValueError):
+        booking_api.search_nearby(18.92, 72.83, CHECKIN, CHECKOUT, radius_km=0)
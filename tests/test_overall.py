@@ -0,0 +1,85 @@
+import pytest
+
+from models.hotel import Hotel
+from overall import enrich_best, gather_candidates, run_overall, score_bound
+
+CHECKIN, CHECKOUT = "2025-03-02", "2025-03-05"
+DESTINATIONS = ["Goa", "Pune", "Jaipur"]
+
+def candidates_of(booking_api, destinations=DESTINATIONS, min_rating=None):
+    candidates, missing = gather_candidates(booking_api, destinations, CHECKIN, CHECKOUT, 2, 1, None,
+                                            min_rating, 20, timeout=30)
+    assert missing == []
+    return candidates
+
+def best_of_all(booking_api, candidates, preferences, top):
+    """The top hotels found by fetching every candidate's details, for comparison."""
+    everything = enrich_best(booking_api, candidates, CHECKIN, CHECKOUT, preferences, len(candidates), False)
+    ranked = booking_api.local_ranker.rank_with_scores([hotel for _, hotel in everything], preferences)
+    return [hotel.hotel_id for hotel, _ in ranked[:top]]
+
+def test_score_bound_is_exact_for_rating_and_maximal_for_preferences():
+    hotel = Hotel("a", "Hotel a", score=8.0)
+    assert score_bound(hotel, False) == pytest.approx(5.6)
+    assert score_bound(hotel, True) == pytest.approx(5.6 + 1.5)
+
+def test_candidates_are_deduplicated_and_filtered_by_rating(make_booking_api):
+    booking_api, calls = make_booking_api()
+    candidates = candidates_of(booking_api, DESTINATIONS + ["goa"], min_rating=8.0)
+    hotel_ids = [hotel.hotel_id for _, hotel in candidates]
+    assert len(hotel_ids) == len(set(hotel_ids))
+    assert all(hotel.rating >= 8.0 for _, hotel in candidates)
+    assert "getHotelDetails" not in calls.snapshot()
+
+def test_without_preferences_only_the_winners_get_details(make_booking_api):
+    booking_api, calls = make_booking_api()
+    best = run_overall(booking_api, DESTINATIONS, CHECKIN, CHECKOUT, 2, top=5, max_results=20)
+
+    assert best.candidates == 60
+    assert best.details_fetched == 5
+    assert calls.snapshot()["getHotelDetails"] == 5
+    scores = [hotel.rating for _, hotel in best.hotels]
+    assert len(scores) == 5 and scores == sorted(scores, reverse=True)
+
+def test_pruning_stops_once_no_bound_can_beat_the_top(make_booking_api):
+    booking_api, calls = make_booking_api()
+    candidates = candidates_of(booking_api)
+    calls.reset()
+
+    enriched = enrich_best(booking_api, candidates, CHECKIN, CHECKOUT, "pool", 5, keep_ties=False)
+    assert len(enriched) < len(candidates)
+    assert calls.snapshot()["getHotelDetails"] == len(enriched)
+
+    # Every hotel left out has a bound no better than the fifth best exact score
+    scores = booking_api.local_ranker.scores([hotel for _, hotel in enriched], "pool")
+    fifth = sorted(scores, reverse=True)[4]
+    fetched = {hotel.hotel_id for _, hotel in enriched}
+    assert all(score_bound(hotel, True) <= fifth for _, hotel in candidates if hotel.hotel_id not in fetched)
+
+def test_pruned_search_finds_the_same_top_as_fetching_everything(make_booking_api):
+    booking_api, _ = make_booking_api()
+    best = run_overall(booking_api, DESTINATIONS, CHECKIN, CHECKOUT, 2, preferences="pool,spa", top=5,
+                       max_results=20)
+    expected = best_of_all(booking_api, candidates_of(booking_api), "pool,spa", 5)
+
+    assert [hotel.hotel_id for _, hotel in best.hotels] == expected
+    assert best.details_fetched < best.candidates
+
+def test_keeping_ties_fetches_at_least_as_many_details(make_booking_api):
+    booking_api, _ = make_booking_api()
+    candidates = candidates_of(booking_api)
+    strict = enrich_best(booking_api, candidates, CHECKIN, CHECKOUT, "pool", 5, keep_ties=False)
+    with_ties = enrich_best(booking_api, candidates, CHECKIN, CHECKOUT, "pool", 5, keep_ties=True)
+    assert len(with_ties) >= len(strict)
+
+def test_results_are_labelled_with_their_destination(make_booking_api):
+    booking_api, _ = make_booking_api()
+    best = run_overall(booking_api, DESTINATIONS, CHECKIN, CHECKOUT, 2, top=3, max_results=20)
+    records = list(best.records())
+    assert [record["rank"] for record in records] == [1, 2, 3]
+    assert all(record["destination"] in DESTINATIONS for record in records)
+
+def test_top_must_be_positive(make_booking_api):
+    booking_api, _ = make_booking_api()
+    with pytest.raises(ValueError):
+        run_overall(booking_api, DESTINATIONS, CHECKIN, CHECKOUT, 2, top=0)
@@ -0,0 +1,74 @@
+import pytest
+
+from api.ranking import FacilityVocabulary, LocalRanker, compile_preference, parse_preferences, split_at_cutoff
+from models.hotel import Hotel
+
+def hotel(hotel_id: str, score: float, facilities=()) -> Hotel:
+    return Hotel(hotel_id, f"Hotel {hotel_id}", score=score, facilities=facilities)
+
+def ids(hotels) -> list:
+    return [hotel.hotel_id for hotel in hotels]
+
+def test_preferences_are_split_trimmed_and_lowercased():
+    assert parse_preferences(" Pool, WiFi ,,spa ") == ["pool", "wifi", "spa"]
+    assert parse_preferences(None) == []
+    assert parse_preferences("") == []
+
+@pytest.mark.parametrize("preference, facility", [
+    ("pool", "outdoor swimming pool"),
+    ("wifi", "free wi-fi"),
+    ("gym", "fitness centre"),
+    ("spa", "hot tub/jacuzzi"),
+    ("parking", "private car park"),
+    ("breakfast", "breakfast included"),
+])
+def test_preferences_match_their_synonyms(preference, facility):
+    assert compile_preference(preference).search(facility)
+
+def test_preferences_do_not_match_unrelated_facilities():
+    assert not compile_preference("pool").search("fitness centre")
+    assert not compile_preference("gym").search("swimming pool")
+
+def test_matching_ignores_the_case_of_facility_names():
+    ranker = LocalRanker(FacilityVocabulary())
+    hotels = [hotel("a", 8.0, ["Free WiFi"]), hotel("b", 8.0, ["Garden"])]
+    assert ids(ranker.rank(hotels, "wifi", top_k=2)) == ["a", "b"]
+
+def test_scores_combine_rating_and_share_of_preferences_matched():
+    ranker = LocalRanker(FacilityVocabulary())
+    hotels = [hotel("a", 8.0, ["Swimming pool", "Free WiFi"]), hotel("b", 8.0, ["Swimming pool"]), hotel("c", 8.0)]
+    # 70% of the rating plus 30% of the share matched on a 0-5 scale
+    assert ranker.scores(hotels, "pool,wifi") == pytest.approx([7.1, 6.35, 5.6])
+    assert ranker.scores(hotels, None) == pytest.approx([5.6, 5.6, 5.6])
+
+def test_matching_preferences_can_outrank_a_higher_rating():
+    ranker = LocalRanker(FacilityVocabulary())
+    hotels = [hotel("rated", 9.0, ["Garden"]), hotel("matching", 8.0, ["Outdoor pool", "Fitness centre"])]
+    assert ids(ranker.rank(hotels, "pool,gym", top_k=2)) == ["matching", "rated"]
+    assert ids(ranker.rank(hotels, None, top_k=2)) == ["rated", "matching"]
+
+def test_rank_keeps_the_top_k_and_input_order_for_ties():
+    ranker = LocalRanker(FacilityVocabulary())
+    hotels = [hotel("a", 7.0), hotel("b", 9.0), hotel("c", 7.0), hotel("d", 7.0)]
+    assert ids(ranker.rank(hotels, None, top_k=3)) == ["b", "a", "c"]
+
+def test_hotels_without_a_score_rank_last():
+    ranker = LocalRanker(FacilityVocabulary())
+    hotels = [hotel("unrated", None), hotel("rated", 6.0)]
+    assert ids(ranker.rank(hotels, None, top_k=2)) == ["rated", "unrated"]
+
+def test_facilities_added_after_a_preference_was_matched_are_covered():
+    vocabulary = FacilityVocabulary()
+    vocabulary.mask(["Garden"])
+    assert vocabulary.preference_mask("pool") == 0
+    mask = vocabulary.mask(["Rooftop pool"])
+    assert vocabulary.preference_mask("pool") == mask
+
+def test_split_at_cutoff_returns_no_ties_when_the_top_k_is_clear():
+    a, b, c = hotel("a", 9.0), hotel("b", 8.0), hotel("c", 7.0)
+    assert split_at_cutoff([(a, 3.0), (b, 2.0), (c, 1.0)], 2) == ([a, b], [])
+    assert split_at_cutoff([(a, 3.0)], 2) == ([a], [])
+
+def test_split_at_cutoff_separates_the_group_tied_at_the_cutoff():
+    a, b, c, d = hotel("a", 9.0), hotel("b", 8.0), hotel("c", 8.0), hotel("d", 8.0)
+    assert split_at_cutoff([(a, 3.0), (b, 2.0), (c, 2.0), (d, 2.0)], 2) == ([a], [b, c, d])
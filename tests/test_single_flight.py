@@ -0,0 +1,170 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from api.single_flight import AsyncSingleFlight, SingleFlight
+
+CALLERS = 8
+
+def wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+def run_concurrently(flight: SingleFlight, key, fn, callers: int = CALLERS):
+    """Call ``flight.do`` from ``callers`` threads; returns their results or exceptions."""
+    outcomes = [None] * callers
+
+    def call(index: int):
+        try:
+            outcomes[index] = flight.do(key, fn)
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {"dest_id": "-2092174"}
+
+    threads, outcomes = run_concurrently(flight, "destination:goa", fetch)
+    wait_until(lambda: flight.coalesced == CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert all(outcome is outcomes[0] for outcome in outcomes)
+
+def test_waiters_get_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fetch():
+        release.wait(5)
+        raise ConnectionError("upstream down")
+
+    threads, outcomes = run_concurrently(flight, "key", fetch)
+    wait_until(lambda: flight.coalesced == CALLERS - 1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    release = threading.Event()
+    started = []
+
+    def fetch(key):
+        started.append(key)
+        release.wait(5)
+        return key
+
+    threads = []
+    outcomes = {}
+    for key in ("a", "b"):
+        thread = threading.Thread(target=lambda key=key: outcomes.__setitem__(key, flight.do(key, lambda: fetch(key))))
+        thread.start()
+        threads.append(thread)
+    wait_until(lambda: len(started) == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert outcomes == {"a": "a", "b": "b"}
+    assert flight.coalesced == 0
+
+def test_finished_calls_are_not_remembered():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do("key", fetch) == 1
+    assert flight.do("key", fetch) == 2
+    assert flight.coalesced == 0
+
+def test_async_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await release.wait()
+            return "details"
+
+        tasks = [asyncio.ensure_future(flight.do("hotel:1", fetch)) for _ in range(CALLERS)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        return calls, results, flight
+
+    calls, results, flight = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert results == ["details"] * CALLERS
+    assert flight.coalesced == CALLERS - 1
+
+def test_async_cancelled_waiter_leaves_the_shared_call_running():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "details"
+
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return first, await second
+
+    first, result = asyncio.run(scenario())
+    assert first.cancelled()
+    assert result == "details"
+
+def test_async_last_cancelled_waiter_cancels_the_shared_call():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        finished = []
+
+        async def fetch():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                finished.append("cancelled")
+                raise
+
+        tasks = [asyncio.ensure_future(flight.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.gather(*tasks)
+        # Let the shared call see its cancellation
+        await asyncio.sleep(0)
+        return finished, flight
+
+    finished, flight = asyncio.run(scenario())
+    assert finished == ["cancelled"]
+    assert flight._calls == {} and flight._waiters == {}
@@ -0,0 +1,106 @@
+import gzip
+import json
+from datetime import timedelta
+
+import pytest
+
+from models.cache import Cache
+from models.snapshot import SNAPSHOT_FORMAT, SNAPSHOT_VERSION, import_snapshots, read_snapshot, write_snapshot
+
+def contents(cache: Cache):
+    """Key -> (value, expires_at) of every entry that can still be served."""
+    return {key: (value, expires_at) for key, value, expires_at in cache.export_entries()}
+
+def snapshot_of(make_cache, tmp_path, name: str, entries) -> str:
+    """Snapshot file holding ``entries``, a list of (key, value, ttl in hours)."""
+    cache = make_cache(name)
+    for key, value, hours in entries:
+        cache.set(key, value, ttl=timedelta(hours=hours))
+    path = str(tmp_path / f"{name}.snap")
+    write_snapshot(cache, path, ["hotel_details"])
+    return path
+
+def test_round_trip_keeps_only_the_chosen_namespaces(make_cache, tmp_path):
+    source = make_cache("source")
+    source.set("hotel_details:{\"hotel_id\":\"1\"}", {"name": "Sea View", "facilities": ["Pool"]})
+    source.set("destination_id:{\"destination\":\"goa\"}", "-2092174")
+    source.set("search_hotels:{\"destination\":\"goa\"}", [1, 2], ttl=timedelta(minutes=10))
+    path = str(tmp_path / "seed.snap")
+
+    written = write_snapshot(source, path, ["hotel_details", "destination_id"])
+
+    assert written == 2
+    assert sorted(key.split(":")[0] for key, _, _ in read_snapshot(path)) == ["destination_id", "hotel_details"]
+    target = make_cache("target")
+    totals = import_snapshots(target, [path])
+    assert (totals["snapshots"], totals["read"], totals["written"]) == (1, 2, 2)
+    assert target.get("hotel_details:{\"hotel_id\":\"1\"}") == {"name": "Sea View", "facilities": ["Pool"]}
+    assert target.get("destination_id:{\"destination\":\"goa\"}") == "-2092174"
+    assert target.get("search_hotels:{\"destination\":\"goa\"}") is None
+
+def test_merge_keeps_the_copy_that_expires_last_in_any_order(make_cache, tmp_path):
+    first = snapshot_of(make_cache, tmp_path, "first", [
+        ("hotel_details:1", "from first, older", 1),
+        ("hotel_details:2", "only in first", 1),
+    ])
+    second = snapshot_of(make_cache, tmp_path, "second", [
+        ("hotel_details:1", "from second, newer", 5),
+        ("hotel_details:3", "only in second", 1),
+    ])
+
+    forward = make_cache("forward")
+    import_snapshots(forward, [first, second])
+    backward = make_cache("backward")
+    import_snapshots(backward, [second, first])
+
+    assert contents(forward) == contents(backward)
+    assert forward.get("hotel_details:1") == "from second, newer"
+    assert sorted(contents(forward)) == ["hotel_details:1", "hotel_details:2", "hotel_details:3"]
+
+def test_merge_does_not_replace_newer_local_entries(make_cache, tmp_path):
+    path = snapshot_of(make_cache, tmp_path, "remote", [("hotel_details:1", "remote", 1)])
+    local = make_cache("local")
+    local.set("hotel_details:1", "local", ttl=timedelta(hours=5))
+
+    totals = import_snapshots(local, [path])
+
+    assert totals["written"] == 0
+    assert local.get("hotel_details:1") == "local"
+
+def test_entries_too_old_to_serve_stale_are_skipped(make_cache, tmp_path):
+    path = snapshot_of(make_cache, tmp_path, "remote", [("hotel_details:1", "kept", 1)])
+    with gzip.open(path, "at", encoding="utf-8") as out:
+        out.write(f"{1.0:.3f}\thotel_details:2\t\"expired long ago\"\n")
+    target = make_cache("target")
+
+    totals = import_snapshots(target, [path])
+
+    assert (totals["read"], totals["written"]) == (2, 1)
+    assert sorted(contents(target)) == ["hotel_details:1"]
+
+def write_raw(path, header, *lines):
+    with gzip.open(path, "wt", encoding="utf-8") as out:
+        out.write(json.dumps(header) + "\n")
+        out.writelines(lines)
+
+def test_rejects_files_that_are_not_snapshots(tmp_path):
+    path = str(tmp_path / "other.snap")
+    write_raw(path, {"format": "something-else", "version": 1})
+
+    with pytest.raises(ValueError, match="Not a cache snapshot"):
+        list(read_snapshot(path))
+
+def test_rejects_newer_snapshot_versions(tmp_path):
+    path = str(tmp_path / "future.snap")
+    write_raw(path, {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION + 1})
+
+    with pytest.raises(ValueError, match="Unsupported snapshot version"):
+        list(read_snapshot(path))
+
+def test_reports_the_line_of_a_malformed_entry(tmp_path):
+    path = str(tmp_path / "broken.snap")
+    write_raw(path, {"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION},
+              "9999999999.000\thotel_details:1\t\"ok\"\n", "not an entry\n")
+
+    with pytest.raises(ValueError, match="line 3: malformed entry"):
+        list(read_snapshot(path))
@@ -0,0 +1,76 @@
+import pytest
+
+from models.hotel import Hotel
+from sweep import MAX_SWEEP_STAYS, PriceMatrix, parse_nights, run_sweep, stay_dates
+
+def test_parse_nights_accepts_lists_and_ranges():
+    assert parse_nights("3, 2") == [2, 3]
+    assert parse_nights("2-4,6") == [2, 3, 4, 6]
+
+@pytest.mark.parametrize("text", ["", "0", "two", "2-x"])
+def test_parse_nights_rejects_invalid_stay_lengths(text):
+    with pytest.raises(ValueError):
+        parse_nights(text)
+
+def test_stay_dates_cover_every_checkin_and_stay_length():
+    assert stay_dates("2025-03-30", "2025-04-01", [2, 3]) == [
+        ("2025-03-30", "2025-04-01"), ("2025-03-30", "2025-04-02"),
+        ("2025-03-31", "2025-04-02"), ("2025-03-31", "2025-04-03"),
+        ("2025-04-01", "2025-04-03"), ("2025-04-01", "2025-04-04"),
+    ]
+
+def test_stay_dates_reject_reversed_or_oversized_sweeps():
+    with pytest.raises(ValueError):
+        stay_dates("2025-03-05", "2025-03-02", [2])
+    with pytest.raises(ValueError):
+        stay_dates("2025-03-01", "2025-05-01", [2, 3])
+    assert len(stay_dates("2025-03-01", "2025-03-31", [2, 3])) == MAX_SWEEP_STAYS
+
+def priced(hotel_id: str, total: float) -> Hotel:
+    return Hotel(hotel_id, f"Hotel {hotel_id}", score=8.0, total_price=total)
+
+def test_matrix_compares_stays_by_price_per_night():
+    matrix = PriceMatrix("Goa", ["2025-03-02", "2025-03-03"], [2, 3])
+    matrix.add("2025-03-02", 2, [priced("a", 200.0), priced("b", 260.0)])
+    matrix.add("2025-03-02", 3, [priced("a", 330.0), priced("b", 270.0)])
+    matrix.add("2025-03-03", 2, [priced("a", 180.0), Hotel("c", "Hotel c")])
+
+    assert matrix.price("a", "2025-03-03", 2) == 180.0
+    assert matrix.price("b", "2025-03-03", 2) is None
+    assert matrix.cheapest_stay("a") == ("2025-03-03", 2, 180.0)
+    assert matrix.cheapest_stay("b") == ("2025-03-02", 3, 270.0)
+    # Hotels without any price are left out
+    assert matrix.cheapest_first() == ["a", "b"]
+
+    data = matrix.to_dict(["a"])
+    assert data["checkins"] == ["2025-03-02", "2025-03-03"] and data["nights"] == [2, 3]
+    hotel, = data["hotels"]
+    assert hotel["prices"] == {"2025-03-02": {"2": 200.0, "3": 330.0}, "2025-03-03": {"2": 180.0}}
+    assert hotel["cheapest"] == {"checkin": "2025-03-03", "nights": 2, "total": 180.0}
+
+def test_sweep_prices_every_stay_without_fetching_details(make_booking_api):
+    booking_api, calls = make_booking_api()
+    stays = stay_dates("2025-03-02", "2025-03-04", [2, 3])
+    matrix, hotels = run_sweep(booking_api, "Goa", stays, 2, max_results=10, top=5)
+
+    counts = calls.snapshot()
+    assert counts["searchHotels"] == len(stays)
+    assert counts["searchDestination"] == 1
+    assert "getHotelDetails" not in counts
+
+    assert len(matrix.prices) == 10
+    for hotel_id in matrix.prices:
+        assert len(matrix.prices[hotel_id]) == len(stays)
+    assert [hotel.hotel_id for hotel in hotels] == matrix.cheapest_first()[:5]
+
+def test_sweep_with_preferences_fetches_details_once_per_hotel(make_booking_api):
+    booking_api, calls = make_booking_api()
+    stays = stay_dates("2025-03-02", "2025-03-04", [2, 3])
+    matrix, hotels = run_sweep(booking_api, "Goa", stays, 2, max_results=10, preferences="pool", top=3)
+
+    assert calls.snapshot()["getHotelDetails"] == len(matrix.prices)
+    assert len(hotels) == 3
+    # Ranked on their details: best review scores first, as every hotel has a pool
+    scores = [hotel.rating for hotel in hotels]
+    assert scores == sorted(scores, reverse=True)
+    assert all(hotel.facilities for hotel in hotels)